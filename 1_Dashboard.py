@@ -1,57 +1,140 @@
 import pandas as pd
-import plotly.express as px
 import streamlit as st
-from utils.data_generator import generate_synthetic_data
+import os
+from utils.data_generator import generate_synthetic_data, load_synthetic_dataset, DATASET_DIR, RISK_LEVELS
+from utils.dashboard_stats import CohortSummary, DatasetSummaryStore, dataset_version, use_binned_charts, HIST_BINS
+from utils.patient_history import PatientHistoryStore, HISTORY_DB
 from utils.ui_helper import apply_custom_style
+from utils.instrumentation import start_page_run
 
-st.set_page_config(
-    page_title="Dashboard",
-    page_icon="📊",
-    layout="wide"
-)
+# Summaries are shared by every session and only rebuilt when the data changes
+@st.cache_resource
+def get_summary_store(data_dir):
+    return DatasetSummaryStore(data_dir)
 
-apply_custom_style()
-st.title("📊 Health Data Dashboard")
+@st.cache_resource
+def get_demo_data():
+    df = generate_synthetic_data(n=500)
+    return df, CohortSummary.from_frame(df)
 
+@st.cache_data(max_entries=2)
+def load_dataset(version, nrows=None):
+    return load_synthetic_dataset(DATASET_DIR, nrows=nrows)
 
-# Generate data on the fly if not already loaded (or just generate new for demo)
-if 'data' not in st.session_state:
-    with st.spinner('Generating synthetic health data...'):
-        st.session_state['data'] = generate_synthetic_data(n=500)
+@st.cache_resource
+def get_history_store(path):
+    return PatientHistoryStore(path)
 
-df = st.session_state['data']
+TREND_LABELS = {
+    'systolic': 'Systolic BP (mmHg)', 'diastolic': 'Diastolic BP (mmHg)', 'sugar': 'Blood Sugar (mg/dL)',
+    'heart_rate': 'Heart Rate (bpm)', 'bmi': 'BMI', 'health_score': 'Health Score',
+}
 
-# Top Metrics
-col1, col2, col3 = st.columns(3)
-col1.metric("Total Records", len(df))
-col2.metric("High Risk Cases", len(df[df['Risk_Level'] == 'High']))
-col3.metric("Avg Age", f"{df['Age'].mean():.1f}")
+def main():
+    st.set_page_config(
+        page_title="Dashboard",
+        page_icon="📊",
+        layout="wide"
+    )
 
-st.markdown("---")
+    apply_custom_style()
+    st.title("📊 Health Data Dashboard")
 
-# Visualizations
-col_left, col_right = st.columns(2)
+    # raw_df is only kept for datasets small enough to plot row by row. An empty
+    # or not yet written dataset directory falls back to the demo data.
+    version = dataset_version(DATASET_DIR) if os.path.isdir(DATASET_DIR) else ()
+    if version:
+        with st.spinner('Loading health dataset...'):
+            summary = get_summary_store(DATASET_DIR).get()
+            raw_df = None if use_binned_charts(summary.n) else load_dataset(version)
+            sample_df = load_dataset(version, nrows=5) if raw_df is None else raw_df.head()
+    else:
+        raw_df, summary = get_demo_data()
+        sample_df = raw_df.head()
 
-with col_left:
-    st.subheader("Risk Level Distribution")
-    fig_risk = px.pie(df, names='Risk_Level', title='Distribution of Health Risk', hole=0.4, color_discrete_sequence=px.colors.sequential.RdBu)
-    st.plotly_chart(fig_risk, use_container_width=True)
+    # Top Metrics
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Records", summary.n)
+    col2.metric("High Risk Cases", summary.count('High'))
+    col3.metric("Avg Age", f"{summary.mean('Age'):.1f}")
 
-with col_right:
-    st.subheader("BMI vs Heart Rate")
-    fig_scatter = px.scatter(df, x='BMI', y='Heart_Rate', color='Risk_Level', title='BMI vs Heart Rate Correlation')
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    st.markdown("---")
+    if raw_df is None:
+        st.caption(f"{summary.n:,} records: charts are drawn from pre-binned counts and a stratified sample.")
 
-st.subheader("Vitals Overview")
-tab1, tab2 = st.tabs(["Blood Pressure", "SpO2 & Age"])
+    # Visualizations
+    # plotly is imported after the metrics are sent so they show while it loads
+    import plotly.express as px
+    import plotly.graph_objects as go
 
-with tab1:
-    fig_bp = px.histogram(df, x='BP_Systolic', color='Risk_Level', nbins=30, title='Systolic Blood Pressure Distribution')
-    st.plotly_chart(fig_bp, use_container_width=True)
+    col_left, col_right = st.columns(2)
 
-with tab2:
-    fig_age_spo2 = px.box(df, x='Risk_Level', y='SpO2', title='SpO2 Levels by Risk Category')
-    st.plotly_chart(fig_age_spo2, use_container_width=True)
+    with col_left:
+        st.subheader("Risk Level Distribution")
+        fig_risk = px.pie(names=RISK_LEVELS, values=summary.risk_counts, title='Distribution of Health Risk', hole=0.4, color_discrete_sequence=px.colors.sequential.RdBu)
+        st.plotly_chart(fig_risk, use_container_width=True)
 
-st.markdown("### Raw Data Sample")
-st.dataframe(df.head())
+    with col_right:
+        st.subheader("BMI vs Heart Rate")
+        if raw_df is not None:
+            fig_scatter = px.scatter(raw_df, x='BMI', y='Heart_Rate', color='Risk_Level', title='BMI vs Heart Rate Correlation')
+        elif st.radio("View", ["Sample", "Density"], horizontal=True, key="scatter_view") == "Sample":
+            scatter_df = summary.sample_frame()
+            fig_scatter = px.scatter(scatter_df, x='BMI', y='Heart_Rate', color='Risk_Level',
+                                     title=f'BMI vs Heart Rate Correlation ({len(scatter_df):,} points, stratified by risk)')
+        else:
+            x_edges, y_edges, z = summary.density_grid()
+            x_width, y_width = HIST_BINS['BMI'][2], HIST_BINS['Heart_Rate'][2]
+            fig_scatter = go.Figure(go.Heatmap(x=x_edges + x_width / 2, y=y_edges + y_width / 2, z=z, colorscale='Blues'))
+            fig_scatter.update_layout(title='BMI vs Heart Rate Density', xaxis_title='BMI', yaxis_title='Heart_Rate')
+        st.plotly_chart(fig_scatter, use_container_width=True)
+
+    st.subheader("Vitals Overview")
+    tab1, tab2 = st.tabs(["Blood Pressure", "SpO2 & Age"])
+
+    with tab1:
+        if raw_df is not None:
+            fig_bp = px.histogram(raw_df, x='BP_Systolic', color='Risk_Level', nbins=30, title='Systolic Blood Pressure Distribution')
+        else:
+            fig_bp = px.bar(summary.histogram_frame('BP_Systolic', nbins=30), x='BP_Systolic', y='count',
+                            color='Risk_Level', title='Systolic Blood Pressure Distribution')
+            fig_bp.update_layout(bargap=0)
+        st.plotly_chart(fig_bp, use_container_width=True)
+
+    with tab2:
+        if raw_df is not None:
+            fig_age_spo2 = px.box(raw_df, x='Risk_Level', y='SpO2', title='SpO2 Levels by Risk Category')
+        else:
+            box = summary.box_stats('SpO2')
+            fig_age_spo2 = go.Figure(go.Box(x=box['Risk_Level'], q1=box['q1'], median=box['median'], q3=box['q3'],
+                                            lowerfence=box['lowerfence'], upperfence=box['upperfence']))
+            fig_age_spo2.update_layout(title='SpO2 Levels by Risk Category', xaxis_title='Risk_Level', yaxis_title='SpO2')
+        st.plotly_chart(fig_age_spo2, use_container_width=True)
+
+    # Trends read straight from the indexed history, one patient at a time
+    if os.path.exists(HISTORY_DB):
+        st.subheader("Patient Trends")
+        store = get_history_store(HISTORY_DB)
+        c_patient, c_measure, c_window = st.columns(3)
+        patient_id = c_patient.selectbox("Patient (most recent first)", store.patients(limit=1000))
+        measure = c_measure.selectbox("Measure", list(TREND_LABELS), format_func=TREND_LABELS.get)
+        window_days = c_window.select_slider("Rolling mean window (days)", options=[7, 30, 90], value=30)
+
+        if patient_id is not None:
+            history = store.history(patient_id, columns=[measure])
+            rolling = store.rolling_means(patient_id, window_days * 86400)
+            overview = store.summary(patient_id)
+            st.caption(f"{overview['count']:,} readings, average {overview[measure]:.1f}")
+            fig_trend = go.Figure()
+            fig_trend.add_trace(go.Scatter(x=pd.to_datetime(history['ts'], unit='s'), y=history[measure],
+                                           mode='lines', name='Reading', opacity=0.5))
+            fig_trend.add_trace(go.Scatter(x=pd.to_datetime(rolling['ts'], unit='s'), y=rolling[measure],
+                                           mode='lines', name=f'{window_days}-day mean'))
+            fig_trend.update_layout(title=f'{TREND_LABELS[measure]} for {patient_id}', yaxis_title=TREND_LABELS[measure])
+            st.plotly_chart(fig_trend, use_container_width=True)
+
+    st.markdown("### Raw Data Sample")
+    st.dataframe(sample_df)
+
+with start_page_run("dashboard"):
+    main()
@@ -1,6 +1,8 @@
 
 import streamlit as st
-import pandas as pd
+import datetime
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, wait
 from utils.health_metrics import (
     calculate_bmi, classify_bmi, 
     classify_bp, classify_sugar, 
@@ -9,65 +11,157 @@ from utils.health_metrics import (
     get_smart_recommendations
 )
 from utils.ui_helper import apply_custom_style, card_component
+from utils.instrumentation import start_page_run
 
-# Attempt import of generator
-try:
-    from utils.report_generator import generate_pdf_report
-    has_pdf_lib = True
-except ImportError:
-    has_pdf_lib = False
-
-st.set_page_config(page_title="Check Your Health", page_icon="🩺", layout="wide")
-apply_custom_style()
-
-st.title("🏥 Health Risk Assessment")
-st.markdown("Enter your vitals below. Our system observes strict medical thresholds to evaluate your health.")
-
-with st.form("health_form"):
-    st.subheader("📝 Patient Information")
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        age = st.number_input("Age (Years)", min_value=1, max_value=120, value=30)
-        gender = st.selectbox("Gender", ["Male", "Female", "Other"])
-    with c2:
-        height = st.number_input("Height (cm)", min_value=50, max_value=250, value=170)
-    with c3:
-        weight = st.number_input("Weight (kg)", min_value=10, max_value=300, value=70)
+# The generator (and fpdf) is only imported once a report is requested
+has_pdf_lib = importlib.util.find_spec("fpdf") is not None
+
+from utils.model_inference import get_predictor
+
+@st.cache_resource
+def load_risk_predictor():
+    """Loads the trained model once per server process; reruns reuse it."""
+    try:
+        return get_predictor()
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def load_drift_monitor():
+    """Training distribution of the exported model; None for artifacts exported without one."""
+    from utils.drift_monitor import DriftMonitor
+    try:
+        return DriftMonitor.load()
+    except FileNotFoundError:
+        return None
+
+@st.cache_resource
+def get_history_store():
+    """Assessment history shared by all sessions; only imported once an assessment is saved."""
+    from utils.patient_history import PatientHistoryStore
+    return PatientHistoryStore()
+
+@st.cache_resource
+def get_percentile_store():
+    """Cohort percentile index shared by all sessions; refreshed when the cohort dataset grows."""
+    from utils.cohort_percentiles import PercentileIndexStore, PERCENTILE_INDEX_PATH
+    return PercentileIndexStore(cache_path=PERCENTILE_INDEX_PATH)
+
+@st.cache_resource
+def get_report_executor():
+    """Background threads, shared by all sessions, that render the PDF reports."""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-report")
+
+def start_report_job(request):
+    """
+    Starts rendering the PDF for a pdf_request off the script thread and
+    keeps the pending result in session state. Requesting the same inputs
+    again reuses the job.
+    """
+    from utils.report_generator import generate_pdf_report, report_cache_key
+    user_data, results, alerts, recs = request
+    key = report_cache_key(user_data, results, alerts, recs, datetime.datetime.now())
+    job = st.session_state.get('pdf_job')
+    if job is None or job['key'] != key:
+        future = get_report_executor().submit(generate_pdf_report, user_data, results, alerts, recs, template=True)
+        job = {'key': key, 'future': future}
+    job['request'] = request
+    st.session_state['pdf_job'] = job
+    return job
+
+@st.fragment
+def pdf_download_section():
+    """
+    The session's report, rendered only once asked for: the first click
+    starts it and reruns just this fragment, then the download button
+    serves it.
+    """
+    request = st.session_state.get('pdf_request')
+    if request is None:
+        return
+    job = st.session_state.get('pdf_job')
+    if job is None or job['request'] != request:
+        prepare = st.empty()
+        if not prepare.button("📄 Prepare PDF Report", key="pdf_prepare"):
+            return
+        prepare.empty()
+        job = start_report_job(request)
+    future = job['future']
+    if not future.done():
+        with st.spinner("Preparing your PDF report..."):
+            wait([future])
+    if future.exception() is not None:
+        st.error(f"Could not generate the PDF report: {future.exception()}")
+        return
+    st.download_button(
+        label="📥 Download Health Report (PDF)",
+        data=future.result(),
+        file_name="Health_Report.pdf",
+        mime="application/pdf",
+        key="pdf_download"
+    )
+
+def main():
+    st.set_page_config(page_title="Check Your Health", page_icon="🩺", layout="wide")
+    apply_custom_style()
+
+    st.title("🏥 Health Risk Assessment")
+    st.markdown("Enter your vitals below. Our system observes strict medical thresholds to evaluate your health.")
+
+    with st.form("health_form"):
+        st.subheader("📝 Patient Information")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            age = st.number_input("Age (Years)", min_value=1, max_value=120, value=30)
+            gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+            patient_id = st.text_input("Patient ID (optional)", help="Saves this assessment to the patient's history, shown on the Dashboard")
+        with c2:
+            height = st.number_input("Height (cm)", min_value=50, max_value=250, value=170)
+        with c3:
+            weight = st.number_input("Weight (kg)", min_value=10, max_value=300, value=70)
         
-    st.subheader("🩺 Vitals Measurements")
-    c4, c5, c6 = st.columns(3)
-    with c4:
-        systolic = st.number_input("Systolic BP (mmHg)", min_value=50, max_value=300, value=120)
-        diastolic = st.number_input("Diastolic BP (mmHg)", min_value=30, max_value=200, value=80)
-    with c5:
-        sugar = st.number_input("Blood Sugar (mg/dL)", min_value=20, max_value=600, value=95, help="Random / Post-prandial Glucose")
-        heart_rate = st.number_input("Heart Rate (bpm)", min_value=30, max_value=220, value=72)
-    with c6:
-        st.write("") # Spacer
-
-    submit_btn = st.form_submit_button("Analyze Results")
-
-if submit_btn:
-    # Calculations
-    bmi = calculate_bmi(height, weight)
-    bmi_cat, bmi_color = classify_bmi(bmi)
+        st.subheader("🩺 Vitals Measurements")
+        c4, c5, c6 = st.columns(3)
+        with c4:
+            systolic = st.number_input("Systolic BP (mmHg)", min_value=50, max_value=300, value=120)
+            diastolic = st.number_input("Diastolic BP (mmHg)", min_value=30, max_value=200, value=80)
+        with c5:
+            sugar = st.number_input("Blood Sugar (mg/dL)", min_value=20, max_value=600, value=95, help="Random / Post-prandial Glucose")
+            heart_rate = st.number_input("Heart Rate (bpm)", min_value=30, max_value=220, value=72)
+        with c6:
+            spo2 = st.number_input("SpO2 (%)", min_value=50, max_value=100, value=98, help="Oxygen saturation, used by the AI risk model")
+
+        submit_btn = st.form_submit_button("Analyze Results")
+
+    if submit_btn:
+        # Calculations
+        bmi = calculate_bmi(height, weight)
+        bmi_cat, bmi_color = classify_bmi(bmi)
     
-    bp_cat, bp_color = classify_bp(systolic, diastolic)
+        bp_cat, bp_color = classify_bp(systolic, diastolic)
     
-    sugar_cat, sugar_color = classify_sugar(sugar)
+        sugar_cat, sugar_color = classify_sugar(sugar)
     
-    health_score = calculate_health_score(bmi, systolic, diastolic, sugar, heart_rate, age)
-    health_status, status_color = get_health_status(health_score)
-    risk_level = get_risk_assessment(health_score)
+        health_score = calculate_health_score(bmi, systolic, diastolic, sugar, heart_rate, age)
+        health_status, status_color = get_health_status(health_score)
+        risk_level = get_risk_assessment(health_score)
     
-    risk_color_map = {"Low Risk": "green", "Medium Risk": "orange", "High Risk": "red"}
-    risk_color = risk_color_map.get(risk_level, "blue")
+        risk_color_map = {"Low Risk": "green", "Medium Risk": "orange", "High Risk": "red"}
+        risk_color = risk_color_map.get(risk_level, "blue")
+
+        if patient_id.strip():
+            get_history_store().add(patient_id.strip(), {
+                "age": age, "height": height, "weight": weight, "systolic": systolic, "diastolic": diastolic,
+                "sugar": sugar, "heart_rate": heart_rate, "spo2": spo2,
+                "bmi": bmi, "health_score": health_score, "risk_level": risk_level
+            })
+            st.toast(f"Assessment saved to the history of {patient_id.strip()}")
     
-    # --- Summary Section ---
-    st.divider()
+        # --- Summary Section ---
+        st.divider()
     
-    # Large Summary Card
-    st.markdown(f"""
+        # Large Summary Card
+        st.markdown(f"""
         <div class="summary-card">
             <div class="summary-title">Overall Health Status</div>
             <div class="summary-risk" style="color: {risk_color_map.get(risk_level, 'black')}">{risk_level}</div>
@@ -81,46 +175,62 @@ if submit_btn:
     """, unsafe_allow_html=True)
 
     
-    st.subheader("📊 Detailed Vitals")
+        st.subheader("📊 Detailed Vitals")
+
+        # Where the patient sits in the cohort (the cohort has no blood sugar column)
+        cohort = get_percentile_store().get()
+        peers = cohort.describe(age, gender)
+        ranks = cohort.percentiles({'BMI': bmi, 'BP_Systolic': systolic, 'BP_Diastolic': diastolic,
+                                    'Heart_Rate': heart_rate, 'SpO2': spo2}, age, gender) if cohort.n else {}
+        # A vital with no rows in the patient's stratum has no rank and is left out
+        ranks = {column: rank for column, rank in ranks.items() if rank is not None}
+        bp_rank = f"Systolic higher than {ranks['BP_Systolic']:.0f}% of {peers}" if 'BP_Systolic' in ranks else ""
+        hr_rank = f"bpm, higher than {ranks['Heart_Rate']:.0f}% of {peers}" if 'Heart_Rate' in ranks else "bpm"
     
-    # Detailed Cards
-    col1, col2, col3 = st.columns(3)
+        # Detailed Cards
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        card_component("Blood Pressure", f"{systolic}/{diastolic}", bp_cat, bp_color)
-    with col2:
-        card_component("Blood Sugar", f"{sugar}", sugar_cat, sugar_color, "mg/dL")
-    with col3:
-        card_component("Heart Rate", f"{heart_rate}", "Measured", "blue", "bpm")
+        with col1:
+            card_component("Blood Pressure", f"{systolic}/{diastolic}", bp_cat, bp_color, bp_rank)
+        with col2:
+            card_component("Blood Sugar", f"{sugar}", sugar_cat, sugar_color, "mg/dL")
+        with col3:
+            card_component("Heart Rate", f"{heart_rate}", "Measured", "blue", hr_rank)
+        with col4:
+            predictor = load_risk_predictor()
+            if predictor is not None:
+                ai_risk, ai_proba = predictor.predict_one(age, bmi, systolic, diastolic, heart_rate, spo2)
+                ai_color = {"Low": "green", "Medium": "orange", "High": "red"}.get(ai_risk, "blue")
+                card_component("AI Risk Prediction", ai_risk, f"{ai_proba[ai_risk]:.0%} confidence", ai_color)
+                drift = load_drift_monitor()
+                if drift is not None:
+                    inputs = {'Age': age, 'BMI': bmi, 'BP_Systolic': systolic, 'BP_Diastolic': diastolic,
+                              'Heart_Rate': heart_rate, 'SpO2': spo2}
+                    drift.observe(inputs)
+                    outside = drift.check(inputs)
+                    if outside:
+                        st.warning("Outside the model's training data: " +
+                                   ", ".join(f"{f} {v:g} (trained on {lo:g}-{hi:g})" for f, v, lo, hi in outside) +
+                                   ". Treat the AI prediction with caution.")
+            else:
+                card_component("AI Risk Prediction", "N/A", "Model not trained", "blue")
+
+        shown = [(label, ranks[column]) for column, label in
+                 (('BMI', 'BMI'), ('BP_Diastolic', 'diastolic BP'), ('SpO2', 'SpO2')) if column in ranks]
+        if shown:
+            parts = [f"your {label} {'is higher ' if i == 0 else ''}than {rank:.0f}%" for i, (label, rank) in enumerate(shown)]
+            compared = parts[0] if len(parts) == 1 else ", ".join(parts[:-1]) + " and " + parts[-1]
+            st.caption(f"Compared with {peers}, {compared} of them.")
 
         
-    # Recommendations & Alerts
-    st.divider()
+        # Recommendations & Alerts
+        st.divider()
     
-    alerts = get_detailed_alerts(bmi, systolic, diastolic, sugar)
-    recs = get_smart_recommendations(risk_level, alerts) # Alerts is list of tuples here, passing direct
-    
-    r_col1, r_col2 = st.columns([1, 1])
-    
-    with r_col1:
-        st.subheader("⚠️ Medical Alerts")
-        if alerts:
-            for title, msg in alerts:
-                st.error(f"**{title}**: {msg}")
-        else:
-            st.success("✅ No critical medical alerts detected.")
-            
-    with r_col2:
-        st.subheader("💡 Lifestyle Recommendations")
-        for rec in recs:
-            st.info(f"• {rec}")
-            
-    # --- PDF Generation ---
-    st.divider()
-    col_dl, col_sp = st.columns([1, 2])
-    with col_dl:
+        alerts = get_detailed_alerts(bmi, systolic, diastolic, sugar)
+        recs = get_smart_recommendations(risk_level, alerts) # Alerts is a tuple of (title, msg) pairs here, passing direct
+
         if has_pdf_lib:
-            # Prepare data
+            # Kept for the download section, which renders the report on request
             user_data = {
                 "age": age, "gender": gender, "height": height, "weight": weight,
                 "systolic": systolic, "diastolic": diastolic, "sugar": sugar, "heart_rate": heart_rate
@@ -128,18 +238,34 @@ if submit_btn:
             results = {
                 "bmi": bmi, "bmi_cat": bmi_cat, "risk_level": risk_level, "health_score": health_score
             }
+            st.session_state['pdf_request'] = (user_data, results, alerts, recs)
+    
+        r_col1, r_col2 = st.columns([1, 1])
+    
+        with r_col1:
+            st.subheader("⚠️ Medical Alerts")
+            if alerts:
+                for title, msg in alerts:
+                    st.error(f"**{title}**: {msg}")
+            else:
+                st.success("✅ No critical medical alerts detected.")
             
-            pdf_file = generate_pdf_report(user_data, results, alerts, recs)
+        with r_col2:
+            st.subheader("💡 Lifestyle Recommendations")
+            for rec in recs:
+                st.info(f"• {rec}")
             
-            st.download_button(
-                label="📥 Download Health Report (PDF)",
-                data=pdf_file,
-                file_name="Health_Report.pdf",
-                mime="application/pdf",
-                key="pdf_download"
-            )
-        else:
-            st.warning("⚠️ PDF Generator library not installed. Please install 'fpdf'.")
-
-    # Disclaimer
-    st.markdown('<div class="medical-disclaimer">⚠️ This application is for educational purposes only and not a medical diagnosis. Please consult a healthcare professional for advice.</div>', unsafe_allow_html=True)
+        # --- PDF Generation ---
+        st.divider()
+        col_dl, col_sp = st.columns([1, 2])
+        with col_dl:
+            if has_pdf_lib:
+                pdf_download_section()
+            else:
+                st.warning("⚠️ PDF Generator library not installed. Please install 'fpdf'.")
+
+        # Disclaimer
+        st.markdown('<div class="medical-disclaimer">⚠️ This application is for educational purposes only and not a medical diagnosis. Please consult a healthcare professional for advice.</div>', unsafe_allow_html=True)
+
+with start_page_run("health_monitoring"):
+    main()
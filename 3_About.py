@@ -1,12 +1,14 @@
 import streamlit as st
 from utils.ui_helper import apply_custom_style
+from utils.instrumentation import start_page_run
 
-st.set_page_config(page_title="About", page_icon="ℹ️")
-apply_custom_style()
+def main():
+    st.set_page_config(page_title="About", page_icon="ℹ️")
+    apply_custom_style()
 
-st.title("ℹ️ About the Metrics")
+    st.title("ℹ️ About the Metrics")
 
-st.markdown("""
+    st.markdown("""
 This application uses standard medical ranges to evaluate your health. Here is a breakdown of the metrics used:
 
 ### 1. BMI (Body Mass Index)
@@ -37,3 +39,6 @@ The **Anti-Gravity Health Score** starts at 100 (Perfect).
 ---
 **Disclaimer:** This tool is for educational purposes only and does not replace professional medical advice.
 """)
+
+with start_page_run("about"):
+    main()
@@ -1,16 +1,18 @@
 import streamlit as st
 from utils.ui_helper import apply_custom_style
+from utils.instrumentation import start_page_run
 
-st.set_page_config(
-    page_title="Anti-Gravity Health",
-    page_icon="🩺",
-    layout="wide"
-)
-apply_custom_style()
+def main():
+    st.set_page_config(
+        page_title="Anti-Gravity Health",
+        page_icon="🩺",
+        layout="wide"
+    )
+    apply_custom_style()
 
-st.title("🩺 Anti-Gravity – AI Health Monitoring System")
+    st.title("🩺 Anti-Gravity – AI Health Monitoring System")
 
-st.markdown("""
+    st.markdown("""
 ### Welcome to the Future of Personal Health Monitoring
 This intelligent system uses Artificial Intelligence to analyze your vital signs and provide instant health risk assessments.
 
@@ -26,13 +28,16 @@ This intelligent system uses Artificial Intelligence to analyze your vital signs
 - **About**: Learn more about the parameters and the project.
 """)
 
-st.subheader("Quick Navigation")
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.page_link("pages/1_Dashboard.py", label="Go to Dashboard", icon="📊")
-with col2:
-    st.page_link("pages/2_Health_Monitoring.py", label="Start Health Check", icon="🩺")
-with col3:
-    st.page_link("pages/3_About.py", label="Read About", icon="ℹ️")
+    st.subheader("Quick Navigation")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.page_link("pages/1_Dashboard.py", label="Go to Dashboard", icon="📊")
+    with col2:
+        st.page_link("pages/2_Health_Monitoring.py", label="Start Health Check", icon="🩺")
+    with col3:
+        st.page_link("pages/3_About.py", label="Read About", icon="ℹ️")
 
-st.info("💡 Note: This is a demonstration project using synthetic data.")
+    st.info("💡 Note: This is a demonstration project using synthetic data.")
+
+with start_page_run("home"):
+    main()
@@ -0,0 +1,712 @@
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+import sys
+import numpy as np
+from utils.data_generator import write_synthetic_dataset, iter_synthetic_chunks
+from utils.dashboard_stats import CohortSummary
+from utils.health_metrics import (
+    calculate_bmi, classify_bmi, classify_bp, classify_sugar,
+    calculate_health_score, get_health_status, get_risk_assessment, calculate_bmi_batch,
+    get_detailed_alerts, get_smart_recommendations, get_alert_flags_batch,
+    get_recommendation_ids_batch, score_batch, ALERT_TABLE, RECOMMENDATION_SETS
+)
+
+def bench_parallel_generation(n=20_000_000, chunk_size=1_000_000, worker_counts=None, fmt="parquet"):
+    """
+    Times write_synthetic_dataset at several worker counts and reports rows/sec.
+    Defaults to 1, 2, 4 and all cores.
+    """
+    if worker_counts is None:
+        cores = os.cpu_count() or 1
+        worker_counts = sorted({1, 2, 4, cores})
+
+    results = []
+    for workers in worker_counts:
+        out_dir = tempfile.mkdtemp(prefix="cohort_bench_")
+        try:
+            start = time.perf_counter()
+            write_synthetic_dataset(out_dir, n, chunk_size, seed=42, fmt=fmt, workers=workers)
+            elapsed = time.perf_counter() - start
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+        rows_per_sec = n / elapsed
+        results.append((workers, elapsed, rows_per_sec))
+        print(f"workers={workers:<3d} {elapsed:8.2f}s  {rows_per_sec:14,.0f} rows/sec")
+
+    return results
+
+def _random_vitals(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "age": rng.integers(1, 121, n),
+        "height": rng.integers(50, 251, n),
+        "weight": rng.integers(10, 301, n),
+        "systolic": rng.integers(50, 301, n),
+        "diastolic": rng.integers(30, 201, n),
+        "sugar": rng.integers(20, 601, n),
+        "heart_rate": rng.integers(30, 221, n),
+    }
+
+def bench_health_metrics_batch(n=1_000_000):
+    """Compares score_batch against a Python loop over the scalar functions."""
+    data = _random_vitals(n)
+    rows = list(zip(*(data[k].tolist() for k in ("age", "height", "weight", "systolic", "diastolic", "sugar", "heart_rate"))))
+
+    start = time.perf_counter()
+    for age, height, weight, systolic, diastolic, sugar, heart_rate in rows:
+        bmi = calculate_bmi(height, weight)
+        classify_bmi(bmi)
+        classify_bp(systolic, diastolic)
+        classify_sugar(sugar)
+        score = calculate_health_score(bmi, systolic, diastolic, sugar, heart_rate, age)
+        get_health_status(score)
+        get_risk_assessment(score)
+    loop_time = time.perf_counter() - start
+
+    print(f"python loop        {loop_time:8.3f}s  {n / loop_time:14,.0f} rows/sec")
+    for labels in (True, False):
+        start = time.perf_counter()
+        score_batch(data, labels=labels)
+        batch_time = time.perf_counter() - start
+        print(f"score_batch({'labels' if labels else 'codes '}) {batch_time:8.3f}s  {n / batch_time:14,.0f} rows/sec  ({loop_time / batch_time:.0f}x)")
+
+def bench_alert_engine(n=1_000_000):
+    """
+    Times alerts + recommendations per patient through the scalar functions
+    and through the bitmask tables, and checks both give the same answer for
+    every row.
+    """
+    data = _random_vitals(n)
+    bmi = calculate_bmi_batch(data["height"], data["weight"])
+    rows = list(zip(bmi.tolist(), *(data[k].tolist() for k in ("systolic", "diastolic", "sugar"))))
+
+    start = time.perf_counter()
+    scalar = [get_smart_recommendations(None, get_detailed_alerts(*row)) for row in rows]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flags = get_alert_flags_batch(bmi, data["systolic"], data["diastolic"], data["sugar"])
+    rec_ids = get_recommendation_ids_batch(flags)
+    batch_time = time.perf_counter() - start
+
+    assert all(get_detailed_alerts(*row) is ALERT_TABLE[f] for row, f in zip(rows, flags.tolist()))
+    assert all(recs is RECOMMENDATION_SETS[i] for recs, i in zip(scalar, rec_ids.tolist()))
+    print(f"scalar alerts+recs {loop_time:8.3f}s  {n / loop_time:14,.0f} rows/sec  ({loop_time / n * 1e6:.2f} us/row)")
+    print(f"bitmask tables     {batch_time:8.3f}s  {n / batch_time:14,.0f} rows/sec  ({loop_time / batch_time:.0f}x)")
+
+_COLD_START_SNIPPET = """
+import time, resource
+start = time.perf_counter()
+from utils import model_inference
+predictor = model_inference.{loader}()
+predictor.predict_one(30, 24.0, 120, 80, 72, 98)
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def bench_model_loading():
+    """
+    Cold start (import + load + first prediction) and peak RSS in a fresh
+    process, for the pickles and for the memory-mapped artifact.
+    """
+    results = {}
+    for loader in ("load_predictor", "load_artifact_predictor"):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", _COLD_START_SNIPPET.format(loader=loader)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        elapsed, max_rss_kb = float(out[0]), int(out[1])
+        results[loader] = (elapsed, max_rss_kb)
+        print(f"{loader:<24s} {elapsed * 1000:8.1f} ms  {max_rss_kb / 1024:7.1f} MB peak RSS")
+    return results
+
+def bench_forest_predictor(batch_sizes=(1, 100, 10_000, 100_000), repeat=5):
+    """
+    Compares sklearn's RandomForestClassifier.predict_proba with the compiled
+    FlatForest on the same scaled rows, per batch size (best of `repeat`).
+    """
+    import pickle
+    from utils.model_artifact import MODEL_PATH, compile_forest
+    from utils.model_inference import load_predictor
+    from utils.data_generator import generate_synthetic_data_vectorized
+
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    predictor = load_predictor()
+    forest = compile_forest(model)
+
+    results = []
+    for n in batch_sizes:
+        X = predictor._features(generate_synthetic_data_vectorized(n, seed=n)).astype(np.float32)
+        times = {}
+        for name, fn in (("sklearn", model.predict_proba), ("flat", forest.predict_proba)):
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn(X)
+                best = min(best, time.perf_counter() - start)
+            times[name] = best
+        results.append((n, times["sklearn"], times["flat"]))
+        print(f"batch={n:<7d} sklearn {times['sklearn'] * 1000:9.2f} ms  flat {times['flat'] * 1000:9.2f} ms  ({times['sklearn'] / times['flat']:.1f}x)")
+    return results
+
+_PREPROCESS_MEMORY_SNIPPET = """
+import resource
+from utils.data_generator import generate_synthetic_data_vectorized
+from utils.preprocessor import preprocess_data
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+df = generate_synthetic_data_vectorized({n})
+before = rss_kb()
+# Reset the peak so ru_maxrss/VmHWM only reflect preprocessing
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+preprocess_data(df, compact={compact})
+with open("/proc/self/status") as f:
+    peak = next(int(l.split()[1]) for l in f if l.startswith("VmHWM:"))
+print(before, peak)
+"""
+
+def bench_preprocess_memory(n=10_000_000):
+    """
+    Peak RSS added by preprocess_data on an n-row cohort, default vs compact,
+    each in a fresh process (Linux only: reads /proc/self/status).
+    """
+    results = {}
+    for compact in (False, True):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", _PREPROCESS_MEMORY_SNIPPET.format(n=n, compact=compact)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split()
+        before_kb, peak_kb = int(out[0]), int(out[1])
+        results["compact" if compact else "default"] = (before_kb, peak_kb)
+        print(f"{'compact' if compact else 'default':<8s} data {before_kb / 1024:8.0f} MB  peak {peak_kb / 1024:8.0f} MB  "
+              f"(+{(peak_kb - before_kb) / 1024:.0f} MB for preprocessing)")
+    return results
+
+def bench_dashboard_summary(n=10_000_000, chunk_size=1_000_000):
+    """
+    Dashboard cost per rerun: aggregating the raw rows with pandas (what the
+    page did before) vs reading the same numbers off a CohortSummary, plus
+    the one-off cost of folding each chunk into the summary.
+    """
+    import pandas as pd
+    summary = CohortSummary()
+    chunks = []
+    update_time = 0.0
+    for chunk in iter_synthetic_chunks(n, chunk_size):
+        start = time.perf_counter()
+        summary.update(chunk)
+        update_time += time.perf_counter() - start
+        chunks.append(chunk)
+    df = pd.concat(chunks, ignore_index=True)
+    del chunks
+
+    start = time.perf_counter()
+    len(df[df['Risk_Level'] == 'High'])
+    df['Age'].mean()
+    df['Risk_Level'].value_counts()
+    df.groupby('Risk_Level')['SpO2'].quantile([0.25, 0.5, 0.75])
+    pd.cut(df['BP_Systolic'], 30).groupby(df['Risk_Level'], observed=True).value_counts()
+    raw_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    summary.count('High')
+    summary.mean('Age')
+    summary.box_stats('SpO2')
+    summary.histogram_frame('BP_Systolic', nbins=30)
+    summary.sample_frame()
+    summary_time = time.perf_counter() - start
+
+    print(f"summary update     {update_time / (n / chunk_size) * 1000:8.1f} ms per {chunk_size:,}-row chunk")
+    print(f"raw aggregation    {raw_time * 1000:8.1f} ms per rerun ({n:,} rows)")
+    print(f"from summary       {summary_time * 1000:8.1f} ms per rerun ({raw_time / summary_time:.0f}x)")
+
+def bench_chart_payload(sizes=(10_000, 100_000, 1_000_000)):
+    """Plotly JSON sent to the browser for the Dashboard charts: raw rows vs binned summary."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from utils.data_generator import generate_synthetic_data_vectorized
+    for n in sizes:
+        df = generate_synthetic_data_vectorized(n)
+        summary = CohortSummary.from_frame(df)
+        raw = [
+            px.scatter(df, x='BMI', y='Heart_Rate', color='Risk_Level'),
+            px.histogram(df, x='BP_Systolic', color='Risk_Level', nbins=30),
+            px.box(df, x='Risk_Level', y='SpO2'),
+        ]
+        box = summary.box_stats('SpO2')
+        x_edges, y_edges, z = summary.density_grid()
+        binned = [
+            px.scatter(summary.sample_frame(), x='BMI', y='Heart_Rate', color='Risk_Level'),
+            go.Figure(go.Heatmap(x=x_edges, y=y_edges, z=z)),
+            px.bar(summary.histogram_frame('BP_Systolic', nbins=30), x='BP_Systolic', y='count', color='Risk_Level'),
+            go.Figure(go.Box(x=box['Risk_Level'], q1=box['q1'], median=box['median'], q3=box['q3'],
+                             lowerfence=box['lowerfence'], upperfence=box['upperfence'])),
+        ]
+        raw_bytes = sum(len(fig.to_json()) for fig in raw)
+        binned_bytes = sum(len(fig.to_json()) for fig in binned)
+        print(f"{n:>10,} rows  raw {raw_bytes / 1e6:8.2f} MB  binned {binned_bytes / 1e6:6.2f} MB")
+
+def bench_bulk_reports(n=2000, worker_counts=None, batch_size=50):
+    """Reports/sec of bulk_reports.generate_reports into a ZIP for each worker count."""
+    from utils.bulk_reports import generate_reports, build_report_record
+    data = _random_vitals(n)
+    vitals = [dict(zip(data, values), gender="Female") for values in zip(*(data[k].tolist() for k in data))]
+    records = [build_report_record(v) for v in vitals]
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, os.cpu_count() or 1})
+
+    out_dir = tempfile.mkdtemp(prefix="bench_reports_")
+    try:
+        for workers in worker_counts:
+            path = os.path.join(out_dir, f"reports-{workers}.zip")
+            start = time.perf_counter()
+            generate_reports(records, path, workers=workers, batch_size=batch_size, progress=False)
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3d} {elapsed:8.2f}s  {n / elapsed:10,.0f} reports/sec  "
+                  f"{os.path.getsize(path) / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(out_dir)
+
+def bench_pdf_report(repeat=2000):
+    """Per-report latency of generate_pdf_report: full FPDF render vs template vs cache hit."""
+    from utils.bulk_reports import build_report_record
+    from utils.report_generator import generate_pdf_report, generate_pdf_report_template
+    record = build_report_record({"age": 58, "height": 170, "weight": 95, "systolic": 150,
+                                  "diastolic": 95, "sugar": 210, "heart_rate": 80, "gender": "Male"})
+    modes = [
+        ("fpdf", lambda: generate_pdf_report(*record)),
+        ("template", lambda: generate_pdf_report_template(*record, cache=False)),
+        ("cached", lambda: generate_pdf_report_template(*record)),
+    ]
+    baseline = None
+    for name, render in modes:
+        render()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        per_report = (time.perf_counter() - start) / repeat
+        baseline = baseline or per_report
+        print(f"{name:<9s} {per_report * 1000:8.3f} ms/report  ({baseline / per_report:.1f}x)")
+
+def bench_patient_history(n_patients=2000, readings=1000, batch_patients=500, repeat=50):
+    """Bulk insert rate of the patient history store and query latency for one patient."""
+    from utils.patient_history import PatientHistoryStore, generate_history
+    out_dir = tempfile.mkdtemp(prefix="bench_history_")
+    try:
+        store = PatientHistoryStore(os.path.join(out_dir, "history.db"))
+        insert_time = 0.0
+        for first in range(0, n_patients, batch_patients):
+            batch = generate_history(min(batch_patients, n_patients - first), readings, seed=first, first_patient=first)
+            start = time.perf_counter()
+            store.add_many(batch)
+            insert_time += time.perf_counter() - start
+        total = n_patients * readings
+        print(f"add_many       {insert_time:8.2f}s  {total / insert_time:10,.0f} readings/sec  "
+              f"({total:,} readings, {os.path.getsize(store.path) / 1e6:.0f} MB)")
+
+        patient_id = store.patients(limit=1)[0]
+        queries = [
+            ("history", lambda: store.history(patient_id)),
+            ("latest(20)", lambda: store.latest(patient_id, 20)),
+            ("rolling 30d", lambda: store.rolling_means(patient_id, 30 * 86400)),
+            ("window_stats", lambda: store.window_stats(patient_id, 0, time.time() - 90 * 86400)),
+            ("summary", lambda: store.summary(patient_id)),
+        ]
+        for name, query in queries:
+            query()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                query()
+            print(f"{name:<14s} {(time.perf_counter() - start) / repeat * 1000:8.3f} ms")
+    finally:
+        shutil.rmtree(out_dir)
+
+def bench_stream_monitor(n_patients=2000, readings=100, connection_counts=(1, 4, 16)):
+    """Readings/sec of the streaming monitor, replayed over local TCP connections."""
+    import asyncio
+    from utils.stream_monitor import generate_readings, run_load_test
+    lines = generate_readings(n_patients, readings)
+    for connections in connection_counts:
+        stats = asyncio.run(run_load_test(lines, connections))
+        print(f"connections={connections:<3d} {stats['seconds']:8.2f}s  {stats['readings_per_sec']:10,.0f} readings/sec  "
+              f"{stats['alerts']:,} alerts  ~{stats['bytes_per_patient']:,.0f} bytes/patient")
+
+def import_time_report(module, top=10):
+    """
+    Runs `python -X importtime -c "import <module>"` in a fresh process and
+    sums the self time per top-level package, so it is easy to see which
+    dependency a module drags in. Returns (total_ms, [(package, ms), ...]).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    by_package = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0) + int(self_us)
+        if not name.startswith("  "):
+            # Unindented entries are the top-level imports; their cumulative times add up to the total
+            total_us += int(cumulative_us)
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total_us / 1000, [(package, us / 1000) for package, us in ranked]
+
+_PAGE_STARTUP_SNIPPET = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+ready = time.perf_counter()
+app = AppTest.from_file({path!r}, default_timeout=300)
+app.run()
+first = time.perf_counter()
+app.run()
+print(ready - start, first - ready, time.perf_counter() - first, len(app.exception))
+"""
+
+STARTUP_MODULES = ["utils.health_metrics", "utils.model_inference", "utils.report_generator",
+                   "utils.dashboard_stats", "utils.model_trainer"]
+STARTUP_PAGES = ["1_Dashboard.py", "2_Health_Monitoring.py"]
+
+def bench_startup(modules=STARTUP_MODULES, pages=STARTUP_PAGES, top=5):
+    """
+    Cold-start costs, each measured in a fresh interpreter: the import time of
+    the project modules (with the heaviest packages they pull in) and the
+    first and second run of each Streamlit page under AppTest.
+    """
+    for module in modules:
+        total, ranked = import_time_report(module, top)
+        heaviest = ", ".join(f"{package} {ms:.0f}" for package, ms in ranked)
+        print(f"import {module:<24s} {total:8.0f} ms  ({heaviest})")
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for page in pages:
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c",
+                              _PAGE_STARTUP_SNIPPET.format(path=os.path.join(here, page))],
+                             capture_output=True, text=True, check=True).stdout.split()
+        _, first, rerun, errors = float(out[0]), float(out[1]), float(out[2]), int(out[3])
+        print(f"page   {page:<24s} first run {first * 1000:8.0f} ms  rerun {rerun * 1000:6.0f} ms"
+              + (f"  ({errors} exceptions)" if errors else ""))
+
+# --- Regression suite ---
+# The bench_* functions above are one-off studies at production sizes. The
+# suite below times every hot path at small, fixed sizes so it can run before
+# and after each change: results are saved as JSON and compared with a stored
+# baseline. Timings only compare on the same machine, so both live under data/.
+
+RESULTS_DIR = os.path.join("data", "benchmarks")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+REGRESSION_THRESHOLD = 0.20
+
+def _scalar_cases(rows):
+    """One case per scalar health_metrics function, each looping over the same rows."""
+    bmis = [calculate_bmi(height, weight) for _, height, weight, *_ in rows]
+    scores = [calculate_health_score(bmi, s, d, g, hr, age)
+              for bmi, (age, _, _, s, d, g, hr) in zip(bmis, rows)]
+    alerts = [get_detailed_alerts(bmi, s, d, g) for bmi, (_, _, _, s, d, g, _) in zip(bmis, rows)]
+    return {
+        "calculate_bmi": lambda: [calculate_bmi(h, w) for _, h, w, *_ in rows],
+        "classify_bmi": lambda: [classify_bmi(b) for b in bmis],
+        "classify_bp": lambda: [classify_bp(s, d) for _, _, _, s, d, _, _ in rows],
+        "classify_sugar": lambda: [classify_sugar(g) for _, _, _, _, _, g, _ in rows],
+        "calculate_health_score": lambda: [calculate_health_score(b, s, d, g, hr, age)
+                                           for b, (age, _, _, s, d, g, hr) in zip(bmis, rows)],
+        "get_health_status": lambda: [get_health_status(score) for score in scores],
+        "get_risk_assessment": lambda: [get_risk_assessment(score) for score in scores],
+        "get_detailed_alerts": lambda: [get_detailed_alerts(b, s, d, g) for b, (_, _, _, s, d, g, _) in zip(bmis, rows)],
+        "get_smart_recommendations": lambda: [get_smart_recommendations(None, a) for a in alerts],
+    }
+
+def _batch_cases(data):
+    """One case per batch health_metrics function on the same arrays."""
+    from utils import health_metrics as hm
+    bmi = hm.calculate_bmi_batch(data["height"], data["weight"])
+    score = hm.calculate_health_score_batch(bmi, data["systolic"], data["diastolic"], data["sugar"],
+                                            data["heart_rate"], data["age"])
+    flags = hm.get_alert_flags_batch(bmi, data["systolic"], data["diastolic"], data["sugar"])
+    return {
+        "calculate_bmi_batch": lambda: hm.calculate_bmi_batch(data["height"], data["weight"]),
+        "classify_bmi_batch": lambda: hm.classify_bmi_batch(bmi),
+        "classify_bp_batch": lambda: hm.classify_bp_batch(data["systolic"], data["diastolic"]),
+        "classify_sugar_batch": lambda: hm.classify_sugar_batch(data["sugar"]),
+        "calculate_health_score_batch": lambda: hm.calculate_health_score_batch(
+            bmi, data["systolic"], data["diastolic"], data["sugar"], data["heart_rate"], data["age"]),
+        "get_health_status_batch": lambda: hm.get_health_status_batch(score),
+        "get_risk_assessment_batch": lambda: hm.get_risk_assessment_batch(score),
+        "get_alert_flags_batch": lambda: hm.get_alert_flags_batch(bmi, data["systolic"], data["diastolic"], data["sugar"]),
+        "get_recommendation_ids_batch": lambda: hm.get_recommendation_ids_batch(flags),
+        "score_batch": lambda: hm.score_batch(data),
+        "score_batch[codes]": lambda: hm.score_batch(data, labels=False),
+    }
+
+def _train_in_tempdir():
+    """train_and_save_model writes to models/ under the working directory, so it runs in a scratch one."""
+    import contextlib
+    import io
+    from utils.model_trainer import train_and_save_model
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="bench_train_")
+    try:
+        os.chdir(work_dir)
+        with contextlib.redirect_stdout(io.StringIO()):
+            train_and_save_model()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def _pdf_record():
+    from utils.bulk_reports import build_report_record
+    return build_report_record({"age": 58, "height": 170, "weight": 95, "systolic": 150,
+                                "diastolic": 95, "sugar": 210, "heart_rate": 80, "gender": "Male"})
+
+def _loaded(load):
+    """Returns `load` once it has loaded successfully, so missing artifacts skip the case."""
+    load()
+    return load
+
+def suite_cases(scalar_rows=10_000, batch_rows=1_000_000):
+    """
+    Yields (name, setup, items) for every case. setup() prepares the inputs
+    and returns the function to time; one call covers `items` rows or calls.
+    Inputs shared by several cases are built once, and only for cases that
+    actually run.
+    """
+    from functools import lru_cache
+    from utils.data_generator import generate_synthetic_data, generate_synthetic_data_vectorized
+    from utils.preprocessor import preprocess_data
+    from utils.report_generator import generate_pdf_report, generate_pdf_report_template
+    from utils.model_inference import load_predictor, load_artifact_predictor
+    from utils.stream_monitor import StreamMonitor
+    from utils.cohort_percentiles import CohortPercentileIndex
+    from utils.drift_monitor import DriftMonitor, DriftSketch
+
+    cohort = lru_cache(maxsize=None)(generate_synthetic_data_vectorized)
+    vitals = lru_cache(maxsize=None)(_random_vitals)
+    predictor = lru_cache(maxsize=None)(load_predictor)
+
+    @lru_cache(maxsize=None)
+    def scalar_cases():
+        data = vitals(scalar_rows)
+        rows = list(zip(*(data[k].tolist() for k in ("age", "height", "weight", "systolic", "diastolic", "sugar", "heart_rate"))))
+        return _scalar_cases(rows)
+
+    for n in (100, 1_000, 10_000):
+        yield f"data_generator.generate_synthetic_data[n={n}]", lambda n=n: lambda: generate_synthetic_data(n), n
+    for n in (10_000, 1_000_000):
+        yield (f"data_generator.generate_synthetic_data_vectorized[n={n}]",
+               lambda n=n: lambda: generate_synthetic_data_vectorized(n), n)
+
+    for n in (10_000, 1_000_000):
+        yield f"preprocessor.preprocess_data[n={n}]", lambda n=n: lambda df=cohort(n): preprocess_data(df), n
+        yield (f"preprocessor.preprocess_data[compact,n={n}]",
+               lambda n=n: lambda df=cohort(n): preprocess_data(df, compact=True), n)
+
+    yield "model_trainer.train_and_save_model", lambda: _train_in_tempdir, 1
+
+    for name in _scalar_cases([]):
+        yield f"health_metrics.{name}", lambda name=name: scalar_cases()[name], scalar_rows
+    for name in _batch_cases(vitals(0)):
+        yield f"health_metrics.{name}[n={batch_rows}]", lambda name=name: _batch_cases(vitals(batch_rows))[name], batch_rows
+
+    yield "report_generator.generate_pdf_report", lambda: lambda record=_pdf_record(): generate_pdf_report(*record), 1
+    yield ("report_generator.generate_pdf_report[template]",
+           lambda: lambda record=_pdf_record(): generate_pdf_report_template(*record, cache=False), 1)
+
+    percentile_index = lru_cache(maxsize=None)(lambda: CohortPercentileIndex.from_frame(cohort(1_000_000)))
+    yield ("cohort_percentiles.update[n=1000000]",
+           lambda: lambda df=cohort(1_000_000): CohortPercentileIndex().update(df), 1_000_000)
+    yield ("cohort_percentiles.percentiles",
+           lambda: lambda index=percentile_index(): index.percentiles(
+               {'BMI': 27.5, 'BP_Systolic': 135, 'BP_Diastolic': 85, 'Heart_Rate': 72, 'SpO2': 97}, 45, 'Female'), 1)
+
+    @lru_cache(maxsize=None)
+    def drift_monitor():
+        return DriftMonitor(DriftSketch().update(generate_synthetic_data(2000)))
+    def drift_case(n):
+        df, monitor = cohort(n), drift_monitor()
+        def run():
+            monitor.observe(df)
+            return monitor.out_of_range_mask(df)
+        return run
+    yield "drift_monitor.observe+mask[n=1000000]", lambda: drift_case(1_000_000), 1_000_000
+    yield "drift_monitor.scores", lambda: lambda monitor=drift_monitor(): monitor.scores(), 1
+
+    @lru_cache(maxsize=None)
+    def replay_data():
+        from utils.stream_monitor import generate_readings
+        return b"".join(generate_readings(500, 100))
+    yield "stream_monitor.feed[n=100000]", lambda: lambda data=replay_data(): StreamMonitor().feed(data), 100_000
+
+    # The model cases need trained artifacts in models/ and are skipped without them
+    yield "model_inference.load_predictor", lambda: _loaded(load_predictor), 1
+    yield "model_inference.load_artifact_predictor", lambda: _loaded(load_artifact_predictor), 1
+    yield "model_inference.predict_one", lambda: lambda p=predictor(): p.predict_one(45, 27.5, 135, 85, 72, 97), 1
+    yield ("model_inference.predict_batch[n=10000]",
+           lambda: lambda p=predictor(), X=cohort(10_000): p.predict_batch(X), 10_000)
+
+def time_case(fn, repeat=5):
+    """
+    Calls fn enough times per sample for the sample to take at least 0.2 s
+    (timeit's autorange) and takes `repeat` samples; cases where a single
+    call takes over a second get 3. Returns seconds per call: median, min
+    and max over the samples, plus the call counts.
+    """
+    import timeit
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    if number == 1 and elapsed > 1.0:
+        repeat = min(repeat, 3)
+    samples = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {"median": samples[len(samples) // 2], "min": samples[0], "max": samples[-1],
+            "number": number, "repeat": repeat}
+
+def _git_commit():
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(pattern=None, repeat=5, **sizes):
+    """
+    Times every suite case whose name contains `pattern` and returns the
+    results document: {"meta": {...}, "results": {name: timings}}, where
+    timings also carry `items` and `per_item` (median seconds per row/call).
+    """
+    import platform
+    import datetime
+    results = {}
+    for name, setup, items in suite_cases(**sizes):
+        if pattern and pattern not in name:
+            continue
+        try:
+            fn = setup()
+        except FileNotFoundError as e:
+            print(f"{name:<58s} skipped ({e})")
+            continue
+        timing = time_case(fn, repeat=repeat)
+        timing["items"] = items
+        timing["per_item"] = timing["median"] / items
+        results[name] = timing
+        print(f"{name:<58s} {timing['median'] * 1000:10.3f} ms  ({timing['per_item'] * 1e6:10.3f} us/item)")
+    meta = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    return {"meta": meta, "results": results}
+
+def save_results(report, path):
+    import json
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def load_results(path):
+    import json
+    with open(path) as f:
+        return json.load(f)
+
+def compare_results(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares the fastest sample of each case, the least noisy statistic (as
+    timeit's docs advise). Returns (name, baseline s, current s, ratio,
+    status) rows, status being "regression" when a case got slower by more
+    than `threshold` (0.2 = 20%), "improved" when it got faster by as much,
+    otherwise "ok"; cases only in one document are "new" or "missing".
+    """
+    rows = []
+    current, previous = report["results"], baseline["results"]
+    for name in list(previous) + [n for n in current if n not in previous]:
+        if name not in current:
+            rows.append((name, previous[name]["min"], None, None, "missing"))
+            continue
+        if name not in previous:
+            rows.append((name, None, current[name]["min"], None, "new"))
+            continue
+        before, now = previous[name]["min"], current[name]["min"]
+        ratio = now / before if before > 0 else float("inf")
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, before, now, ratio, status))
+    return rows
+
+def print_comparison(rows, baseline_meta):
+    print(f"\nCompared with baseline from {baseline_meta.get('created')} (commit {baseline_meta.get('commit')}):")
+    for name, before, now, ratio, status in rows:
+        if ratio is None:
+            print(f"  {status.upper():<10s} {name}")
+        elif status != "ok":
+            print(f"  {status.upper():<10s} {name:<58s} {before * 1000:10.3f} -> {now * 1000:10.3f} ms  ({ratio:.2f}x)")
+    counts = {s: sum(1 for row in rows if row[4] == s) for s in ("regression", "improved", "ok", "new", "missing")}
+    print("  " + ", ".join(f"{count} {status}" for status, count in counts.items()))
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare it with the stored baseline.")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per case")
+    parser.add_argument("--output", help="Results file (default: data/benchmarks/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Slowdown that counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--studies", action="store_true",
+                        help="Run the long comparative studies (bench_* functions) instead of the suite")
+    args = parser.parse_args()
+
+    if args.studies:
+        bench_parallel_generation()
+        bench_health_metrics_batch()
+        bench_alert_engine()
+        bench_model_loading()
+        bench_forest_predictor()
+        bench_preprocess_memory()
+        bench_dashboard_summary()
+        bench_chart_payload()
+        bench_pdf_report()
+        bench_bulk_reports()
+        bench_patient_history()
+        bench_stream_monitor()
+        bench_startup()
+        sys.exit(0)
+
+    report = run_suite(args.filter, repeat=args.repeat)
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    save_results(report, output)
+    print(f"\nResults saved to {output}")
+
+    regressions = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = load_results(args.baseline)
+        if args.filter:
+            baseline["results"] = {name: timing for name, timing in baseline["results"].items() if args.filter in name}
+        rows = compare_results(report, baseline, args.threshold)
+        print_comparison(rows, baseline["meta"])
+        regressions = sum(1 for row in rows if row[4] == "regression")
+    if args.save_baseline:
+        save_results(report, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    sys.exit(1 if regressions else 0)
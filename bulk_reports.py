@@ -0,0 +1,155 @@
+import os
+import re
+import sys
+import time
+import zipfile
+import argparse
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from utils.health_metrics import (
+    calculate_bmi, classify_bmi, calculate_health_score,
+    get_risk_assessment, get_detailed_alerts, get_smart_recommendations
+)
+from utils.bulk_scorer import REQUIRED_COLUMNS, DEFAULT_CHUNK_SIZE, iter_input_chunks
+from utils.report_generator import generate_pdf_report
+
+DEFAULT_BATCH_SIZE = 50
+
+def build_report_record(vitals):
+    """
+    Turns one patient's vitals (a dict with REQUIRED_COLUMNS, plus optional
+    gender and patient_id) into the (user_data, results, alerts, recs)
+    record generate_pdf_report takes, computed the same way as on the
+    Health Monitoring page.
+    """
+    user_data = {key: vitals[key] for key in REQUIRED_COLUMNS}
+    user_data["gender"] = vitals.get("gender", "N/A")
+    if "patient_id" in vitals:
+        user_data["patient_id"] = vitals["patient_id"]
+
+    bmi = calculate_bmi(vitals["height"], vitals["weight"])
+    bmi_cat, _ = classify_bmi(bmi)
+    health_score = calculate_health_score(bmi, vitals["systolic"], vitals["diastolic"],
+                                          vitals["sugar"], vitals["heart_rate"], vitals["age"])
+    risk_level = get_risk_assessment(health_score)
+    results = {"bmi": bmi, "bmi_cat": bmi_cat, "risk_level": risk_level, "health_score": health_score}
+
+    alerts = get_detailed_alerts(bmi, vitals["systolic"], vitals["diastolic"], vitals["sugar"])
+    recs = get_smart_recommendations(risk_level, alerts)
+    return user_data, results, alerts, recs
+
+def iter_file_records(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields report records for every row of a CSV/Parquet vitals file, one chunk in memory at a time."""
+    for chunk in iter_input_chunks(path, chunk_size):
+        missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+        for vitals in chunk.to_dict("records"):
+            yield build_report_record(vitals)
+
+def report_name(index, user_data):
+    """
+    File name for one report: its position in the input, followed by the
+    patient_id when given. The position keeps names unique when a patient
+    appears more than once or two ids sanitise to the same string.
+    """
+    patient_id = user_data.get("patient_id")
+    if patient_id is None:
+        return f"report-{index:06d}.pdf"
+    return f"{index:06d}-" + re.sub(r"[^A-Za-z0-9_.-]", "_", str(patient_id)) + ".pdf"
+
+def _render_batch(start, records):
+    """Worker task: renders a batch of records and returns (name, pdf bytes) pairs."""
+    return [(report_name(start + i, record[0]), generate_pdf_report(*record, template=True))
+            for i, record in enumerate(records)]
+
+class _ReportWriter:
+    """Writes PDFs into a .zip archive or, for any other path, a directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self._zip = None
+        if path.endswith(".zip"):
+            # PDF pages are already deflated, so storing avoids a second compression pass
+            self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True)
+        elif not os.path.exists(path):
+            os.makedirs(path)
+
+    def write(self, name, data):
+        if self._zip is not None:
+            self._zip.writestr(name, data)
+        else:
+            with open(os.path.join(self.path, name), "wb") as f:
+                f.write(data)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+def generate_reports(records, output_path, workers=1, batch_size=DEFAULT_BATCH_SIZE, progress=True):
+    """
+    Renders a PDF report for every (user_data, results, alerts, recs) record
+    and streams them into output_path (a .zip file or a directory). records
+    can be any iterable, including a generator over millions of patients.
+
+    Records are sent to workers in batches of batch_size. With workers > 1
+    (None for all cores) at most 2 * workers batches are in flight, and
+    finished batches are written in input order as soon as they are next in
+    line, so memory is bounded by the batch size rather than the number of
+    reports. Returns the number of reports written.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    writer = _ReportWriter(output_path)
+    total = 0
+    start = time.perf_counter()
+
+    def write_batch(rendered):
+        nonlocal total
+        for name, data in rendered:
+            writer.write(name, data)
+        total += len(rendered)
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"\r{total:,} reports  {total / max(elapsed, 1e-9):,.0f} reports/sec", end="", file=sys.stderr)
+
+    records = iter(records)
+    batches = iter(lambda: list(islice(records, batch_size)), [])
+    try:
+        if workers <= 1:
+            for batch in batches:
+                write_batch(_render_batch(total, batch))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = []
+                offset = 0
+                for batch in batches:
+                    pending.append(pool.submit(_render_batch, offset, batch))
+                    offset += len(batch)
+                    while len(pending) >= 2 * workers:
+                        write_batch(pending.pop(0).result())
+                for future in pending:
+                    write_batch(future.result())
+    finally:
+        writer.close()
+        if progress:
+            print(file=sys.stderr)
+
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render PDF health reports for a CSV/Parquet file of patient vitals.")
+    parser.add_argument("input", help="Input .csv or .parquet with columns: " + ", ".join(REQUIRED_COLUMNS)
+                                      + " (optional: gender, patient_id)")
+    parser.add_argument("output", help="Output .zip file or directory")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Reports per worker task")
+    parser.add_argument("--quiet", action="store_true", help="Disable the progress counter")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = generate_reports(iter_file_records(args.input), args.output, args.workers or None,
+                             args.batch_size, progress=not args.quiet)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {count:,} reports in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f} reports/sec) -> {args.output}")
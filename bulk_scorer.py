@@ -0,0 +1,155 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from utils.health_metrics import (
+    score_batch, get_recommendation_ids_batch, ALERT_TABLE, RECOMMENDATION_SETS
+)
+from utils.drift_monitor import model_inputs, OUT_OF_RANGE_NAMES
+
+REQUIRED_COLUMNS = ['age', 'height', 'weight', 'systolic', 'diastolic', 'sugar', 'heart_rate']
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Output text per alert bitmask and per recommendation set, from the same
+# tables the Health Monitoring page reads
+ALERT_TEXT = ["; ".join(title for title, _ in alerts) for alerts in ALERT_TABLE]
+REC_TEXT = [" | ".join(recs) for recs in RECOMMENDATION_SETS]
+OUT_OF_RANGE_TEXT = [", ".join(names) for names in OUT_OF_RANGE_NAMES]
+
+def track_drift(scored, drift):
+    """
+    Adds a scored chunk's model inputs to a DriftMonitor and flags, in a new
+    outside_training_range column, the inputs outside the training range.
+    The column is set in place (assign would copy the whole chunk).
+    """
+    inputs = model_inputs(scored)
+    drift.observe(inputs)
+    flags = drift.out_of_range_mask(inputs)
+    scored["outside_training_range"] = pd.Categorical.from_codes(flags, categories=OUT_OF_RANGE_TEXT)
+    return scored
+
+def score_chunk(chunk):
+    """Adds score, category, risk, alert and recommendation columns to one chunk."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing columns: {', '.join(missing)}")
+
+    results = score_batch(chunk)
+    flags = results.pop("alert_flags")
+    out = chunk.assign(**results)
+    # Only 8 distinct strings, so categoricals avoid one Python object per row
+    out["alerts"] = pd.Categorical.from_codes(flags, categories=ALERT_TEXT)
+    out["recommendations"] = pd.Categorical.from_codes(get_recommendation_ids_batch(flags), categories=REC_TEXT)
+    return out
+
+def iter_input_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields DataFrames of at most chunk_size rows from a CSV or Parquet file."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+class _OutputWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._wrote_header = False
+
+    def write(self, df):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            # Categoricals are written as plain strings so every chunk has the same schema
+            df = df.astype({c: str for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._wrote_header else "w",
+                      header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=1, progress=True, drift=None):
+    """
+    Scores a CSV/Parquet file of patient vitals chunk by chunk and writes the
+    enriched rows to output_path (format chosen by extension). With workers > 1
+    chunks are scored in a process pool; at most 2 * workers chunks are in
+    flight, so memory stays bounded by the chunk size. With a DriftMonitor
+    every chunk is also tracked by track_drift in this process. Returns rows scored.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    writer = _OutputWriter(output_path)
+    write = writer.write if drift is None else lambda scored: writer.write(track_drift(scored, drift))
+    total = 0
+    start = time.perf_counter()
+
+    def report(rows):
+        nonlocal total
+        total += rows
+        if progress:
+            elapsed = time.perf_counter() - start
+            print(f"\r{total:,} rows  {total / max(elapsed, 1e-9):,.0f} rows/sec", end="", file=sys.stderr)
+
+    try:
+        if workers <= 1:
+            for chunk in iter_input_chunks(input_path, chunk_size):
+                write(score_chunk(chunk))
+                report(len(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = []
+                for chunk in iter_input_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(score_chunk, chunk))
+                    # Write finished chunks in input order once the window is full
+                    while len(pending) >= 2 * workers:
+                        scored = pending.pop(0).result()
+                        write(scored)
+                        report(len(scored))
+                for future in pending:
+                    scored = future.result()
+                    write(scored)
+                    report(len(scored))
+    finally:
+        writer.close()
+        if progress:
+            print(file=sys.stderr)
+
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of patient vitals.")
+    parser.add_argument("input", help="Input .csv or .parquet with columns: " + ", ".join(REQUIRED_COLUMNS))
+    parser.add_argument("output", help="Output .csv or .parquet")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    parser.add_argument("--quiet", action="store_true", help="Disable the progress counter")
+    parser.add_argument("--drift", action="store_true",
+                        help="Compare the inputs with the model's training data and flag out-of-range rows")
+    args = parser.parse_args()
+
+    drift = None
+    if args.drift:
+        from utils.drift_monitor import DriftMonitor
+        drift = DriftMonitor.load()
+
+    start = time.perf_counter()
+    rows = score_file(args.input, args.output, args.chunk_size, args.workers or None, progress=not args.quiet, drift=drift)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/sec) -> {args.output}")
+    if drift is not None:
+        from utils.drift_monitor import print_scores
+        print_scores(drift.scores())
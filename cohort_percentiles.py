@@ -0,0 +1,281 @@
+import os
+import json
+import time
+import bisect
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from utils.data_generator import DATASET_DIR, generate_synthetic_data_vectorized
+from utils.dashboard_stats import HIST_BINS, dataset_version
+
+# Vitals ranked within a stratum, on the Dashboard's HIST_BINS grid. Width-1
+# bins on the integer columns make their percentiles exact; BMI is
+# interpolated within its 0.25-wide bins.
+PERCENTILE_COLUMNS = ['BMI', 'BP_Systolic', 'BP_Diastolic', 'Heart_Rate', 'SpO2']
+AGE_BAND_EDGES = (0, 18, 30, 40, 50, 60, 70, 80)
+AGE_BAND_LABELS = tuple(
+    [f"{lo}-{hi - 1}" for lo, hi in zip(AGE_BAND_EDGES, AGE_BAND_EDGES[1:])] + [f"{AGE_BAND_EDGES[-1]}+"]
+)
+# Matches the Health Monitoring form. The synthetic cohort has no Gender
+# column; its rows only count towards the all-genders strata.
+GENDERS = ("Male", "Female", "Other")
+PERCENTILE_INDEX_PATH = os.path.join("data", "cohort_percentiles.npz")
+# Strata with fewer rows fall back to all genders, then to the whole cohort
+MIN_STRATUM_SIZE = 100
+
+N_BANDS = len(AGE_BAND_LABELS)
+N_GENDERS = len(GENDERS)
+
+def _grid(column):
+    low, high, width = HIST_BINS[column]
+    return low, width, int(round((high - low) / width))
+
+def age_band(age):
+    """Index into AGE_BAND_LABELS for one age."""
+    return max(bisect.bisect_right(AGE_BAND_EDGES, age) - 1, 0)
+
+class CohortPercentileIndex:
+    """
+    Per-(gender, age band) binned counts of every PERCENTILE_COLUMNS vital,
+    published as cumulative tables so a percentile query is a band lookup
+    (bisect over the band edges) plus two table reads, whatever the cohort
+    size; the tables hold a few thousand ints per vital. update() folds in
+    new rows in O(rows) and only the small tables are recomputed, so
+    appending data never rescans what was indexed. Rows without a known
+    gender go to their own slot, which is only ever read through the
+    all-genders strata. A row missing one vital still counts for the
+    others, so each vital is ranked against its own row count.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.counts = {c: np.zeros((N_GENDERS + 1, N_BANDS, _grid(c)[2]), dtype=np.int64)
+                       for c in PERCENTILE_COLUMNS}
+        self._publish()
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls().update(df)
+
+    def copy(self):
+        other = CohortPercentileIndex.__new__(CohortPercentileIndex)
+        other.n = self.n
+        other.counts = {c: counts.copy() for c, counts in self.counts.items()}
+        other._cum, other._sizes = self._cum, self._sizes
+        return other
+
+    def update(self, df):
+        """Adds the rows of df (cohort columns, Gender optional) to the index in place."""
+        age = df['Age'].to_numpy(dtype=np.float64)
+        band = np.clip(np.searchsorted(AGE_BAND_EDGES, age, side='right') - 1, 0, N_BANDS - 1)
+        if 'Gender' in df.columns:
+            gender = pd.Categorical(df['Gender'], categories=GENDERS).codes.astype(np.int64)
+            gender[gender < 0] = N_GENDERS
+        else:
+            gender = np.full(len(age), N_GENDERS, dtype=np.int64)
+        stratum = gender * N_BANDS + band
+        known_age = np.isfinite(age)
+
+        for column in PERCENTILE_COLUMNS:
+            if column not in df.columns:
+                continue
+            low, width, n_bins = _grid(column)
+            values = df[column].to_numpy(dtype=np.float64)
+            keep = known_age & np.isfinite(values)
+            idx = np.clip(np.floor((values[keep] - low) / width), 0, n_bins - 1).astype(np.int64)
+            flat = stratum[keep] * n_bins + idx
+            self.counts[column] += np.bincount(flat, minlength=self.counts[column].size).reshape(self.counts[column].shape)
+        self.n += int(known_age.sum())
+        self._publish()
+        return self
+
+    def merge(self, other):
+        """Folds another index (e.g. built from another part file) into this one."""
+        self.n += other.n
+        for column in PERCENTILE_COLUMNS:
+            self.counts[column] += other.counts[column]
+        self._publish()
+        return self
+
+    def _publish(self):
+        # Gender slot N_GENDERS and band slot N_BANDS of the published tables
+        # hold the all-genders and all-ages totals; each table gets a leading
+        # zero so cum[..., i] is the number of rows below bin i
+        cum, sizes = {}, None
+        for column, counts in self.counts.items():
+            table = np.zeros((N_GENDERS + 1, N_BANDS + 1, counts.shape[2] + 1), dtype=np.int64)
+            table[:N_GENDERS, :N_BANDS, 1:] = counts[:N_GENDERS]
+            table[N_GENDERS, :N_BANDS, 1:] = counts.sum(axis=0)
+            table[:, N_BANDS, 1:] = table[:, :N_BANDS, 1:].sum(axis=1)
+            np.cumsum(table, axis=2, out=table)
+            # Nested lists: a scalar query reads two ints without numpy's per-item overhead
+            cum[column] = table.tolist()
+            # A stratum is only used when every vital has enough rows in it
+            totals = table[:, :, -1]
+            sizes = totals if sizes is None else np.minimum(sizes, totals)
+        # Swapped in together, so readers never see a half-published index
+        self._cum, self._sizes = cum, sizes.tolist()
+
+    def stratum(self, age=None, gender=None):
+        """
+        (gender slot, band slot, rows) of the stratum a query for this
+        age/gender is answered from: the exact stratum when it holds at
+        least MIN_STRATUM_SIZE values of every vital, else the age band
+        across all genders, else the whole cohort. rows is the smallest
+        per-vital count of that stratum.
+        """
+        sizes = self._sizes
+        b = N_BANDS if age is None else age_band(age)
+        g = GENDERS.index(gender) if gender in GENDERS else N_GENDERS
+        if sizes[g][b] < MIN_STRATUM_SIZE:
+            g = N_GENDERS
+            if sizes[g][b] < MIN_STRATUM_SIZE:
+                b = N_BANDS
+        return g, b, sizes[g][b]
+
+    def describe(self, age=None, gender=None):
+        """Who a query is compared against, e.g. "Female patients aged 40-49"."""
+        g, b, _ = self.stratum(age, gender)
+        who = f"{GENDERS[g]} patients" if g < N_GENDERS else "people"
+        return who if b == N_BANDS else f"{who} aged {AGE_BAND_LABELS[b]}"
+
+    def percentile(self, column, value, age=None, gender=None):
+        """
+        Percent (0-100) of the stratum's `column` values that are lower
+        than `value`, or None when the stratum has none.
+        """
+        g, b, _ = self.stratum(age, gender)
+        cum = self._cum[column][g][b]
+        total = cum[-1]
+        if not total:
+            return None
+        low, _, width = HIST_BINS[column]
+        x = (value - low) / width
+        if x <= 0:
+            return 0.0
+        i = int(x)
+        if i >= len(cum) - 1:
+            return 100.0
+        below = cum[i]
+        return 100.0 * (below + (cum[i + 1] - below) * (x - i)) / total
+
+    def percentiles(self, values, age=None, gender=None):
+        """percentile() for each PERCENTILE_COLUMNS key present in `values`."""
+        return {c: self.percentile(c, values[c], age, gender) for c in PERCENTILE_COLUMNS if c in values}
+
+    def save(self, path, version=()):
+        """Writes the counts (and the dataset version they cover) to an .npz file."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, n=self.n, version=json.dumps(version), **self.counts)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns (index, dataset version) from a file written by save()."""
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.n = int(data['n'])
+            index.counts = {c: data[c] for c in PERCENTILE_COLUMNS}
+            version = tuple(tuple(part) for part in json.loads(str(data['version'])))
+        for column, counts in index.counts.items():
+            if counts.shape != (N_GENDERS + 1, N_BANDS, _grid(column)[2]):
+                raise ValueError(f"{path} was built for a different grid")
+        index._publish()
+        return index, version
+
+def _read_part(path):
+    columns = ['Age'] + PERCENTILE_COLUMNS
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        if 'Gender' in pq.read_schema(path).names:
+            columns.append('Gender')
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=lambda c: c in columns or c == 'Gender')
+
+class PercentileIndexStore:
+    """
+    Keeps a CohortPercentileIndex in step with an on-disk dataset, like
+    dashboard_stats.DatasetSummaryStore: get() only indexes part files added
+    since the last call and rebuilds when an existing part changed. With
+    cache_path the counts are also saved after each refresh and reused by
+    the next process, so a restart does not rescan the cohort. Without a
+    dataset on disk the index is built from a generated demo cohort.
+    """
+
+    def __init__(self, data_dir=DATASET_DIR, cache_path=None, demo_rows=100_000):
+        self.data_dir = data_dir
+        self.cache_path = cache_path
+        self.demo_rows = demo_rows
+        self.version = None
+        self.index = None
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        if not os.path.isdir(self.data_dir):
+            return ()
+        return dataset_version(self.data_dir)
+
+    def get(self):
+        version = self._current_version()
+        if version == self.version:
+            return self.index
+        with self._lock:
+            if version != self.version:
+                self.index, self.version = self._refresh(version)
+        return self.index
+
+    def _refresh(self, version):
+        if not version:
+            return CohortPercentileIndex.from_frame(generate_synthetic_data_vectorized(self.demo_rows)), version
+
+        index, known = self.index, self.version
+        if index is None and self.cache_path and os.path.exists(self.cache_path):
+            try:
+                index, known = CohortPercentileIndex.load(self.cache_path)
+            except (ValueError, KeyError):
+                index = None
+        if index is not None and known and version[:len(known)] == known:
+            index = index.copy()
+            new_parts = version[len(known):]
+        else:
+            index = CohortPercentileIndex()
+            new_parts = version
+        if not new_parts:
+            return index, version
+
+        for path, _, _ in new_parts:
+            index.merge(CohortPercentileIndex.from_frame(_read_part(path)))
+        if self.cache_path:
+            index.save(self.cache_path, version)
+        return index, version
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the cohort percentile index and run a query.")
+    parser.add_argument("--data", default=DATASET_DIR, help="Dataset written by write_synthetic_dataset")
+    parser.add_argument("--cache", default=PERCENTILE_INDEX_PATH, help="Where the index is saved between runs")
+    parser.add_argument("--age", type=int, default=45)
+    parser.add_argument("--gender", choices=GENDERS, default=None)
+    parser.add_argument("--systolic", type=float, default=135)
+    parser.add_argument("--diastolic", type=float, default=85)
+    parser.add_argument("--heart-rate", type=float, default=72)
+    parser.add_argument("--bmi", type=float, default=27.5)
+    parser.add_argument("--spo2", type=float, default=97)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = PercentileIndexStore(args.data, args.cache).get()
+    print(f"Index over {index.n:,} rows ready in {time.perf_counter() - start:.2f}s")
+
+    values = {'BMI': args.bmi, 'BP_Systolic': args.systolic, 'BP_Diastolic': args.diastolic,
+              'Heart_Rate': args.heart_rate, 'SpO2': args.spo2}
+    start = time.perf_counter()
+    ranks = index.percentiles(values, args.age, args.gender)
+    elapsed = time.perf_counter() - start
+    print(f"Compared with {index.describe(args.age, args.gender)}:")
+    for column, pct in ranks.items():
+        print(f"  {column:<13} {values[column]:>7g}  higher than {pct:5.1f}%")
+    print(f"{len(ranks)} percentiles in {elapsed * 1e6:.1f} us")
@@ -0,0 +1,285 @@
+import os
+import copy
+import threading
+import numpy as np
+import pandas as pd
+from utils.data_generator import RISK_LEVELS, list_dataset_parts
+
+# Fixed histogram grid per column: (low, high, bin width). Values outside
+# the range are clipped into the first/last bin. Width-1 bins on integer
+# columns make counts and quantiles exact.
+HIST_BINS = {
+    'Age': (0, 120, 1),
+    'BMI': (10, 60, 0.25),
+    'BP_Systolic': (60, 300, 1),
+    'BP_Diastolic': (30, 200, 1),
+    'Heart_Rate': (30, 220, 1),
+    'SpO2': (70, 101, 1),
+}
+SAMPLE_COLUMNS = ['BMI', 'Heart_Rate']
+SAMPLE_SIZE = 6000
+
+# Above this many rows the Dashboard draws its charts from the summary
+# (binned counts, stratified sample) instead of sending every row to plotly.
+RAW_ROWS_THRESHOLD = int(os.environ.get("DASHBOARD_RAW_ROWS", 100_000))
+
+def use_binned_charts(n_rows, threshold=None):
+    """True when a dataset is too large to plot row by row."""
+    return n_rows > (RAW_ROWS_THRESHOLD if threshold is None else threshold)
+
+def risk_codes(risk_level):
+    """Maps a Risk_Level column (strings or Categorical) to codes into RISK_LEVELS, -1 if unknown."""
+    return pd.Categorical(risk_level, categories=RISK_LEVELS).codes.astype(np.int64)
+
+def _bin_index(values, column):
+    low, high, width = HIST_BINS[column]
+    n_bins = int(round((high - low) / width))
+    idx = np.floor((values - low) / width)
+    return np.clip(idx, 0, n_bins - 1).astype(np.int64), n_bins
+
+class CohortSummary:
+    """
+    Mergeable summary of a cohort for the Dashboard: row and risk counts,
+    per-column sums, per-risk histograms on the HIST_BINS grid, a per-risk
+    2-D BMI x Heart_Rate density grid and a sample stratified by risk level
+    (SAMPLE_SIZE rows split evenly between levels, so rare levels stay
+    visible) for the scatter plot. update() folds in new
+    rows in O(rows) and never rescans what it has already seen, so counts,
+    means, histograms and quantiles stay current as chunks arrive.
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE, seed=None):
+        self.n = 0
+        self.sample_size = sample_size
+        self.risk_counts = np.zeros(len(RISK_LEVELS), dtype=np.int64)
+        self.sums = {c: 0.0 for c in HIST_BINS}
+        self.hist = {}
+        for column in HIST_BINS:
+            _, n_bins = _bin_index(np.empty(0), column)
+            self.hist[column] = np.zeros((len(RISK_LEVELS), n_bins), dtype=np.int64)
+        x_bins, y_bins = (self.hist[c].shape[1] for c in SAMPLE_COLUMNS)
+        self.density = np.zeros((len(RISK_LEVELS), x_bins, y_bins), dtype=np.int64)
+        # Reservoir by random keys: per level, the rows with the smallest keys
+        # form a uniform sample, and two samples merge by keeping the smallest again
+        self._rng = np.random.default_rng(seed)
+        self.sample_keys = np.empty(0)
+        self.sample = {c: np.empty(0) for c in SAMPLE_COLUMNS}
+        self.sample_risk = np.empty(0, dtype=np.int8)
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        summary = cls(**kwargs)
+        summary.update(df)
+        return summary
+
+    def copy(self):
+        other = CohortSummary.__new__(CohortSummary)
+        other.__dict__.update(self.__dict__)
+        other.risk_counts = self.risk_counts.copy()
+        other.sums = dict(self.sums)
+        other.hist = {c: h.copy() for c, h in self.hist.items()}
+        other.density = self.density.copy()
+        other.sample = dict(self.sample)
+        other._rng = copy.deepcopy(self._rng)
+        return other
+
+    def update(self, df):
+        """Adds the rows of df (Dashboard columns) to the summary in place."""
+        codes = risk_codes(df['Risk_Level'])
+        known = codes >= 0
+        if not known.all():
+            df = df[known]
+            codes = codes[known]
+        if len(codes) == 0:
+            return self
+
+        self.n += len(codes)
+        self.risk_counts += np.bincount(codes, minlength=len(RISK_LEVELS))
+        for column in HIST_BINS:
+            if column not in df.columns:
+                continue
+            values = df[column].to_numpy(dtype=np.float64)
+            finite = np.isfinite(values)
+            self.sums[column] += float(values[finite].sum())
+            idx, n_bins = _bin_index(values[finite], column)
+            flat = codes[finite] * n_bins + idx
+            self.hist[column] += np.bincount(flat, minlength=len(RISK_LEVELS) * n_bins).reshape(len(RISK_LEVELS), n_bins)
+
+        x, y = (df[c].to_numpy(dtype=np.float64) for c in SAMPLE_COLUMNS)
+        finite = np.isfinite(x) & np.isfinite(y)
+        x_idx, x_bins = _bin_index(x[finite], SAMPLE_COLUMNS[0])
+        y_idx, y_bins = _bin_index(y[finite], SAMPLE_COLUMNS[1])
+        flat = (codes[finite] * x_bins + x_idx) * y_bins + y_idx
+        self.density += np.bincount(flat, minlength=self.density.size).reshape(self.density.shape)
+
+        self._add_sample(self._rng.random(len(codes)),
+                         {c: df[c].to_numpy(dtype=np.float64) for c in SAMPLE_COLUMNS},
+                         codes.astype(np.int8))
+        return self
+
+    def merge(self, other):
+        """Folds another summary (e.g. from a worker or another part file) into this one."""
+        self.n += other.n
+        self.risk_counts += other.risk_counts
+        for column in HIST_BINS:
+            self.sums[column] += other.sums[column]
+            self.hist[column] += other.hist[column]
+        self.density += other.density
+        self._add_sample(other.sample_keys, other.sample, other.sample_risk)
+        return self
+
+    def _add_sample(self, keys, columns, risk):
+        per_level = self.sample_size // len(RISK_LEVELS)
+        # Only rows that beat the largest kept key of a full level can enter
+        limit = np.full(len(RISK_LEVELS), np.inf)
+        for code in range(len(RISK_LEVELS)):
+            kept = self.sample_keys[self.sample_risk == code]
+            if len(kept) >= per_level:
+                limit[code] = kept.max()
+        keep = keys < limit[risk]
+        keys = np.concatenate([self.sample_keys, keys[keep]])
+        columns = {c: np.concatenate([self.sample[c], columns[c][keep]]) for c in SAMPLE_COLUMNS}
+        risk = np.concatenate([self.sample_risk, risk[keep]])
+
+        selected = []
+        for code in range(len(RISK_LEVELS)):
+            idx = np.flatnonzero(risk == code)
+            if len(idx) > per_level:
+                idx = idx[np.argpartition(keys[idx], per_level - 1)[:per_level]]
+            selected.append(idx)
+        selected = np.concatenate(selected)
+        self.sample_keys = keys[selected]
+        self.sample = {c: v[selected] for c, v in columns.items()}
+        self.sample_risk = risk[selected]
+
+    def count(self, risk_level):
+        return int(self.risk_counts[RISK_LEVELS.index(risk_level)])
+
+    def mean(self, column):
+        return self.sums[column] / self.n if self.n else float('nan')
+
+    def _counts(self, column, risk_level=None):
+        hist = self.hist[column]
+        return hist.sum(axis=0) if risk_level is None else hist[RISK_LEVELS.index(risk_level)]
+
+    def bin_edges(self, column):
+        low, _, width = HIST_BINS[column]
+        return low + width * np.arange(self.hist[column].shape[1])
+
+    def quantiles(self, column, qs, risk_level=None):
+        """Quantiles read off the histogram (lower bin edge of the bin holding each quantile)."""
+        counts = self._counts(column, risk_level)
+        total = counts.sum()
+        if total == 0:
+            return np.full(len(qs), np.nan)
+        cum = np.cumsum(counts)
+        ranks = np.maximum(np.ceil(np.asarray(qs) * total), 1)
+        return self.bin_edges(column)[np.searchsorted(cum, ranks)]
+
+    def box_stats(self, column):
+        """Per-risk q1/median/q3 and 1.5 IQR whisker ends, as plotly's box trace expects them."""
+        stats = []
+        edges = self.bin_edges(column)
+        for level in RISK_LEVELS:
+            counts = self._counts(column, level)
+            if counts.sum() == 0:
+                continue
+            q1, median, q3 = self.quantiles(column, [0.25, 0.5, 0.75], level)
+            present = edges[counts > 0]
+            iqr = q3 - q1
+            lower = present[present >= q1 - 1.5 * iqr].min()
+            upper = present[present <= q3 + 1.5 * iqr].max()
+            stats.append({"Risk_Level": level, "q1": q1, "median": median, "q3": q3,
+                          "lowerfence": lower, "upperfence": upper})
+        return pd.DataFrame(stats)
+
+    def histogram_frame(self, column, nbins=30):
+        """
+        Per-risk counts regrouped into about nbins bins over the observed range,
+        in long form (bin, Risk_Level, count) for a stacked bar chart.
+        """
+        hist = self.hist[column]
+        used = np.flatnonzero(hist.sum(axis=0))
+        if len(used) == 0:
+            return pd.DataFrame(columns=[column, "Risk_Level", "count"])
+        first, last = used[0], used[-1] + 1
+        step = max(1, int(np.ceil((last - first) / nbins)))
+        starts = np.arange(first, last, step)
+        grouped = np.add.reduceat(hist[:, first:last], starts - first, axis=1)
+        _, _, width = HIST_BINS[column]
+        centers = self.bin_edges(column)[starts] + step * width / 2
+        return pd.DataFrame({
+            column: np.tile(centers, len(RISK_LEVELS)),
+            "Risk_Level": np.repeat(RISK_LEVELS, len(starts)),
+            "count": grouped.ravel(),
+        })
+
+    def density_grid(self, risk_level=None):
+        """
+        (x_edges, y_edges, z) of the BMI x Heart_Rate density cropped to the
+        occupied cells, with z[j, i] the count of rows in x bin i and y bin j.
+        Its size depends on the grid only, never on the number of rows.
+        """
+        grid = self.density.sum(axis=0) if risk_level is None else self.density[RISK_LEVELS.index(risk_level)]
+        x_used = np.flatnonzero(grid.sum(axis=1))
+        y_used = np.flatnonzero(grid.sum(axis=0))
+        if len(x_used) == 0:
+            return np.empty(0), np.empty(0), np.empty((0, 0), dtype=np.int64)
+        x_slice = slice(x_used[0], x_used[-1] + 1)
+        y_slice = slice(y_used[0], y_used[-1] + 1)
+        x_edges = self.bin_edges(SAMPLE_COLUMNS[0])[x_slice]
+        y_edges = self.bin_edges(SAMPLE_COLUMNS[1])[y_slice]
+        return x_edges, y_edges, grid[x_slice, y_slice].T
+
+    def sample_frame(self):
+        frame = pd.DataFrame(self.sample)
+        frame["Risk_Level"] = np.array(RISK_LEVELS, dtype=object)[self.sample_risk]
+        return frame
+
+def dataset_version(data_dir):
+    """Identifies the current contents of an on-disk dataset: (part path, size, mtime) per part."""
+    version = []
+    for path in list_dataset_parts(data_dir):
+        stat = os.stat(path)
+        version.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(version)
+
+def _read_part(path):
+    columns = list(HIST_BINS) + ['Risk_Level']
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+class DatasetSummaryStore:
+    """
+    Keeps the CohortSummary of an on-disk dataset in step with its part
+    files. get() compares the dataset version with the one last summarized
+    and only reads parts that were added since; if an existing part changed
+    or disappeared the summary is rebuilt. Published summaries are never
+    modified afterwards, so any number of threads can read them while a
+    refresh is running.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.version = ()
+        self.summary = CohortSummary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = dataset_version(self.data_dir)
+        if version == self.version:
+            return self.summary
+        with self._lock:
+            if version != self.version:
+                known = len(self.version)
+                if version[:known] == self.version:
+                    summary = self.summary.copy()
+                    new_parts = version[known:]
+                else:
+                    summary = CohortSummary()
+                    new_parts = version
+                for path, _, _ in new_parts:
+                    summary.update(_read_part(path))
+                self.summary, self.version = summary, version
+        return self.summary
@@ -1,6 +1,14 @@
 import pandas as pd
 import numpy as np
-import random
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+COLUMNS = ['Age', 'BMI', 'BP_Systolic', 'BP_Diastolic', 'Heart_Rate', 'SpO2', 'Risk_Level']
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+DATASET_DIR = os.path.join("data", "cohort")
+DEFAULT_CHUNK_SIZE = 1_000_000
 
 def generate_synthetic_data(n=1000):
     """
@@ -48,11 +56,207 @@ def generate_synthetic_data(n=1000):
             
         data.append([age, bmi, bp_systolic, bp_diastolic, heart_rate, spo2, risk_level])
         
-    columns = ['Age', 'BMI', 'BP_Systolic', 'BP_Diastolic', 'Heart_Rate', 'SpO2', 'Risk_Level']
-    df = pd.DataFrame(data, columns=columns)
+    df = pd.DataFrame(data, columns=COLUMNS)
     
     return df
 
+def compute_risk_codes(age, bmi, bp_systolic, bp_diastolic, heart_rate, spo2):
+    """
+    Array version of the risk logic in generate_synthetic_data.
+    Returns int8 codes indexing RISK_LEVELS (0=Low, 1=Medium, 2=High).
+    """
+    risk_score = np.zeros(len(age), dtype=np.int8)
+
+    # BMI: +2 above 30, +1 above 25
+    risk_score += (bmi > 30).astype(np.int8) + (bmi > 25).astype(np.int8)
+
+    # BP: +2 for stage 2 range, +1 for elevated range
+    bp_high = (bp_systolic > 140) | (bp_diastolic > 90)
+    bp_elevated = (bp_systolic > 120) | (bp_diastolic > 80)
+    risk_score += bp_high.astype(np.int8) + bp_elevated.astype(np.int8)
+
+    risk_score += ((heart_rate > 100) | (heart_rate < 60)).astype(np.int8)
+    risk_score += 2 * (spo2 < 95).astype(np.int8)
+    risk_score += (age > 60).astype(np.int8)
+
+    # <=1 Low, <=3 Medium, else High
+    return np.digitize(risk_score, [2, 4]).astype(np.int8)
+
+def _draw_cohort(rng, n, categorical=False, start=0):
+    """Draws n rows from rng. Index starts at `start` so chunks concatenate cleanly."""
+    age = rng.integers(20, 80, size=n)
+    bmi = rng.uniform(18.5, 35.0, size=n)
+    bp_systolic = rng.integers(90, 160, size=n)
+    bp_diastolic = rng.integers(60, 100, size=n)
+    heart_rate = rng.integers(50, 110, size=n)
+    spo2 = rng.integers(90, 100, size=n)
+
+    codes = compute_risk_codes(age, bmi, bp_systolic, bp_diastolic, heart_rate, spo2)
+    if categorical:
+        risk_level = pd.Categorical.from_codes(codes, categories=RISK_LEVELS)
+    else:
+        risk_level = np.array(RISK_LEVELS, dtype=object)[codes]
+
+    df = pd.DataFrame({
+        'Age': age,
+        'BMI': bmi,
+        'BP_Systolic': bp_systolic,
+        'BP_Diastolic': bp_diastolic,
+        'Heart_Rate': heart_rate,
+        'SpO2': spo2,
+        'Risk_Level': risk_level,
+    }, columns=COLUMNS, index=pd.RangeIndex(start, start + n))
+
+    return df
+
+def generate_synthetic_data_vectorized(n=1000, seed=42, categorical=False):
+    """
+    Array-based equivalent of generate_synthetic_data for large cohorts.
+    Draws each column in a single call from a local np.random.Generator,
+    so the global RNG is left untouched and the same seed always gives
+    the same DataFrame. Set categorical=True to get Risk_Level as a
+    pandas Categorical instead of object strings.
+    """
+    rng = np.random.default_rng(seed)
+    return _draw_cohort(rng, n, categorical)
+
+def chunk_rng(seed, chunk_index):
+    """
+    Returns the Generator for one chunk. Equivalent to the chunk_index-th
+    child of SeedSequence(seed).spawn(), so any chunk can be regenerated
+    on its own without drawing the ones before it.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+def _chunk_bounds(n, chunk_size):
+    return [(chunk_index, start, min(chunk_size, n - start))
+            for chunk_index, start in enumerate(range(0, n, chunk_size))]
+
+def iter_synthetic_chunks(n, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, categorical=False):
+    """
+    Yields the cohort as DataFrames of at most chunk_size rows.
+    Each chunk has its own seed stream, so the result depends only on
+    (n, chunk_size, seed) and memory stays bounded by chunk_size.
+    """
+    for chunk_index, start, size in _chunk_bounds(n, chunk_size):
+        yield _draw_cohort(chunk_rng(seed, chunk_index), size, categorical, start=start)
+
+def _part_path(out_dir, chunk_index, fmt):
+    return os.path.join(out_dir, f"part-{chunk_index:05d}.{fmt}")
+
+def _write_part(df, path, fmt):
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+def _write_chunk(out_dir, chunk_index, start, size, seed, fmt):
+    """
+    Worker task: generates one chunk and writes it straight to disk. The
+    part is written under a temporary name and renamed into place, so
+    readers never see a half-written part.
+    """
+    chunk = _draw_cohort(chunk_rng(seed, chunk_index), size, categorical=(fmt == "parquet"), start=start)
+    path = _part_path(out_dir, chunk_index, fmt)
+    tmp_path = os.path.join(out_dir, f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    _write_part(chunk, tmp_path, fmt)
+    os.replace(tmp_path, path)
+    return path
+
+def _remove_stale_parts(out_dir, paths):
+    """Deletes part files left in out_dir by an earlier, larger (or other-format) write."""
+    keep = set(paths)
+    for path in list_dataset_parts(out_dir):
+        if path not in keep:
+            os.remove(path)
+
+def write_synthetic_dataset(out_dir=DATASET_DIR, n=1000, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, fmt="parquet", workers=1):
+    """
+    Streams a synthetic cohort to out_dir as one part file per chunk
+    (part-00000.parquet, part-00001.parquet, ...). Returns the list of
+    written paths. Part files of an earlier dataset in out_dir that this
+    write did not replace are removed, so out_dir only ever holds one
+    dataset.
+
+    With workers > 1 (or None for all cores) chunks are generated in a
+    process pool. Each worker writes its own part file and only the path
+    is sent back, and since every chunk has its own seed stream the files
+    are bit-identical whatever the worker count.
+    """
+    if fmt not in ("parquet", "csv"):
+        raise ValueError(f"Unsupported format: {fmt}")
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    bounds = _chunk_bounds(n, chunk_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(bounds) <= 1:
+        paths = [_write_chunk(out_dir, i, start, size, seed, fmt) for i, start, size in bounds]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds))) as pool:
+            futures = [pool.submit(_write_chunk, out_dir, i, start, size, seed, fmt) for i, start, size in bounds]
+            paths = [f.result() for f in futures]
+
+    _remove_stale_parts(out_dir, paths)
+    return paths
+
+def list_dataset_parts(data_dir=DATASET_DIR):
+    """Returns the part files of an on-disk dataset in chunk order."""
+    parts = [
+        os.path.join(data_dir, name) for name in os.listdir(data_dir)
+        if name.startswith("part-") and name.endswith((".parquet", ".csv"))
+    ]
+    return sorted(parts)
+
+def iter_dataset_chunks(data_dir=DATASET_DIR, columns=None):
+    """Yields one DataFrame per part file of an on-disk dataset."""
+    for path in list_dataset_parts(data_dir):
+        if path.endswith(".parquet"):
+            chunk = pd.read_parquet(path, columns=columns)
+        else:
+            chunk = pd.read_csv(path, usecols=columns)
+        yield chunk
+
+def load_synthetic_dataset(data_dir=DATASET_DIR, columns=None, nrows=None):
+    """
+    Loads an on-disk dataset written by write_synthetic_dataset.
+    nrows stops reading once that many rows have been collected.
+    """
+    chunks = []
+    total = 0
+    for chunk in iter_dataset_chunks(data_dir, columns):
+        if nrows is not None and total + len(chunk) > nrows:
+            chunk = chunk.iloc[:nrows - total]
+        chunks.append(chunk)
+        total += len(chunk)
+        if nrows is not None and total >= nrows:
+            break
+
+    if not chunks:
+        raise FileNotFoundError(f"No dataset parts found in {data_dir}")
+    df = pd.concat(chunks, ignore_index=True)
+    if 'Risk_Level' in df.columns:
+        df['Risk_Level'] = df['Risk_Level'].astype(str)
+    return df
+
 if __name__ == "__main__":
-    df = generate_synthetic_data(10)
-    print(df.head())
+    parser = argparse.ArgumentParser(description="Generate synthetic health data.")
+    parser.add_argument("--rows", type=int, default=10, help="Number of rows to generate")
+    parser.add_argument("--out", default=None, help="Write a chunked dataset to this directory")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    args = parser.parse_args()
+
+    if args.out:
+        paths = write_synthetic_dataset(args.out, args.rows, args.chunk_size, args.seed, args.format,
+                                        workers=args.workers or None)
+        print(f"Wrote {args.rows} rows in {len(paths)} parts to {args.out}")
+    else:
+        df = generate_synthetic_data(args.rows)
+        print(df.head())
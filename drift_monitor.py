@@ -0,0 +1,262 @@
+import os
+import json
+import argparse
+import threading
+import numpy as np
+from utils.model_artifact import ARTIFACT_DIR, MANIFEST_NAME, REFERENCE_NAME
+from utils.model_inference import FEATURES
+
+# Grid per feature: (low, high, bin width), covering everything the Health
+# Monitoring form accepts. Width-1 bins on integer features keep the KS
+# statistic and out-of-range shares exact; values past either end go to
+# underflow/overflow slots.
+DRIFT_BINS = {
+    'Age': (0, 121, 1),
+    'BMI': (5, 80, 0.25),
+    'BP_Systolic': (50, 301, 1),
+    'BP_Diastolic': (30, 201, 1),
+    'Heart_Rate': (30, 221, 1),
+    'SpO2': (50, 101, 1),
+}
+# Health Monitoring / scoring service field for each model feature
+FORM_FEATURES = {'age': 'Age', 'bmi': 'BMI', 'systolic': 'BP_Systolic', 'diastolic': 'BP_Diastolic',
+                 'heart_rate': 'Heart_Rate', 'spo2': 'SpO2'}
+
+# PSI is taken over PSI_BINS groups holding ~equal reference mass; the usual
+# reading is < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 significant shift
+PSI_BINS = 10
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+# Fewer live values than this are reported as "too few" whatever the scores
+MIN_LIVE_ROWS = 100
+_EPS = 1e-4
+
+# Feature names for every out-of-range bitmask (bit i = FEATURES[i])
+OUT_OF_RANGE_NAMES = [[f for i, f in enumerate(FEATURES) if mask >> i & 1] for mask in range(1 << len(FEATURES))]
+
+class DriftSketch:
+    """
+    Per-feature counts on a fixed grid (DRIFT_BINS by default) with an
+    underflow and an overflow slot, plus the exact min and max seen. Memory
+    depends on the grid only; update() is a few vectorized passes per
+    feature and two sketches with the same grid merge by adding counts, so
+    per-thread or per-process sketches can be combined at any time.
+    """
+
+    def __init__(self, grid=None):
+        self.grid = {f: tuple(grid[f]) if grid else DRIFT_BINS[f] for f in FEATURES}
+        self.counts = {f: np.zeros(self._n_bins(f) + 2, dtype=np.int64) for f in FEATURES}
+        self.min = {f: float('inf') for f in FEATURES}
+        self.max = {f: float('-inf') for f in FEATURES}
+        self._lock = threading.Lock()
+
+    def _n_bins(self, feature):
+        low, high, width = self.grid[feature]
+        return int(round((high - low) / width))
+
+    def n(self, feature):
+        return int(self.counts[feature].sum())
+
+    def update(self, data):
+        """
+        Adds rows to the sketch. `data` maps FEATURES names to arrays (a
+        DataFrame works) or is an (n, len(FEATURES)) array; missing features
+        are skipped and NaNs ignored.
+        """
+        if isinstance(data, np.ndarray):
+            data = {f: data[:, i] for i, f in enumerate(FEATURES)}
+        added = {}
+        for f in FEATURES:
+            if f not in data:
+                continue
+            values = np.asarray(data[f], dtype=np.float64).ravel()
+            values = values[np.isfinite(values)]
+            if not len(values):
+                continue
+            low, _, width = self.grid[f]
+            n_bins = self._n_bins(f)
+            idx = np.floor((values - low) / width)
+            np.clip(idx, -1, n_bins, out=idx)
+            idx += 1
+            added[f] = (np.bincount(idx.astype(np.intp), minlength=n_bins + 2), values.min(), values.max())
+        with self._lock:
+            for f, (counts, lo, hi) in added.items():
+                self.counts[f] += counts
+                self.min[f] = min(self.min[f], float(lo))
+                self.max[f] = max(self.max[f], float(hi))
+        return self
+
+    def merge(self, other):
+        if other.grid != self.grid:
+            raise ValueError("Sketches built on different grids cannot be merged")
+        with self._lock:
+            for f in FEATURES:
+                self.counts[f] += other.counts[f]
+                self.min[f] = min(self.min[f], other.min[f])
+                self.max[f] = max(self.max[f], other.max[f])
+        return self
+
+    def copy(self):
+        other = DriftSketch(self.grid)
+        return other.merge(self)
+
+    def to_dict(self):
+        return {f: {"grid": list(self.grid[f]), "counts": self.counts[f].tolist(),
+                    "min": self.min[f], "max": self.max[f]} for f in FEATURES}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls({f: data[f]["grid"] for f in FEATURES})
+        for f in FEATURES:
+            counts = np.asarray(data[f]["counts"], dtype=np.int64)
+            if counts.shape != sketch.counts[f].shape:
+                raise ValueError(f"Counts for {f} do not match the grid")
+            sketch.counts[f] = counts
+            sketch.min[f], sketch.max[f] = float(data[f]["min"]), float(data[f]["max"])
+        return sketch
+
+def model_inputs(frame):
+    """The FEATURES columns of a frame keyed by form field names (age, bmi, ..., spo2)."""
+    return {FORM_FEATURES[k]: frame[k] for k in FORM_FEATURES if k in frame}
+
+def drift_scores(reference, live):
+    """
+    One row per feature comparing a live sketch with the training reference:
+    PSI over reference-decile groups, the KS statistic between the two
+    binned CDFs (exact on the width-1 integer grids), the share of live
+    values outside the training min/max, and a status from the PSI.
+    """
+    rows = []
+    for f in FEATURES:
+        ref, cur = reference.counts[f], live.counts[f]
+        n_ref, n_cur = int(ref.sum()), int(cur.sum())
+        row = {"feature": f, "n_reference": n_ref, "n_live": n_cur, "psi": None, "ks": None,
+               "out_of_range": None, "status": "no data"}
+        if n_ref and n_cur:
+            p, q = ref / n_ref, cur / n_cur
+            cdf = np.cumsum(p)
+            ks = float(np.abs(cdf - np.cumsum(q)).max())
+            # Bin j joins the group its reference mass starts in; empty bins past
+            # the training max land in the top group, those below min in the first
+            group = np.minimum(((cdf - p) * PSI_BINS + 1e-9).astype(np.intp), PSI_BINS - 1)
+            P = np.bincount(group, weights=p, minlength=PSI_BINS)
+            Q = np.bincount(group, weights=q, minlength=PSI_BINS)
+            psi = float(np.sum((Q - P) * np.log((Q + _EPS) / (P + _EPS))))
+            occupied = np.flatnonzero(ref)
+            inside = cur[occupied[0]:occupied[-1] + 1].sum()
+            if n_cur < MIN_LIVE_ROWS:
+                status = "too few"
+            else:
+                status = "significant" if psi > PSI_SIGNIFICANT else "moderate" if psi > PSI_MODERATE else "stable"
+            row.update(psi=psi, ks=ks, out_of_range=float(1 - inside / n_cur), status=status)
+        rows.append(row)
+    return rows
+
+def save_reference(sketch, artifact_dir=ARTIFACT_DIR):
+    """
+    Stores a training sketch as REFERENCE_NAME in an exported artifact and
+    records it in the manifest (for artifacts exported before the reference
+    existed; model_trainer passes it to export_model_artifact directly).
+    """
+    with open(os.path.join(artifact_dir, REFERENCE_NAME), "w") as f:
+        json.dump(sketch.to_dict(), f)
+    manifest_path = os.path.join(artifact_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        manifest["drift_reference"] = REFERENCE_NAME
+        tmp = manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, manifest_path)
+
+def load_reference(artifact_dir=ARTIFACT_DIR):
+    """The training DriftSketch stored with an artifact; FileNotFoundError if there is none."""
+    with open(os.path.join(artifact_dir, REFERENCE_NAME)) as f:
+        return DriftSketch.from_dict(json.load(f))
+
+class DriftMonitor:
+    """
+    Compares incoming model inputs with the training distribution. observe()
+    folds a batch into a live sketch (constant memory, thread-safe),
+    scores() computes drift on demand and out_of_range_mask()/check() flag
+    single inputs outside the range the model was trained on.
+    """
+
+    def __init__(self, reference):
+        self.reference = reference
+        self.live = DriftSketch(reference.grid)
+        self._low = np.array([reference.min[f] for f in FEATURES])
+        self._high = np.array([reference.max[f] for f in FEATURES])
+
+    @classmethod
+    def load(cls, artifact_dir=ARTIFACT_DIR):
+        return cls(load_reference(artifact_dir))
+
+    def observe(self, data):
+        self.live.update(data)
+
+    def scores(self):
+        return drift_scores(self.reference, self.live)
+
+    def reset(self):
+        """Starts a new live window and returns the sketch of the previous one."""
+        live, self.live = self.live, DriftSketch(self.reference.grid)
+        return live
+
+    def out_of_range_mask(self, data):
+        """uint8 bitmask per row, bit i set when FEATURES[i] is outside the training range."""
+        if isinstance(data, np.ndarray):
+            data = {f: data[:, i] for i, f in enumerate(FEATURES)}
+        mask = None
+        for i, f in enumerate(FEATURES):
+            if f not in data:
+                continue
+            values = np.asarray(data[f], dtype=np.float64)
+            bit = ((values < self._low[i]) | (values > self._high[i])).view(np.uint8) << np.uint8(i)
+            mask = bit if mask is None else mask | bit
+        return mask
+
+    def check(self, record):
+        """[(feature, value, trained_min, trained_max)] for each input outside the trained range."""
+        return [(f, record[f], self.reference.min[f], self.reference.max[f]) for f in FEATURES
+                if f in record and not self.reference.min[f] <= record[f] <= self.reference.max[f]]
+
+def print_scores(rows):
+    print(f"{'feature':<13} {'reference':>10} {'live':>10} {'PSI':>7} {'KS':>6} {'outside':>8}  status")
+    for row in rows:
+        if row["psi"] is None:
+            print(f"{row['feature']:<13} {row['n_reference']:>10,} {row['n_live']:>10,} {'':>7} {'':>6} {'':>8}  {row['status']}")
+        else:
+            print(f"{row['feature']:<13} {row['n_reference']:>10,} {row['n_live']:>10,} {row['psi']:>7.3f} "
+                  f"{row['ks']:>6.3f} {row['out_of_range']:>8.1%}  {row['status']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training reference and drift report for the risk model.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ref = sub.add_parser("reference", help="Store the training distribution with an exported artifact")
+    ref.add_argument("data_dir", nargs="?", default=None,
+                     help="Dataset the model was trained on (default: the trainer's generated data)")
+    ref.add_argument("--artifact", default=ARTIFACT_DIR)
+    rep = sub.add_parser("report", help="Drift of a CSV/Parquet file of inputs against the reference")
+    rep.add_argument("input", help="File with the form columns (age, bmi or height/weight, systolic, ...)")
+    rep.add_argument("--artifact", default=ARTIFACT_DIR)
+    args = parser.parse_args()
+
+    if args.command == "reference":
+        from utils.data_generator import generate_synthetic_data, load_synthetic_dataset
+        from utils.model_trainer import training_reference
+        # Same data and training split as train_and_save_model
+        df = load_synthetic_dataset(args.data_dir) if args.data_dir else generate_synthetic_data(n=2000)
+        sketch = training_reference(df)
+        save_reference(sketch, args.artifact)
+        print(f"Reference over {sketch.n('Age'):,} rows saved to {os.path.join(args.artifact, REFERENCE_NAME)}")
+    else:
+        from utils.bulk_scorer import iter_input_chunks
+        from utils.health_metrics import calculate_bmi_batch
+        monitor = DriftMonitor.load(args.artifact)
+        for chunk in iter_input_chunks(args.input):
+            if 'bmi' not in chunk and {'height', 'weight'} <= set(chunk.columns):
+                chunk = chunk.assign(bmi=calculate_bmi_batch(chunk['height'].to_numpy(), chunk['weight'].to_numpy()))
+            monitor.observe(model_inputs(chunk))
+        print_scores(monitor.scores())
@@ -1,4 +1,8 @@
+import sys
+import numpy as np
+from utils.instrumentation import timed
 
+@timed()
 def calculate_bmi(height_cm, weight_kg):
     """Calculates BMI from height in cm and weight in kg."""
     if height_cm <= 0:
@@ -6,6 +10,7 @@ def calculate_bmi(height_cm, weight_kg):
     height_m = height_cm / 100
     return weight_kg / (height_m ** 2)
 
+@timed()
 def classify_bmi(bmi):
     """Classifies BMI into standard categories."""
     if bmi < 18.5:
@@ -17,6 +22,7 @@ def classify_bmi(bmi):
     else:
         return "Obese", "red"
 
+@timed()
 def classify_bp(systolic, diastolic):
     """Classifies Blood Pressure based on standard ranges (e.g., AHA)."""
     if systolic < 120 and diastolic < 80:
@@ -32,6 +38,7 @@ def classify_bp(systolic, diastolic):
     else:
         return "Normal", "green" # Fallback
 
+@timed()
 def classify_sugar(sugar_mg_dl):
     """Classifies Blood Sugar (assuming random/post-prandial for general screening)."""
     # Random Glucose Reference:
@@ -45,6 +52,7 @@ def classify_sugar(sugar_mg_dl):
     else:
         return "High (Diabetes Risk)", "red"
 
+@timed()
 def calculate_health_score(bmi, systolic, diastolic, sugar, heart_rate, age):
     """
     Calculates a heuristic health score (0-100).
@@ -75,6 +83,7 @@ def calculate_health_score(bmi, systolic, diastolic, sugar, heart_rate, age):
     
     return max(0, score)
 
+@timed()
 def get_health_status(score):
     if score >= 80:
         return "Excellent", "green"
@@ -85,6 +94,7 @@ def get_health_status(score):
     else:
         return "Poor", "red"
 
+@timed()
 def get_risk_assessment(score):
     if score >= 85:
         return "Low Risk"
@@ -93,57 +103,367 @@ def get_risk_assessment(score):
     else:
         return "High Risk"
 
+# --- Alerts and recommendations ---
+# Both depend only on which alerts fired, so every possible answer is built
+# once at import into tables indexed by an ALERT_* bitmask. The scalar
+# functions return the shared tuples from these tables; treat them as
+# read-only.
+
+# Bits of the alert bitmask, one per alert get_detailed_alerts can raise
+ALERT_OBESITY = 1
+ALERT_HIGH_BP = 2
+ALERT_HIGH_SUGAR = 4
+
+_OBESITY_ALERT = ("Obesity Alert", "Your BMI indicates obesity. This increases risk for heart disease and diabetes.")
+_HIGH_BP_ALERT = ("High Blood Pressure", "Readings suggest Hypertension. Please consult a doctor.")
+_HIGH_SUGAR_ALERT = ("High Blood Sugar", "Glucose levels are in the diabetic range. Medical checkup recommended.")
+
+REC_POOL = {
+    "General": (
+        "Maintain a balanced diet rich in vegetables and whole grains.",
+        "Aim for at least 30 minutes of moderate exercise daily.",
+        "Stay hydrated and ensure 7-8 hours of sleep."
+    ),
+    "High BP": (
+        "Reduce sodium (salt) intake in your diet.",
+        "Limit alcohol and caffeine consumption.",
+        "Practice stress-reducing techniques like meditation."
+    ),
+    "High Sugar": (
+        "Monitor carbohydrate intake.",
+        "Avoid sugary drinks and processed foods.",
+        "Regular physical activity helps improve insulin sensitivity."
+    ),
+    "Weight": (
+        "Focus on portion control.",
+        "Incorporate strength training to boost metabolism."
+    )
+}
+
+def _intern_all(pairs):
+    return tuple(tuple(sys.intern(s) for s in pair) for pair in pairs)
+
+def _build_alert_tables():
+    """
+    ALERT_TABLE[flags] holds the alerts for one bitmask. Recommendations
+    only change with the BP and sugar bits, so the distinct lists are kept
+    once in RECOMMENDATION_SETS and REC_IDS maps each bitmask to its list.
+    """
+    alert_table = []
+    rec_sets = []
+    rec_ids = []
+    for flags in range(8):
+        alerts = []
+        if flags & ALERT_OBESITY:
+            alerts.append(_OBESITY_ALERT)
+        if flags & ALERT_HIGH_BP:
+            alerts.append(_HIGH_BP_ALERT)
+        if flags & ALERT_HIGH_SUGAR:
+            alerts.append(_HIGH_SUGAR_ALERT)
+        alert_table.append(_intern_all(alerts))
+
+        recs = list(REC_POOL["General"])
+        if flags & ALERT_HIGH_BP:
+            recs.extend(REC_POOL["High BP"])
+        if flags & ALERT_HIGH_SUGAR:
+            recs.extend(REC_POOL["High Sugar"])
+        recs = tuple(sys.intern(r) for r in recs[:4]) # Top 4
+        if recs not in rec_sets:
+            rec_sets.append(recs)
+        rec_ids.append(rec_sets.index(recs))
+    return tuple(alert_table), tuple(rec_sets), np.array(rec_ids, dtype=np.uint8)
+
+ALERT_TABLE, RECOMMENDATION_SETS, REC_IDS = _build_alert_tables()
+RECOMMENDATION_TABLE = tuple(RECOMMENDATION_SETS[i] for i in REC_IDS)
+
+# Alert tuples as returned by get_detailed_alerts, mapped back to their bitmask
+_FLAGS_BY_ALERTS = {alerts: flags for flags, alerts in enumerate(ALERT_TABLE)}
+
+@timed()
 def get_detailed_alerts(bmi, systolic, diastolic, sugar):
-    """Generates specific alert messages."""
-    alerts = []
+    """Generates specific alert messages as a tuple of (title, message) pairs."""
+    flags = 0
     
     # BMI Alerts
     if bmi >= 30:
-        alerts.append(("Obesity Alert", "Your BMI indicates obesity. This increases risk for heart disease and diabetes."))
+        flags |= ALERT_OBESITY
     
-    # BP Alerts
+    # BP Alerts. A hypertensive crisis (> 180/120) also passes the >= 140/90
+    # check, so it is reported as High Blood Pressure.
     if systolic >= 140 or diastolic >= 90:
-        alerts.append(("High Blood Pressure", "Readings suggest Hypertension. Please consult a doctor."))
-    elif systolic > 180 or diastolic > 120:
-        alerts.append(("CRITICAL BP ALERT", "Hypertensive Crisis levels detected. Seek immediate medical attention."))
+        flags |= ALERT_HIGH_BP
         
     # Sugar Alerts
     if sugar >= 200:
-        alerts.append(("High Blood Sugar", "Glucose levels are in the diabetic range. Medical checkup recommended."))
+        flags |= ALERT_HIGH_SUGAR
         
-    return alerts
+    return ALERT_TABLE[flags]
 
+def _flags_from_text(text):
+    flags = 0
+    if "High Blood Pressure" in text or "BP" in text:
+        flags |= ALERT_HIGH_BP
+    if "Sugar" in text:
+        flags |= ALERT_HIGH_SUGAR
+    return flags
+
+@timed()
 def get_smart_recommendations(risk_level, alerts_count):
-    recs = []
-    
-    rec_pool = {
-        "General": [
-            "Maintain a balanced diet rich in vegetables and whole grains.",
-            "Aim for at least 30 minutes of moderate exercise daily.",
-            "Stay hydrated and ensure 7-8 hours of sleep."
-        ],
-        "High BP": [
-            "Reduce sodium (salt) intake in your diet.",
-            "Limit alcohol and caffeine consumption.",
-            "Practice stress-reducing techniques like meditation."
-        ],
-        "High Sugar": [
-            "Monitor carbohydrate intake.",
-            "Avoid sugary drinks and processed foods.",
-            "Regular physical activity helps improve insulin sensitivity."
-        ],
-        "Weight": [
-            "Focus on portion control.",
-            "Incorporate strength training to boost metabolism."
-        ]
+    """
+    Top 4 lifestyle recommendations for the alerts from get_detailed_alerts,
+    as a tuple. risk_level does not change the advice. Alerts built some
+    other way are matched on their text ("BP", "Sugar") as before.
+    """
+    flags = None
+    if isinstance(alerts_count, (tuple, list)):
+        try:
+            flags = _FLAGS_BY_ALERTS.get(tuple(alerts_count))
+        except TypeError: # unhashable items
+            pass
+    if flags is None:
+        flags = _flags_from_text(str(alerts_count))
+    return RECOMMENDATION_TABLE[flags]
+
+@timed()
+def get_recommendation_ids_batch(alert_flags):
+    """Array version of get_smart_recommendations: an index into RECOMMENDATION_SETS per alert bitmask."""
+    return REC_IDS[np.asarray(alert_flags)]
+
+
+# --- Batch (array-in, array-out) versions ---
+# Each mirrors the scalar function above branch for branch, so results are
+# identical element-wise. Categories and colors come back as object arrays.
+
+BMI_LABELS = np.array(["Underweight", "Normal", "Overweight", "Obese"], dtype=object)
+BMI_COLORS = np.array(["blue", "green", "orange", "red"], dtype=object)
+
+BP_LABELS = np.array(["Normal", "Elevated", "Hypertension Stage 1", "Hypertension Stage 2"], dtype=object)
+BP_COLORS = np.array(["green", "yellow", "orange", "red"], dtype=object)
+
+SUGAR_LABELS = np.array(["Normal", "Prediabetic", "High (Diabetes Risk)"], dtype=object)
+SUGAR_COLORS = np.array(["green", "orange", "red"], dtype=object)
+
+STATUS_LABELS = np.array(["Excellent", "Good", "Fair", "Poor"], dtype=object)
+STATUS_COLORS = np.array(["green", "blue", "orange", "red"], dtype=object)
+
+RISK_LABELS = np.array(["Low Risk", "Medium Risk", "High Risk"], dtype=object)
+
+def _count_ge(x, thresholds):
+    """Number of thresholds each element is >= to, as uint8 (NaN counts 0)."""
+    count = np.zeros(x.shape, dtype=np.uint8)
+    for t in thresholds:
+        count += x >= t
+    return count
+
+def _nan_mask(x):
+    """NaN mask for float input, None for integer input (which has no NaN)."""
+    if x.dtype.kind == 'f':
+        nan = np.isnan(x)
+        if nan.any():
+            return nan
+    return None
+
+@timed()
+def calculate_bmi_batch(height_cm, weight_kg):
+    """Array version of calculate_bmi. Heights <= 0 give 0, a NaN height gives NaN."""
+    height_cm = np.asarray(height_cm)
+    weight_kg = np.asarray(weight_kg)
+    height_m_sq = height_cm / 100
+    # In place for arrays; 0-d input comes back as a numpy scalar, which rebinds
+    height_m_sq *= height_m_sq
+    bmi = np.zeros(np.broadcast(height_m_sq, weight_kg).shape, dtype=np.float64)
+    np.divide(weight_kg, height_m_sq, out=bmi, where=~(height_cm <= 0))
+    return bmi
+
+# Index: number of [18.5, 24.9, 25, 29.9, 30] reached. The scalar gaps
+# [24.9, 25) and [29.9, 30) fall through to "Obese".
+_BMI_CODE_TABLE = np.array([0, 1, 3, 2, 3, 3], dtype=np.uint8)
+
+@timed()
+def classify_bmi_codes(bmi):
+    """Returns indices into BMI_LABELS/BMI_COLORS."""
+    bmi = np.asarray(bmi)
+    codes = _BMI_CODE_TABLE[_count_ge(bmi, (18.5, 24.9, 25, 29.9, 30))]
+    nan = _nan_mask(bmi)
+    if nan is not None:
+        codes[nan] = 3
+    return codes
+
+@timed()
+def classify_bmi_batch(bmi):
+    """Array version of classify_bmi. Returns (categories, colors)."""
+    codes = classify_bmi_codes(bmi)
+    return BMI_LABELS[codes], BMI_COLORS[codes]
+
+# Rows: systolic reached [120, 130, 140]; columns: diastolic reached [80, 90].
+# Diastolic 80-89 is Stage 1 whatever the systolic, as in classify_bp. The
+# scalar "Hypertensive Crisis" branch comes after Stage 2 and is never reached.
+_BP_CODE_TABLE = np.array([
+    [0, 2, 3],
+    [1, 2, 3],
+    [2, 2, 2],
+    [3, 2, 3],
+], dtype=np.uint8).ravel()
+
+@timed()
+def classify_bp_codes(systolic, diastolic):
+    """Returns indices into BP_LABELS/BP_COLORS."""
+    systolic = np.asarray(systolic)
+    diastolic = np.asarray(diastolic)
+    sys_level = _count_ge(systolic, (120, 130, 140))
+    dia_level = _count_ge(diastolic, (80, 90))
+    codes = _BP_CODE_TABLE[sys_level * 3 + dia_level]
+    # A NaN diastolic fails the "< 80" test needed for Elevated.
+    nan = _nan_mask(diastolic)
+    if nan is not None:
+        codes[nan & (codes == 1)] = 0
+    return codes
+
+@timed()
+def classify_bp_batch(systolic, diastolic):
+    """Array version of classify_bp. Returns (categories, colors)."""
+    codes = classify_bp_codes(systolic, diastolic)
+    return BP_LABELS[codes], BP_COLORS[codes]
+
+@timed()
+def classify_sugar_codes(sugar_mg_dl):
+    """Returns indices into SUGAR_LABELS/SUGAR_COLORS."""
+    sugar_mg_dl = np.asarray(sugar_mg_dl)
+    codes = _count_ge(sugar_mg_dl, (140, 200))
+    nan = _nan_mask(sugar_mg_dl)
+    if nan is not None:
+        codes[nan] = 2
+    return codes
+
+@timed()
+def classify_sugar_batch(sugar_mg_dl):
+    """Array version of classify_sugar. Returns (categories, colors)."""
+    codes = classify_sugar_codes(sugar_mg_dl)
+    return SUGAR_LABELS[codes], SUGAR_COLORS[codes]
+
+# Cumulative BP penalty by how many of the 130/80, 140/90 and >180/>120 limits are crossed
+_BP_PENALTY_TABLE = np.array([0, 15, 30, 50], dtype=np.uint8)
+
+@timed()
+def calculate_health_score_batch(bmi, systolic, diastolic, sugar, heart_rate, age):
+    """Array version of calculate_health_score. Returns an int16 array."""
+    bmi = np.asarray(bmi)
+    systolic = np.asarray(systolic)
+    diastolic = np.asarray(diastolic)
+    sugar = np.asarray(sugar)
+    heart_rate = np.asarray(heart_rate)
+    age = np.asarray(age)
+
+    # BMI Penalties: -10 below 18.5, -10 for 25-30, -20 from 30
+    penalty = (bmi < 18.5).view(np.uint8) + _count_ge(bmi, (25, 30))
+    penalty *= 10
+
+    # BP Penalties (cumulative)
+    bp_level = np.maximum(
+        _count_ge(systolic, (130, 140)) + (systolic > 180),
+        _count_ge(diastolic, (80, 90)) + (diastolic > 120),
+    )
+    penalty += _BP_PENALTY_TABLE[bp_level]
+
+    # Sugar Penalties
+    penalty += 15 * _count_ge(sugar, (140, 200))
+
+    # Heart Rate and Age
+    penalty += 10 * ((heart_rate < 60) | (heart_rate > 100)).view(np.uint8)
+    penalty += 5 * (age > 50).view(np.uint8)
+
+    score = 100 - penalty.astype(np.int16)
+    return np.maximum(score, 0, out=score)
+
+@timed()
+def get_health_status_codes(score):
+    """Returns indices into STATUS_LABELS/STATUS_COLORS."""
+    return 3 - _count_ge(np.asarray(score), (40, 60, 80))
+
+@timed()
+def get_health_status_batch(score):
+    """Array version of get_health_status. Returns (statuses, colors)."""
+    codes = get_health_status_codes(score)
+    return STATUS_LABELS[codes], STATUS_COLORS[codes]
+
+@timed()
+def get_risk_assessment_codes(score):
+    """Returns indices into RISK_LABELS."""
+    return 2 - _count_ge(np.asarray(score), (50, 85))
+
+@timed()
+def get_risk_assessment_batch(score):
+    """Array version of get_risk_assessment."""
+    return RISK_LABELS[get_risk_assessment_codes(score)]
+
+@timed()
+def get_alert_flags_batch(bmi, systolic, diastolic, sugar):
+    """
+    Array version of get_detailed_alerts. Returns a uint8 bitmask of
+    ALERT_* flags per row. The CRITICAL BP branch is never reached by the
+    scalar function (it follows the >= 140/90 check), so it has no flag.
+    """
+    bmi = np.asarray(bmi)
+    systolic = np.asarray(systolic)
+    diastolic = np.asarray(diastolic)
+    sugar = np.asarray(sugar)
+
+    flags = (bmi >= 30).view(np.uint8) * np.uint8(ALERT_OBESITY)
+    flags |= ((systolic >= 140) | (diastolic >= 90)).view(np.uint8) * np.uint8(ALERT_HIGH_BP)
+    flags |= (sugar >= 200).view(np.uint8) * np.uint8(ALERT_HIGH_SUGAR)
+    return flags
+
+@timed()
+def score_batch(data, labels=True):
+    """
+    Scores many patients at once. `data` is a DataFrame (or dict of arrays)
+    with columns age, height, weight, systolic, diastolic, sugar and
+    heart_rate, matching the Health Monitoring form. Returns a dict of
+    result columns, e.g. df.assign(**score_batch(df)).
+
+    With labels=False the category columns are uint8 codes into the
+    *_LABELS/*_COLORS tables instead of strings, which skips building
+    object arrays (the bulk of the cost on large inputs).
+    """
+    age = np.asarray(data["age"])
+    systolic = np.asarray(data["systolic"])
+    diastolic = np.asarray(data["diastolic"])
+    sugar = np.asarray(data["sugar"])
+    heart_rate = np.asarray(data["heart_rate"])
+
+    bmi = calculate_bmi_batch(data["height"], data["weight"])
+    health_score = calculate_health_score_batch(bmi, systolic, diastolic, sugar, heart_rate, age)
+
+    bmi_codes = classify_bmi_codes(bmi)
+    bp_codes = classify_bp_codes(systolic, diastolic)
+    sugar_codes = classify_sugar_codes(sugar)
+    status_codes = get_health_status_codes(health_score)
+    risk_codes = get_risk_assessment_codes(health_score)
+    alert_flags = get_alert_flags_batch(bmi, systolic, diastolic, sugar)
+
+    if not labels:
+        return {
+            "bmi": bmi,
+            "bmi_code": bmi_codes,
+            "bp_code": bp_codes,
+            "sugar_code": sugar_codes,
+            "health_score": health_score,
+            "status_code": status_codes,
+            "risk_code": risk_codes,
+            "alert_flags": alert_flags,
+        }
+
+    return {
+        "bmi": bmi,
+        "bmi_cat": BMI_LABELS[bmi_codes],
+        "bmi_color": BMI_COLORS[bmi_codes],
+        "bp_cat": BP_LABELS[bp_codes],
+        "bp_color": BP_COLORS[bp_codes],
+        "sugar_cat": SUGAR_LABELS[sugar_codes],
+        "sugar_color": SUGAR_COLORS[sugar_codes],
+        "health_score": health_score,
+        "health_status": STATUS_LABELS[status_codes],
+        "status_color": STATUS_COLORS[status_codes],
+        "risk_level": RISK_LABELS[risk_codes],
+        "alert_flags": alert_flags,
     }
-    
-    recs.extend(rec_pool["General"])
-    
-    if "High Blood Pressure" in str(alerts_count) or "BP" in str(alerts_count):
-        recs.extend(rec_pool["High BP"])
-        
-    if "Sugar" in str(alerts_count):
-        recs.extend(rec_pool["High Sugar"])
-        
-    return recs[:4] # Return top 4
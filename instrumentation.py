@@ -0,0 +1,271 @@
+import os
+import time
+import atexit
+import bisect
+import argparse
+import threading
+import functools
+import contextlib
+
+# Instrumentation is switched on through the environment before the app
+# starts. When it is off, timed() hands back the undecorated function and
+# timer() a shared no-op context manager, so hot paths pay nothing.
+ENABLED = os.environ.get("APP_METRICS", "") not in ("", "0")
+METRICS_FILE = os.environ.get("APP_METRICS_FILE")
+METRICS_PORT = int(os.environ.get("APP_METRICS_PORT", 0) or 0)
+PROFILE_DIR = os.environ.get("APP_PROFILE_DIR")
+
+METRIC_NAME = "app_duration_seconds"
+# Upper bounds in seconds, from sub-microsecond scalar helpers to model training
+DEFAULT_BUCKETS = (1e-6, 2.5e-6, 1e-5, 2.5e-5, 1e-4, 2.5e-4, 1e-3, 2.5e-3, 0.01, 0.025,
+                   0.1, 0.25, 1.0, 2.5, 10.0, 30.0, 120.0)
+
+class Histogram:
+    """Fixed-bucket latency histogram, cumulative on export like a Prometheus histogram."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        """(cumulative bucket counts incl. +Inf, sum, count), read consistently."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total, count
+
+_histograms = {}
+_registry_lock = threading.Lock()
+
+def get_histogram(name):
+    """Histogram for `name`, created on first use."""
+    hist = _histograms.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _histograms.setdefault(name, Histogram())
+    return hist
+
+def observe(name, seconds):
+    get_histogram(name).observe(seconds)
+
+def reset():
+    """Drops every recorded histogram."""
+    with _registry_lock:
+        _histograms.clear()
+
+def timed(name=None):
+    """
+    Decorator recording each call's wall time under `name` (default
+    module.function). Returns the function unchanged when instrumentation
+    is disabled.
+    """
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        hist = get_histogram(name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}")
+        clock = time.perf_counter
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(clock() - start)
+        return wrapper
+    return decorate
+
+class _Timer:
+    __slots__ = ("hist", "start")
+
+    def __init__(self, hist):
+        self.hist = hist
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.start)
+        return False
+
+_NULL_TIMER = contextlib.nullcontext()
+
+def timer(name):
+    """Context manager timing its block under `name`; a no-op when disabled."""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(get_histogram(name))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus():
+    """All histograms in the Prometheus text exposition format."""
+    lines = [f"# HELP {METRIC_NAME} Wall time of instrumented code paths.",
+             f"# TYPE {METRIC_NAME} histogram"]
+    with _registry_lock:
+        items = sorted(_histograms.items())
+    for name, hist in items:
+        cumulative, total, count = hist.snapshot()
+        label = f'name="{_escape(name)}"'
+        for bound, c in zip(hist.buckets, cumulative):
+            lines.append(f'{METRIC_NAME}_bucket{{{label},le="{bound:g}"}} {c}')
+        lines.append(f'{METRIC_NAME}_bucket{{{label},le="+Inf"}} {cumulative[-1]}')
+        lines.append(f"{METRIC_NAME}_sum{{{label}}} {total!r}")
+        lines.append(f"{METRIC_NAME}_count{{{label}}} {count}")
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path=None):
+    """
+    Writes render_prometheus() to `path` (default APP_METRICS_FILE) through a
+    temporary file, so a node_exporter textfile collector never reads half a file.
+    """
+    path = path or METRICS_FILE
+    if not path:
+        return None
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+    return path
+
+_server = None
+_server_lock = threading.Lock()
+
+def start_http_server(port=None, host="0.0.0.0"):
+    """
+    Serves render_prometheus() on http://host:port/metrics from a daemon
+    thread. Only the first call in a process starts a server.
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port or METRICS_PORT), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
+
+class PageRun:
+    """
+    One Streamlit script run, from start_page_run() to finish(). Records the
+    run time under page.<name>, optionally under cProfile (dumped to
+    APP_PROFILE_DIR), and refreshes the metrics file. Used as a context
+    manager around the page body, so the run is also finished when the
+    script stops early (st.stop(), a rerun or an exception).
+    """
+
+    __slots__ = ("name", "start", "profiler")
+
+    def __init__(self, name):
+        self.name = name
+        self.profiler = None
+        if PROFILE_DIR:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:
+                # Another profiler is already active on this thread
+                self.profiler = None
+        self.start = time.perf_counter()
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.start
+        if self.profiler is not None:
+            self.profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            self.profiler.dump_stats(os.path.join(
+                PROFILE_DIR, f"{self.name}-{stamp}-{int(elapsed * 1000)}ms-{threading.get_ident()}.prof"))
+            self.profiler = None
+        if ENABLED:
+            observe(f"page.{self.name}", elapsed)
+            if METRICS_FILE:
+                write_prometheus()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+        return False
+
+class _NullPageRun:
+    __slots__ = ()
+
+    def finish(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PAGE_RUN = _NullPageRun()
+
+def start_page_run(name):
+    """
+    Pages keep their body in a main() function and call it inside
+    `with start_page_run(name):`, so the run is finished even when the
+    body raises or is cut short by st.stop() or a rerun.
+    Starts the metrics HTTP server on the first run when APP_METRICS_PORT
+    is set. A no-op object when nothing is enabled.
+    """
+    if not ENABLED and not PROFILE_DIR:
+        return _NULL_PAGE_RUN
+    if ENABLED and METRICS_PORT and _server is None:
+        start_http_server()
+    return PageRun(name)
+
+if ENABLED and METRICS_FILE:
+    # CLI runs (training, bulk scoring) leave their metrics behind on exit
+    atexit.register(write_prometheus)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect cProfile dumps written with APP_PROFILE_DIR.")
+    parser.add_argument("profiles", nargs="+", help=".prof files written per page rerun")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key")
+    parser.add_argument("--limit", type=int, default=25, help="Rows to print")
+    args = parser.parse_args()
+
+    import pstats
+    stats = pstats.Stats(args.profiles[0])
+    for path in args.profiles[1:]:
+        stats.add(path)
+    stats.sort_stats(args.sort).print_stats(args.limit)
@@ -0,0 +1,105 @@
+import time
+import json
+import asyncio
+import argparse
+import numpy as np
+
+def random_records(n, seed=0):
+    """Random patient records covering the full range the Health Monitoring form accepts."""
+    rng = np.random.default_rng(seed)
+    columns = {
+        "age": rng.integers(1, 121, n),
+        "height": rng.integers(50, 251, n),
+        "weight": rng.integers(10, 301, n),
+        "systolic": rng.integers(50, 301, n),
+        "diastolic": rng.integers(30, 201, n),
+        "sugar": rng.integers(20, 601, n),
+        "heart_rate": rng.integers(30, 221, n),
+        "spo2": rng.integers(50, 101, n),
+    }
+    return [dict(zip(columns, values)) for values in zip(*(columns[k].tolist() for k in columns))]
+
+async def _request(reader, writer, host, path, body):
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+async def _client(host, port, path, bodies, latencies, errors, deadline):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = 0
+        while time.perf_counter() < deadline:
+            body = bodies[i % len(bodies)]
+            i += 1
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run_load_test(host="127.0.0.1", port=8000, endpoint="score", concurrency=64,
+                        duration=10.0, batch_records=100, seed=0):
+    """
+    Keeps `concurrency` keep-alive connections busy for `duration` seconds,
+    each sending its next request as soon as the previous answer arrives.
+    endpoint="score" posts single records, endpoint="batch" posts
+    batch_records records per request to /score/batch.
+    Returns a dict with request count, errors, requests/sec, records/sec and
+    p50/p90/p99 latency in milliseconds.
+    """
+    if endpoint == "score":
+        path, per_request = "/score", 1
+        bodies = [json.dumps(r).encode() for r in random_records(1000, seed)]
+    else:
+        path, per_request = "/score/batch", batch_records
+        records = random_records(batch_records * 10, seed)
+        bodies = [json.dumps({"records": records[i:i + batch_records]}).encode()
+                  for i in range(0, len(records), batch_records)]
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client(host, port, path, bodies, latencies, errors, deadline)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        "endpoint": path,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_sec": len(latencies) / elapsed,
+        "records_per_sec": len(latencies) * per_request / elapsed,
+        "p50_ms": float(np.percentile(ms, 50)) if len(ms) else float("nan"),
+        "p90_ms": float(np.percentile(ms, 90)) if len(ms) else float("nan"),
+        "p99_ms": float(np.percentile(ms, 99)) if len(ms) else float("nan"),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test a running scoring service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--endpoint", choices=["score", "batch"], default="score")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--batch-records", type=int, default=100, help="Records per /score/batch request")
+    args = parser.parse_args()
+
+    stats = asyncio.run(run_load_test(args.host, args.port, args.endpoint, args.concurrency,
+                                      args.duration, args.batch_records))
+    print(f"{stats['endpoint']}  concurrency={stats['concurrency']}  requests={stats['requests']:,}  errors={stats['errors']}")
+    print(f"{stats['requests_per_sec']:,.0f} requests/sec  {stats['records_per_sec']:,.0f} records/sec")
+    print(f"latency p50 {stats['p50_ms']:.2f} ms  p90 {stats['p90_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms")
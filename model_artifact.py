@@ -0,0 +1,301 @@
+import os
+import json
+import uuid
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+MODELS_DIR = "models"
+MODEL_PATH = os.path.join(MODELS_DIR, "best_model.pkl")
+SCALER_PATH = os.path.join(MODELS_DIR, "scaler.pkl")
+ENCODER_PATH = os.path.join(MODELS_DIR, "encoder.pkl")
+ARTIFACT_DIR = os.path.join(MODELS_DIR, "risk_model")
+
+ARTIFACT_FORMAT = "anti-gravity-risk-model"
+# Version 2 added the "multiclass" key ("ovr" for one-vs-rest linear
+# models); version 1 artifacts are still read, as multinomial.
+ARTIFACT_VERSION = 2
+MANIFEST_NAME = "manifest.json"
+REFERENCE_NAME = "drift_reference.json"
+
+class FlatForest:
+    """
+    A random forest stored as flat node arrays (one row per node, all trees
+    concatenated). Child indices are global and leaves point to themselves,
+    so every tree can be walked a fixed max_depth steps with no leaf checks.
+    `value` holds each node's normalized class probabilities.
+
+    Small batches walk all trees at once, one level per step. Large batches
+    go tree by tree, splitting the row indices at each node, so each row
+    only pays for its actual path length; trees are spread over threads.
+    """
+
+    BLOCK_ROWS = 8192
+    PARTITION_MIN_ROWS = 4096
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_threads=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = np.asarray(roots)
+        self.max_depth = int(max_depth)
+        self.n_threads = n_threads or min(os.cpu_count() or 1, 8)
+        self._node_lists = None
+
+    def predict_proba(self, X):
+        """Probabilities for already-scaled rows, matching RandomForestClassifier.predict_proba."""
+        # sklearn compares float32 inputs against float64 thresholds
+        X32 = np.asarray(X, dtype=np.float32)
+        if X32.ndim == 1:
+            X32 = X32.reshape(1, -1)
+        if X32.shape[0] >= self.PARTITION_MIN_ROWS:
+            return self._predict_partitioned(X32)
+
+        proba = np.empty((X32.shape[0], self.value.shape[1]))
+        # Row blocks keep the (rows x trees) node matrix small
+        for start in range(0, X32.shape[0], self.BLOCK_ROWS):
+            block = X32[start:start + self.BLOCK_ROWS]
+            proba[start:start + len(block)] = self._predict_block(block)
+        return proba
+
+    def _predict_block(self, X32):
+        rows = np.arange(X32.shape[0])[:, None]
+        node = np.repeat(self.roots[None, :], X32.shape[0], axis=0)
+        # All trees advance one level per step
+        for _ in range(self.max_depth):
+            go_left = X32[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1) / len(self.roots)
+
+    def _lists(self):
+        # Plain lists make the per-node bookkeeping in _tree_leaves cheap
+        if self._node_lists is None:
+            self._node_lists = (self.feature.tolist(), self.threshold.tolist(),
+                                self.left.tolist(), self.right.tolist())
+        return self._node_lists
+
+    def _tree_leaves(self, columns, root, out):
+        """Writes the leaf reached by every row in one tree into out."""
+        feature, threshold, left, right = self._lists()
+        stack = [(root, np.arange(len(out), dtype=np.int32))]
+        while stack:
+            node, idx = stack.pop()
+            child = left[node]
+            if child == node:
+                out[idx] = node
+                continue
+            # float64 columns compare against the float64 threshold exactly as sklearn does
+            go_left = columns[feature[node]][idx] <= threshold[node]
+            stack.append((child, idx[go_left]))
+            stack.append((right[node], idx[~go_left]))
+
+    def _predict_partitioned(self, X32):
+        columns = [np.ascontiguousarray(X32[:, k], dtype=np.float64) for k in range(X32.shape[1])]
+        leaves = np.empty((len(self.roots), X32.shape[0]), dtype=np.int32)
+        roots = self.roots.tolist()
+
+        if self.n_threads > 1:
+            with ThreadPoolExecutor(max_workers=self.n_threads) as pool:
+                list(pool.map(lambda t: self._tree_leaves(columns, roots[t], leaves[t]), range(len(roots))))
+        else:
+            for t, root in enumerate(roots):
+                self._tree_leaves(columns, root, leaves[t])
+
+        proba = np.zeros((X32.shape[0], self.value.shape[1]))
+        for tree_leaves in leaves:
+            proba += self.value[tree_leaves]
+        proba /= len(roots)
+        return proba
+
+class LinearSoftmax:
+    """
+    Logistic regression stored as coefficient/intercept arrays. With ovr=True
+    probabilities are normalized per-class sigmoids, as sklearn does for
+    one-vs-rest LogisticRegression and log-loss SGDClassifier.
+    """
+
+    def __init__(self, coef, intercept, ovr=False):
+        self.coef = coef
+        self.intercept = intercept
+        self.ovr = ovr
+
+    def predict_proba(self, X):
+        scores = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        if scores.shape[1] == 1:
+            # Binary problems keep a single decision column
+            p = 1 / (1 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - p, p])
+        if self.ovr:
+            p = 1 / (1 + np.exp(-scores))
+            p /= p.sum(axis=1, keepdims=True)
+            return p
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+def flatten_forest(model):
+    """
+    Flattens a fitted RandomForestClassifier into the FlatForest arrays.
+    Leaf values are normalized the same way DecisionTreeClassifier.predict_proba does.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        ids = np.arange(n) + offset
+        is_leaf = tree.children_left == -1
+
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, ids, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, ids, tree.children_right + offset).astype(np.int32))
+
+        v = tree.value[:, 0, :].astype(np.float64)
+        totals = v.sum(axis=1, keepdims=True)
+        totals[totals == 0] = 1
+        value.append(v / totals)
+
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(feature),
+        "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "value": np.concatenate(value),
+        "roots": np.array(roots, dtype=np.int64),
+    }
+    return arrays, max_depth
+
+def compile_forest(model):
+    """Compiles a fitted RandomForestClassifier into a FlatForest in memory."""
+    arrays, max_depth = flatten_forest(model)
+    return FlatForest(arrays["feature"], arrays["threshold"], arrays["left"],
+                      arrays["right"], arrays["value"], arrays["roots"], max_depth)
+
+def export_model_artifact(model, scaler, encoder, out_dir, features, metadata=None, reference=None):
+    """
+    Writes model, scaler parameters and label classes to out_dir as a JSON
+    manifest plus one .npy file per array. Arrays are loaded with
+    mmap_mode='r', so processes loading the same artifact share its pages.
+    `metadata` (e.g. the model search report) is stored under "training".
+    `reference` (drift_monitor.DriftSketch.to_dict() of the training data)
+    is written to REFERENCE_NAME for the drift monitor.
+
+    Re-exporting over a live artifact is safe: each export writes its
+    arrays under new file names and swaps the manifest in with os.replace,
+    so a running process keeps reading the files it mapped. Arrays of the
+    export before the previous one are deleted.
+    """
+    ovr = False
+    if hasattr(model, "estimators_"):
+        model_type = "random_forest"
+        arrays, max_depth = flatten_forest(model)
+    elif hasattr(model, "coef_"):
+        if type(model).__name__ == "SGDClassifier" and model.loss != "log_loss":
+            raise ValueError("Only log-loss SGDClassifier models have probabilities")
+        model_type = "logistic_regression"
+        max_depth = 0
+        ovr = type(model).__name__ == "SGDClassifier" or getattr(model, "multi_class", "auto") == "ovr"
+        arrays = {
+            "coef": np.asarray(model.coef_, dtype=np.float64),
+            "intercept": np.asarray(model.intercept_, dtype=np.float64),
+        }
+    else:
+        raise ValueError(f"Unsupported model type: {type(model).__name__}")
+
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = set()
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                previous = {meta["file"] for meta in json.load(f)["arrays"].values()}
+        except (ValueError, KeyError, AttributeError):
+            pass
+    tag = uuid.uuid4().hex[:12]
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "version": ARTIFACT_VERSION,
+        "model_type": model_type,
+        "max_depth": max_depth,
+        "multiclass": "ovr" if model_type == "logistic_regression" and ovr else "multinomial",
+        "features": list(features),
+        "classes": [str(c) for c in encoder.classes_],
+        "scaler": {
+            "mean": np.asarray(scaler.mean_).tolist(),
+            "scale": np.asarray(scaler.scale_).tolist(),
+        },
+        "arrays": {},
+    }
+    if metadata is not None:
+        manifest["training"] = metadata
+    for name, arr in arrays.items():
+        # Never written over: np.save into a file another process has mapped
+        # would change (or truncate) the pages under it
+        filename = f"{name}.{tag}.npy"
+        np.save(os.path.join(out_dir, filename), np.ascontiguousarray(arr))
+        manifest["arrays"][name] = {"file": filename, "dtype": str(arr.dtype), "shape": list(arr.shape)}
+    if reference is not None:
+        tmp = os.path.join(out_dir, f"{REFERENCE_NAME}.{tag}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(reference, f)
+        os.replace(tmp, os.path.join(out_dir, REFERENCE_NAME))
+        manifest["drift_reference"] = REFERENCE_NAME
+    elif os.path.exists(os.path.join(out_dir, REFERENCE_NAME)):
+        # Left over from an earlier model, which it no longer describes
+        os.remove(os.path.join(out_dir, REFERENCE_NAME))
+
+    # Manifest last, so a half-written artifact is never picked up
+    tmp = f"{manifest_path}.{tag}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path)
+
+    # Keep the previous export's arrays for readers that loaded its manifest
+    # just before the swap; anything older is unreferenced
+    keep = previous | {meta["file"] for meta in manifest["arrays"].values()}
+    for filename in os.listdir(out_dir):
+        if filename.endswith(".npy") and filename not in keep:
+            os.remove(os.path.join(out_dir, filename))
+
+    return manifest
+
+def load_model_artifact(artifact_dir, mmap=True):
+    """
+    Reads an artifact written by export_model_artifact without pickle.
+    Returns (manifest, model) where model has predict_proba(X_scaled).
+    """
+    with open(os.path.join(artifact_dir, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"{artifact_dir} is not a {ARTIFACT_FORMAT} artifact")
+    if manifest.get("version") not in (1, ARTIFACT_VERSION):
+        raise ValueError(f"Unsupported artifact version: {manifest.get('version')}")
+
+    arrays = {}
+    for name, meta in manifest["arrays"].items():
+        arr = np.load(os.path.join(artifact_dir, meta["file"]),
+                      mmap_mode="r" if mmap else None, allow_pickle=False)
+        if str(arr.dtype) != meta["dtype"] or list(arr.shape) != meta["shape"]:
+            raise ValueError(f"Array {name} does not match the manifest")
+        arrays[name] = arr
+
+    if manifest["model_type"] == "random_forest":
+        model = FlatForest(arrays["feature"], arrays["threshold"], arrays["left"],
+                           arrays["right"], arrays["value"], arrays["roots"], manifest["max_depth"])
+    elif manifest["model_type"] == "logistic_regression":
+        model = LinearSoftmax(arrays["coef"], arrays["intercept"], ovr=manifest.get("multiclass") == "ovr")
+    else:
+        raise ValueError(f"Unsupported model type: {manifest['model_type']}")
+
+    return manifest, model
@@ -0,0 +1,97 @@
+import os
+import pickle
+import threading
+import numpy as np
+from utils.model_artifact import (
+    compile_forest, load_model_artifact,
+    MANIFEST_NAME, MODEL_PATH, SCALER_PATH, ENCODER_PATH, ARTIFACT_DIR
+)
+
+# Same order as data_generator.COLUMNS. Spelled out so that scoring a patient
+# does not import pandas; artifact manifests are checked against it.
+FEATURES = ['Age', 'BMI', 'BP_Systolic', 'BP_Diastolic', 'Heart_Rate', 'SpO2']
+
+class RiskPredictor:
+    """
+    Wraps a trained model with its scaler parameters and label classes.
+    `model` is anything with predict_proba on scaled rows: a fitted sklearn
+    estimator or a model loaded by load_model_artifact. Scaling is done with
+    the fitted mean/scale directly, and a sklearn random forest is compiled
+    into a FlatForest, so small batches skip sklearn's input validation and
+    joblib dispatch. Batches of SKLEARN_MIN_ROWS or more still go to the
+    sklearn forest when one was given, as its compiled traversal is faster
+    there on a single core.
+    """
+
+    SKLEARN_MIN_ROWS = 4096
+
+    def __init__(self, model, mean, scale, classes):
+        self._sklearn_forest = None
+        if hasattr(model, 'estimators_'):
+            self._sklearn_forest = model
+            model = compile_forest(model)
+        self.model = model
+        self.classes = np.asarray(classes)
+        self._mean = np.asarray(mean, dtype=np.float64)
+        self._scale = np.asarray(scale, dtype=np.float64)
+
+    def _features(self, X):
+        if hasattr(X, 'columns'):
+            X = X[FEATURES].to_numpy(dtype=np.float64)
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return (X - self._mean) / self._scale
+
+    def predict_proba(self, X):
+        """Class probabilities for raw (unscaled) feature rows, columns ordered as self.classes."""
+        X_scaled = self._features(X)
+        if self._sklearn_forest is not None and X_scaled.shape[0] >= self.SKLEARN_MIN_ROWS:
+            return self._sklearn_forest.predict_proba(X_scaled.astype(np.float32))
+        return self.model.predict_proba(X_scaled)
+
+    def predict_batch(self, X):
+        """Decoded risk labels for a DataFrame with FEATURES columns or an (n, 6) array."""
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+    def predict_one(self, age, bmi, systolic, diastolic, heart_rate, spo2):
+        """Returns (risk_label, {label: probability}) for one patient."""
+        proba = self.predict_proba([age, bmi, systolic, diastolic, heart_rate, spo2])[0]
+        best = int(np.argmax(proba))
+        return str(self.classes[best]), dict(zip(self.classes.tolist(), proba.tolist()))
+
+def load_predictor(model_path=MODEL_PATH, scaler_path=SCALER_PATH, encoder_path=ENCODER_PATH):
+    """Loads the pickled artifacts written by model_trainer into a RiskPredictor."""
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+    with open(encoder_path, 'rb') as f:
+        encoder = pickle.load(f)
+    return RiskPredictor(model, scaler.mean_, scaler.scale_, encoder.classes_)
+
+def load_artifact_predictor(artifact_dir=ARTIFACT_DIR):
+    """Loads the pickle-free artifact written by model_artifact.export_model_artifact."""
+    manifest, model = load_model_artifact(artifact_dir)
+    if manifest["features"] != FEATURES:
+        raise ValueError(f"Artifact features {manifest['features']} do not match {FEATURES}")
+    scaler = manifest["scaler"]
+    return RiskPredictor(model, scaler["mean"], scaler["scale"], manifest["classes"])
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    """
+    Process-wide RiskPredictor, loaded on first use. Prefers the memory-mapped
+    artifact and falls back to the pickles when it has not been exported.
+    """
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                if os.path.exists(os.path.join(ARTIFACT_DIR, MANIFEST_NAME)):
+                    _predictor = load_artifact_predictor()
+                else:
+                    _predictor = load_predictor()
+    return _predictor
@@ -0,0 +1,162 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from sklearn.metrics import accuracy_score
+
+MODEL_FACTORIES = {
+    "logistic_regression": LogisticRegression,
+    "random_forest": RandomForestClassifier,
+}
+
+DEFAULT_SEARCH_GRID = {
+    "logistic_regression": {"C": [0.1, 1.0, 10.0], "max_iter": [1000]},
+    "random_forest": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 10, 20],
+        "min_samples_leaf": [1, 5],
+        "random_state": [42],
+    },
+}
+
+def expand_grid(grid):
+    """Turns {model_name: param_grid} into a list of (model_name, params) candidates."""
+    candidates = []
+    for name, param_grid in grid.items():
+        if name not in MODEL_FACTORIES:
+            raise ValueError(f"Unknown model in search grid: {name}")
+        for params in ParameterGrid(param_grid):
+            candidates.append((name, params))
+    return candidates
+
+# Training data for worker processes, set once by the pool initializer so
+# each task only ships indices instead of the arrays.
+_X = None
+_y = None
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+def _fit_and_score(candidate_id, name, params, train_idx, test_idx):
+    model = MODEL_FACTORIES[name](**params)
+    model.fit(_X[train_idx], _y[train_idx])
+    return candidate_id, accuracy_score(_y[test_idx], model.predict(_X[test_idx]))
+
+def search_best_model(X, y, grid=None, n_splits=5, workers=None, time_budget=None,
+                      eta=3, min_samples=None, random_state=42):
+    """
+    Successive-halving model selection with k-fold cross-validation.
+
+    Every candidate starts on a small subsample. After each round only the top
+    1/eta candidates survive and the next round uses eta times more rows,
+    until too few would remain to halve again; the survivors then get a final
+    round on the full data, so the winner is always picked on all rows. Fold
+    fits run in a process pool. Time_budget is checked as each fit finishes:
+    once it has passed, candidates none of whose folds have started are
+    cancelled (keeping at least one, so the round always scores a candidate),
+    the round is ranked on the candidates that were fully scored and no
+    further rounds are started.
+
+    Returns (model_name, params, report) where report records every round,
+    the cross-validated scores and the wall-clock time.
+    """
+    start = time.perf_counter()
+    X = np.asarray(X)
+    y = np.asarray(y)
+    candidates = expand_grid(grid or DEFAULT_SEARCH_GRID)
+    workers = workers or os.cpu_count() or 1
+
+    n_rows = len(y)
+    n_rounds = max(1, int(np.ceil(np.log(len(candidates)) / np.log(eta))))
+    if min_samples is None:
+        min_samples = max(n_splits * 20, n_rows // eta ** (n_rounds - 1))
+    rng = np.random.default_rng(random_state)
+    order = rng.permutation(n_rows)
+
+    alive = list(range(len(candidates)))
+    rounds = []
+    n_samples = min(min_samples, n_rows)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        while True:
+            subset = order[:n_samples]
+            folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+                         .split(subset, y[subset]))
+            futures = {
+                cid: [pool.submit(_fit_and_score, cid, *candidates[cid], subset[train], subset[test])
+                      for train, test in folds]
+                for cid in alive
+            }
+            scores = {cid: [] for cid in alive}
+            pending = {f for fs in futures.values() for f in fs}
+            out_of_time = False
+            while pending:
+                timeout = None
+                if time_budget is not None and not out_of_time:
+                    timeout = max(start + time_budget - time.perf_counter(), 0)
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if not future.cancelled():
+                        cid, score = future.result()
+                        scores[cid].append(score)
+                if (time_budget is not None and not out_of_time
+                        and time.perf_counter() - start >= time_budget):
+                    # Candidates already being fitted finish their folds; the
+                    # rest are dropped from this round
+                    out_of_time = True
+                    started = [cid for cid, fs in futures.items() if any(f.running() or f.done() for f in fs)]
+                    keep = set(started or alive[:1])
+                    for cid, fs in futures.items():
+                        if cid not in keep:
+                            for f in fs:
+                                f.cancel()
+                    pending = {f for f in pending if not f.cancelled()}
+
+            mean_scores = {cid: float(np.mean(s)) for cid, s in scores.items() if len(s) == n_splits}
+            ranked = sorted(mean_scores, key=lambda cid: mean_scores[cid], reverse=True)
+            best_id, best_score = ranked[0], mean_scores[ranked[0]]
+            rounds.append({
+                "n_samples": int(n_samples),
+                "candidates": [
+                    {"model": candidates[cid][0], "params": candidates[cid][1], "cv_accuracy": mean_scores[cid]}
+                    for cid in ranked
+                ],
+                "n_dropped": len(alive) - len(ranked),
+            })
+            elapsed = time.perf_counter() - start
+            print(f"Round {len(rounds)}: {len(ranked)} of {len(alive)} candidates on {n_samples} rows, "
+                  f"best {candidates[best_id][0]} {best_score:.4f} ({elapsed:.1f}s)")
+
+            if out_of_time or (time_budget is not None and elapsed >= time_budget):
+                print("Time budget reached, stopping search.")
+                break
+            if n_samples >= n_rows:
+                break
+            if len(ranked) // eta <= 1:
+                # Too few left to halve again: the survivors are compared on all rows
+                alive = ranked[:eta]
+                n_samples = n_rows
+            else:
+                alive = ranked[:len(ranked) // eta]
+                n_samples = min(n_samples * eta, n_rows)
+
+    name, params = candidates[best_id]
+    report = {
+        "model": name,
+        "params": params,
+        "cv_accuracy": best_score,
+        "n_splits": n_splits,
+        "n_candidates": len(candidates),
+        "rounds": rounds,
+        "wall_time_sec": time.perf_counter() - start,
+        "workers": workers,
+    }
+    return name, params, report
+
+def build_model(name, params):
+    """Instantiates an unfitted estimator for a search result."""
+    return MODEL_FACTORIES[name](**params)
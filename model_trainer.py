@@ -1,50 +1,120 @@
 import pandas as pd
 import pickle
 import os
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-from utils.data_generator import generate_synthetic_data
-from utils.preprocessor import preprocess_data
-
-MODELS_DIR = "models"
-MODEL_PATH = os.path.join(MODELS_DIR, "best_model.pkl")
-SCALER_PATH = os.path.join(MODELS_DIR, "scaler.pkl")
-ENCODER_PATH = os.path.join(MODELS_DIR, "encoder.pkl")
-
-def train_and_save_model():
-    # 1. Generate Data
-    print("Generating synthetic data...")
-    df = generate_synthetic_data(n=2000)
+import json
+import time
+import argparse
+import numpy as np
+from utils.data_generator import generate_synthetic_data, load_synthetic_dataset, iter_dataset_chunks
+from utils.preprocessor import (
+    preprocess_data, fit_scaler_streaming, make_label_encoder, transform_chunk,
+    FEATURE_COLUMNS
+)
+from utils.instrumentation import timed, timer
+from utils.drift_monitor import DriftSketch
+from utils.model_artifact import (
+    export_model_artifact,
+    MODELS_DIR, MODEL_PATH, SCALER_PATH, ENCODER_PATH, ARTIFACT_DIR
+)
+
+SEARCH_REPORT_PATH = os.path.join(MODELS_DIR, "search_report.json")
+
+@timed()
+def train_and_save_model(data_dir=None, search=False, grid=None, workers=None, time_budget=None):
+    """
+    Trains the risk model and saves it with the scaler and encoder.
+    With search=True the two default models are replaced by a parallel
+    successive-halving search over `grid` (see model_search), and the search
+    report is saved to SEARCH_REPORT_PATH and in the artifact manifest.
+    """
+    # sklearn is imported on first use so the module stays cheap to import
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+
+    start = time.perf_counter()
+    # 1. Generate Data (or load a dataset written by write_synthetic_dataset)
+    with timer("model_trainer.load_data"):
+        if data_dir:
+            print(f"Loading dataset from {data_dir}...")
+            df = load_synthetic_dataset(data_dir)
+        else:
+            print("Generating synthetic data...")
+            df = generate_synthetic_data(n=2000)
     
     # 2. Preprocess
     print("Preprocessing data...")
     X_train, X_test, y_train, y_test, scaler, le = preprocess_data(df)
     
-    # 3. Train Models
-    print("Training Logistic Regression...")
-    lr = LogisticRegression()
-    lr.fit(X_train, y_train)
-    lr_pred = lr.predict(X_test)
-    lr_acc = accuracy_score(y_test, lr_pred)
-    print(f"Logistic Regression Accuracy: {lr_acc:.4f}")
+    training_info = None
+    if search:
+        # 3-4. Search candidates with CV, then refit the winner on the full training split
+        from utils.model_search import search_best_model, build_model
+        print("Searching models...")
+        with timer("model_trainer.search"):
+            name, params, report = search_best_model(X_train, y_train, grid=grid, workers=workers, time_budget=time_budget)
+        with timer("model_trainer.refit"):
+            best_model = build_model(name, params)
+            best_model.fit(X_train, y_train)
+        report["test_accuracy"] = accuracy_score(y_test, best_model.predict(X_test))
+        print(f"Best model: {name} {params} (CV {report['cv_accuracy']:.4f}, test {report['test_accuracy']:.4f})")
+        training_info = report
+    else:
+        # 3. Train Models
+        print("Training Logistic Regression...")
+        lr = LogisticRegression()
+        with timer("model_trainer.fit_logistic_regression"):
+            lr.fit(X_train, y_train)
+        lr_pred = lr.predict(X_test)
+        lr_acc = accuracy_score(y_test, lr_pred)
+        print(f"Logistic Regression Accuracy: {lr_acc:.4f}")
     
-    print("Training Random Forest...")
-    rf = RandomForestClassifier(random_state=42)
-    rf.fit(X_train, y_train)
-    rf_pred = rf.predict(X_test)
-    rf_acc = accuracy_score(y_test, rf_pred)
-    print(f"Random Forest Accuracy: {rf_acc:.4f}")
+        print("Training Random Forest...")
+        rf = RandomForestClassifier(random_state=42)
+        with timer("model_trainer.fit_random_forest"):
+            rf.fit(X_train, y_train)
+        rf_pred = rf.predict(X_test)
+        rf_acc = accuracy_score(y_test, rf_pred)
+        print(f"Random Forest Accuracy: {rf_acc:.4f}")
     
-    # 4. Select Best Model
-    if rf_acc >= lr_acc:
-        best_model = rf
-        print("Best model: Random Forest")
-    else:
-        best_model = lr
-        print("Best model: Logistic Regression")
+        # 4. Select Best Model
+        if rf_acc >= lr_acc:
+            best_model = rf
+            print("Best model: Random Forest")
+        else:
+            best_model = lr
+            print("Best model: Logistic Regression")
         
     # 5. Save Model and Artifacts
+    if training_info is not None:
+        training_info["total_wall_time_sec"] = time.perf_counter() - start
+        if not os.path.exists(MODELS_DIR):
+            os.makedirs(MODELS_DIR)
+        with open(SEARCH_REPORT_PATH, 'w') as f:
+            json.dump(training_info, f, indent=2)
+        print(f"Search report saved to {SEARCH_REPORT_PATH} ({training_info['total_wall_time_sec']:.1f}s total)")
+
+    feature_names = [c for c in df.columns if c != 'Risk_Level']
+    reference = training_reference(df)
+    save_model_artifacts(best_model, scaler, le, feature_names, metadata=training_info, reference=reference)
+
+def training_reference(df):
+    """
+    DriftSketch of the rows preprocess_data puts in the training split, so
+    the drift reference describes what the model was fitted on and not the
+    test rows.
+    """
+    from sklearn.model_selection import train_test_split
+    # Split on row indices only; same shuffle as splitting the frame
+    train_idx, _ = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42)
+    return DriftSketch().update(df.iloc[train_idx])
+
+@timed()
+def save_model_artifacts(best_model, scaler, le, feature_names, metadata=None, reference=None):
+    """
+    Pickles the model, scaler and encoder, then exports the serving artifact
+    with the training distribution (`reference`, a DriftSketch) for the drift monitor.
+    """
     if not os.path.exists(MODELS_DIR):
         os.makedirs(MODELS_DIR)
         
@@ -59,5 +129,109 @@ def train_and_save_model():
         
     print(f"Model saved to {MODEL_PATH}")
 
+    # Pickle-free, memory-mappable artifact for serving
+    export_model_artifact(best_model, scaler, le, ARTIFACT_DIR, feature_names, metadata=metadata,
+                          reference=reference.to_dict() if reference is not None else None)
+    print(f"Artifact exported to {ARTIFACT_DIR}")
+
+@timed()
+def train_incremental_model(data_dir, epochs=1, holdout_fraction=0.2, alpha=1e-4, random_state=42):
+    """
+    Out-of-core training on a dataset written by write_synthetic_dataset.
+    Pass 1 fits the scaler with partial_fit over the part files; the
+    following passes fit an SGDClassifier (log loss) chunk by chunk. The last
+    holdout_fraction of each chunk is kept out for evaluation (and out of
+    the scaler and drift reference), so only one chunk is ever in memory.
+    Labels use the fixed RISK_CLASSES order.
+    """
+    from sklearn.linear_model import SGDClassifier
+
+    start = time.perf_counter()
+
+    print(f"Fitting scaler over {data_dir}...")
+    # Only the training rows of each chunk; the training distribution is
+    # sketched for the drift monitor in the same pass
+    reference = DriftSketch()
+    def training_rows(chunks):
+        for chunk in chunks:
+            chunk = chunk.iloc[:len(chunk) - int(len(chunk) * holdout_fraction)]
+            reference.update(chunk)
+            yield chunk
+    with timer("model_trainer.fit_scaler_streaming"):
+        scaler = fit_scaler_streaming(training_rows(iter_dataset_chunks(data_dir, columns=FEATURE_COLUMNS)), FEATURE_COLUMNS)
+    le = make_label_encoder()
+    classes = np.arange(len(le.classes_))
+
+    model = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    rows = 0
+    for epoch in range(epochs):
+        with timer("model_trainer.epoch"):
+            for chunk in iter_dataset_chunks(data_dir):
+                X, y = transform_chunk(chunk, scaler, le)
+                n_train = len(y) - int(len(y) * holdout_fraction)
+                order = rng.permutation(n_train)
+                model.partial_fit(X[order], y[order], classes=classes)
+                rows += n_train
+        elapsed = time.perf_counter() - start
+        print(f"Epoch {epoch + 1}: {rows:,} rows trained, {rows / elapsed:,.0f} rows/sec")
+
+    # Hold-out accuracy of the final model, in one more streaming pass
+    correct = 0
+    held_out = 0
+    for chunk in iter_dataset_chunks(data_dir):
+        X, y = transform_chunk(chunk, scaler, le)
+        n_train = len(y) - int(len(y) * holdout_fraction)
+        correct += int((model.predict(X[n_train:]) == y[n_train:]).sum())
+        held_out += len(y) - n_train
+
+    elapsed = time.perf_counter() - start
+    info = {
+        "model": "sgd_classifier",
+        "rows_trained": rows,
+        "epochs": epochs,
+        "holdout_accuracy": correct / held_out if held_out else None,
+        "wall_time_sec": elapsed,
+        "rows_per_sec": rows / elapsed,
+    }
+    if held_out:
+        print(f"Hold-out accuracy: {info['holdout_accuracy']:.4f} on {held_out:,} rows")
+    save_model_artifacts(model, scaler, le, FEATURE_COLUMNS, metadata=info, reference=reference)
+    return info
+
+def export_artifact_from_pickles(data_dir=None):
+    """
+    Converts already-saved pickles into the artifact format without
+    retraining. The drift reference is rebuilt from the training rows of the
+    data train_and_save_model would use (data_dir, or the synthetic data).
+    """
+    with open(MODEL_PATH, 'rb') as f:
+        model = pickle.load(f)
+    with open(SCALER_PATH, 'rb') as f:
+        scaler = pickle.load(f)
+    with open(ENCODER_PATH, 'rb') as f:
+        le = pickle.load(f)
+    df = load_synthetic_dataset(data_dir) if data_dir else generate_synthetic_data(n=2000)
+    export_model_artifact(model, scaler, le, ARTIFACT_DIR, list(scaler.feature_names_in_),
+                          reference=training_reference(df).to_dict())
+    print(f"Artifact exported to {ARTIFACT_DIR}")
+
 if __name__ == "__main__":
-    train_and_save_model()
+    parser = argparse.ArgumentParser(description="Train and save the risk model.")
+    parser.add_argument("data_dir", nargs="?", default=None, help="Dataset written by write_synthetic_dataset")
+    parser.add_argument("--search", action="store_true", help="Run the parallel model search")
+    parser.add_argument("--workers", type=int, default=None, help="Search worker processes (default: all cores)")
+    parser.add_argument("--time-budget", type=float, default=None, help="Search time budget in seconds")
+    parser.add_argument("--incremental", action="store_true", help="Stream data_dir through an SGDClassifier")
+    parser.add_argument("--epochs", type=int, default=1, help="Passes over the data in incremental mode")
+    parser.add_argument("--export-only", action="store_true", help="Export the saved pickles as the serving artifact")
+    args = parser.parse_args()
+
+    if args.export_only:
+        export_artifact_from_pickles(args.data_dir)
+    elif args.incremental:
+        if not args.data_dir:
+            parser.error("--incremental needs a data_dir")
+        train_incremental_model(args.data_dir, epochs=args.epochs)
+    else:
+        train_and_save_model(args.data_dir, search=args.search, workers=args.workers, time_budget=args.time_budget)
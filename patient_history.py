@@ -0,0 +1,354 @@
+import os
+import time
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from utils.health_metrics import calculate_bmi_batch, calculate_health_score_batch, RISK_LABELS, get_risk_assessment_codes
+
+HISTORY_DB = os.path.join("data", "history.db")
+
+VITAL_COLUMNS = ['age', 'height', 'weight', 'systolic', 'diastolic', 'sugar', 'heart_rate']
+READING_COLUMNS = VITAL_COLUMNS + ['spo2', 'bmi', 'health_score', 'risk_level']
+# Columns with running sums, so the mean over any time range is two lookups
+TREND_COLUMNS = ['bmi', 'systolic', 'diastolic', 'sugar', 'heart_rate', 'health_score']
+CUM_COLUMNS = ['cum_' + c for c in TREND_COLUMNS]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS assessments (
+    patient_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    {', '.join(c + (' TEXT' if c == 'risk_level' else ' REAL') for c in READING_COLUMNS)},
+    seq INTEGER NOT NULL,
+    {', '.join(c + ' REAL NOT NULL' for c in CUM_COLUMNS)},
+    PRIMARY KEY (patient_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS assessments_ts ON assessments (ts);
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    first_ts REAL NOT NULL,
+    last_ts REAL NOT NULL,
+    {', '.join(c + ' REAL NOT NULL' for c in CUM_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS patients_last_ts ON patients (last_ts);
+"""
+
+_INSERT = (f"INSERT OR REPLACE INTO assessments (patient_id, ts, {', '.join(READING_COLUMNS)}, seq, {', '.join(CUM_COLUMNS)}) "
+           f"VALUES ({', '.join('?' * (3 + len(READING_COLUMNS) + len(CUM_COLUMNS)))})")
+def prepare_readings(records):
+    """
+    Turns assessments (a DataFrame or list of dicts with patient_id, the
+    VITAL_COLUMNS, optional spo2 and optional ts in Unix seconds) into a
+    frame with every READING_COLUMNS column. bmi, health_score and
+    risk_level are computed like on the Health Monitoring page when missing,
+    and readings without ts are stamped with the current time, a
+    microsecond apart per patient in input order so none of them replaces
+    another.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+    missing = [c for c in ['patient_id'] + VITAL_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Readings are missing columns: {', '.join(missing)}")
+    if df[VITAL_COLUMNS].isna().any().any():
+        raise ValueError("Readings have missing vitals")
+
+    df = df.copy()
+    df['patient_id'] = df['patient_id'].astype(str)
+    ts = df['ts'].astype(np.float64) if 'ts' in df.columns else pd.Series(np.nan, index=df.index)
+    unstamped = ts.isna().to_numpy()
+    if unstamped.any():
+        offsets = df.loc[unstamped].groupby('patient_id', sort=False).cumcount().to_numpy()
+        ts[unstamped] = time.time() + offsets * 1e-6
+    df['ts'] = ts
+    if 'spo2' not in df.columns:
+        df['spo2'] = np.nan
+    if 'bmi' not in df.columns:
+        df['bmi'] = calculate_bmi_batch(df['height'], df['weight'])
+    if 'health_score' not in df.columns:
+        df['health_score'] = calculate_health_score_batch(df['bmi'], df['systolic'], df['diastolic'],
+                                                          df['sugar'], df['heart_rate'], df['age'])
+    if 'risk_level' not in df.columns:
+        df['risk_level'] = RISK_LABELS[get_risk_assessment_codes(df['health_score'].to_numpy())]
+    df = df[['patient_id', 'ts'] + READING_COLUMNS]
+    # One reading per patient and timestamp; the last one given wins
+    return df.drop_duplicates(['patient_id', 'ts'], keep='last')
+
+class PatientHistoryStore:
+    """
+    SQLite store of assessments keyed by (patient_id, ts). The table is
+    clustered on that key, so one patient's readings in a time range are a
+    single contiguous index scan.
+
+    Every row also carries its position in the patient's history (seq) and
+    running sums of the TREND_COLUMNS (cum_*), and the patients table keeps
+    the totals. Appending a reading extends the sums from the stored totals
+    without reading older rows; a reading older than the patient's latest
+    one re-sums only the rows after it. Means over any time range then come
+    from two index lookups instead of a scan.
+
+    Connections are opened per thread; writes are serialized. Connections
+    of threads that have exited are closed as new ones open, and close()
+    (or leaving a `with` block) closes the rest.
+    """
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._conns = {}
+        self._conns_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._write():
+            pass
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Only ever used by this thread, but closed from whichever thread calls close()
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            with self._conns_lock:
+                finished = [thread for thread in self._conns if not thread.is_alive()]
+                for thread in finished:
+                    self._conns.pop(thread).close()
+                self._conns[threading.current_thread()] = conn
+        return conn
+
+    def close(self):
+        """Closes every open connection; the store reconnects if it is used again."""
+        with self._conns_lock:
+            conns, self._conns = list(self._conns.values()), {}
+            self._local = threading.local()
+        for conn in conns:
+            conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        with self._write_lock, conn:
+            yield conn
+
+    def add(self, patient_id, vitals, ts=None):
+        """Stores one assessment (a dict with the VITAL_COLUMNS, optionally spo2/bmi/health_score/risk_level)."""
+        record = dict(vitals, patient_id=patient_id)
+        if ts is not None:
+            record['ts'] = ts
+        return self.add_many([record])
+
+    def add_many(self, records):
+        """
+        Bulk insert in one transaction. Returns the number of readings stored
+        (a reading for an existing (patient_id, ts) replaces it).
+        """
+        df = prepare_readings(records).sort_values(['patient_id', 'ts'], kind='stable')
+        if df.empty:
+            return 0
+
+        with self._write() as conn:
+            state = self._patient_state(conn, df['patient_id'].unique().tolist())
+            last_ts = state['last_ts'].reindex(df['patient_id']).fillna(-np.inf).to_numpy()
+            late = df['ts'].to_numpy() <= last_ts
+            late_patients = df.loc[late, 'patient_id'].unique().tolist()
+
+            # Readings after each patient's latest one extend the running sums
+            new = df[~df['patient_id'].isin(late_patients)]
+            if not new.empty:
+                groups = new.groupby('patient_id', sort=False)
+                stored = state.reindex(new['patient_id']).fillna(0)
+                seq = groups.cumcount().to_numpy() + 1 + stored['n'].to_numpy(dtype=np.int64)
+                sums = groups[TREND_COLUMNS].cumsum().to_numpy() + stored[CUM_COLUMNS].to_numpy()
+                conn.executemany(_INSERT, self._rows(new, seq, sums))
+                self._save_patients(conn, new['patient_id'].unique().tolist())
+
+            # Readings older than what is stored: insert, then re-sum from the earliest of them
+            for patient_id, readings in df[df['patient_id'].isin(late_patients)].groupby('patient_id', sort=False):
+                zeros = np.zeros(len(readings))
+                conn.executemany(_INSERT, self._rows(readings, zeros.astype(np.int64), np.zeros((len(readings), len(CUM_COLUMNS)))))
+                self._resum(conn, patient_id, readings['ts'].min())
+                self._save_patients(conn, [patient_id])
+        return len(df)
+
+    @staticmethod
+    def _rows(df, seq, sums):
+        # Column-wise tolist() gives Python scalars; sqlite stores a NaN spo2 as NULL
+        columns = [df[c].tolist() for c in df.columns] + [seq.tolist()] + [sums[:, i].tolist() for i in range(sums.shape[1])]
+        return zip(*columns)
+
+    @staticmethod
+    def _patient_state(conn, patient_ids):
+        """Frame indexed by patient_id with n, last_ts and the running sums of the stored patients among patient_ids."""
+        rows = []
+        for i in range(0, len(patient_ids), 500):
+            ids = patient_ids[i:i + 500]
+            query = (f"SELECT patient_id, n, last_ts, {', '.join(CUM_COLUMNS)} FROM patients "
+                     f"WHERE patient_id IN ({', '.join('?' * len(ids))})")
+            rows.extend(conn.execute(query, ids).fetchall())
+        state = pd.DataFrame(rows, columns=['patient_id', 'n', 'last_ts'] + CUM_COLUMNS)
+        return state.set_index('patient_id').astype(np.float64)
+
+    @staticmethod
+    def _resum(conn, patient_id, from_ts):
+        before = conn.execute(f"SELECT seq, {', '.join(CUM_COLUMNS)} FROM assessments "
+                              "WHERE patient_id = ? AND ts < ? ORDER BY ts DESC LIMIT 1",
+                              (patient_id, from_ts)).fetchone() or (0,) + (0.0,) * len(CUM_COLUMNS)
+        rows = conn.execute(f"SELECT ts, {', '.join(TREND_COLUMNS)} FROM assessments "
+                            "WHERE patient_id = ? AND ts >= ? ORDER BY ts", (patient_id, from_ts)).fetchall()
+        values = np.array([row[1:] for row in rows], dtype=np.float64)
+        sums = np.cumsum(values, axis=0) + np.array(before[1:])
+        seq = before[0] + np.arange(1, len(rows) + 1)
+        conn.executemany(f"UPDATE assessments SET seq = ?, {', '.join(c + ' = ?' for c in CUM_COLUMNS)} "
+                         "WHERE patient_id = ? AND ts = ?",
+                         [[int(s)] + c + [patient_id, row[0]] for s, c, row in zip(seq.tolist(), sums.tolist(), rows)])
+
+    @staticmethod
+    def _save_patients(conn, patient_ids):
+        """Copies the running sums of each patient's latest reading into the patients table."""
+        conn.executemany(f"""
+            INSERT OR REPLACE INTO patients (patient_id, n, first_ts, last_ts, {', '.join(CUM_COLUMNS)})
+            SELECT patient_id, seq, (SELECT MIN(ts) FROM assessments WHERE patient_id = ?1), ts, {', '.join(CUM_COLUMNS)}
+            FROM assessments WHERE patient_id = ?1 ORDER BY ts DESC LIMIT 1
+        """, [(patient_id,) for patient_id in patient_ids])
+
+    def history(self, patient_id, start=None, end=None, columns=None):
+        """One patient's readings with start <= ts <= end (Unix seconds, None = open), oldest first."""
+        columns = columns or READING_COLUMNS
+        query = f"SELECT ts, {', '.join(columns)} FROM assessments WHERE patient_id = ? AND ts >= ? AND ts <= ? ORDER BY ts"
+        bounds = (str(patient_id), -np.inf if start is None else start, np.inf if end is None else end)
+        return pd.DataFrame(self._conn().execute(query, bounds).fetchall(), columns=['ts'] + columns)
+
+    def latest(self, patient_id, n=10, columns=None):
+        """The patient's n most recent readings, oldest first."""
+        columns = columns or READING_COLUMNS
+        query = f"SELECT ts, {', '.join(columns)} FROM assessments WHERE patient_id = ? ORDER BY ts DESC LIMIT ?"
+        rows = self._conn().execute(query, (str(patient_id), n)).fetchall()
+        return pd.DataFrame(rows[::-1], columns=['ts'] + columns)
+
+    def _sums_at(self, patient_id, ts, inclusive=True):
+        """(seq, cum_*) of the last reading at or before ts, zeros if there is none."""
+        op = "<=" if inclusive else "<"
+        row = self._conn().execute(f"SELECT seq, {', '.join(CUM_COLUMNS)} FROM assessments "
+                                   f"WHERE patient_id = ? AND ts {op} ? ORDER BY ts DESC LIMIT 1",
+                                   (str(patient_id), ts)).fetchone()
+        return np.array(row if row else (0,) + (0.0,) * len(CUM_COLUMNS), dtype=np.float64)
+
+    def window_stats(self, patient_id, start=None, end=None):
+        """Count and mean of the TREND_COLUMNS over start <= ts <= end, from two index lookups."""
+        high = self._sums_at(patient_id, np.inf if end is None else end)
+        low = self._sums_at(patient_id, -np.inf if start is None else start, inclusive=False)
+        diff = high - low
+        count = int(diff[0])
+        stats = {"count": count}
+        for column, total in zip(TREND_COLUMNS, diff[1:]):
+            stats[column] = total / count if count else float('nan')
+        return stats
+
+    def rolling_means(self, patient_id, window, start=None, end=None):
+        """
+        For every reading with start <= ts <= end, the mean of each
+        TREND_COLUMNS over the readings in (ts - window, ts], as a frame with
+        ts, count and one column per trend column. Computed from the stored
+        running sums: one range scan plus one lookup, no re-summing.
+        """
+        start = -np.inf if start is None else start
+        columns = ['seq'] + CUM_COLUMNS
+        rows = self.history(patient_id, start - window, end, columns=columns)
+        if rows.empty:
+            return pd.DataFrame(columns=['ts', 'count'] + TREND_COLUMNS)
+        before = self._sums_at(patient_id, rows['ts'].iloc[0], inclusive=False)
+        ts = rows['ts'].to_numpy()
+        sums = np.vstack([before, rows[columns].to_numpy(dtype=np.float64)])
+        # Row j + 1 of sums holds the running sums up to reading j
+        first = np.searchsorted(ts, ts - window, side='right')
+        diff = sums[1:] - sums[first]
+        keep = ts >= start
+        out = pd.DataFrame(diff[keep, 1:] / diff[keep, :1], columns=TREND_COLUMNS)
+        out.insert(0, 'count', diff[keep, 0].astype(np.int64))
+        out.insert(0, 'ts', ts[keep])
+        return out
+
+    def summary(self, patient_id):
+        """Reading count, first/last timestamp and lifetime means of one patient, or None if unknown."""
+        row = self._conn().execute(f"SELECT n, first_ts, last_ts, {', '.join(CUM_COLUMNS)} FROM patients WHERE patient_id = ?",
+                                   (str(patient_id),)).fetchone()
+        if row is None:
+            return None
+        n, first_ts, last_ts = row[:3]
+        summary = {"count": n, "first_ts": first_ts, "last_ts": last_ts}
+        summary.update({column: total / n for column, total in zip(TREND_COLUMNS, row[3:])})
+        return summary
+
+    def patients(self, limit=None):
+        """Patient ids, most recently assessed first."""
+        query = "SELECT patient_id FROM patients ORDER BY last_ts DESC"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return [row[0] for row in self._conn().execute(query)]
+
+    def count(self):
+        return self._conn().execute("SELECT COALESCE(SUM(n), 0) FROM patients").fetchone()[0]
+
+def generate_history(n_patients, readings_per_patient, seed=0, first_patient=0, interval=86400.0):
+    """
+    Synthetic assessment history: every patient's vitals drift as a random
+    walk around a personal baseline, one reading about every `interval`
+    seconds, ending now. Patient ids run from P{first_patient:06d}.
+    Returns a DataFrame ready for add_many.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_patients * readings_per_patient
+    end = time.time()
+    patient = np.repeat(np.arange(n_patients), readings_per_patient)
+    step = np.tile(np.arange(readings_per_patient), n_patients)
+    ts = end - interval * (readings_per_patient - step) + rng.uniform(0, interval / 2, n)
+
+    def walk(baseline, spread, scale, low, high):
+        base = rng.normal(baseline, spread, n_patients)[patient]
+        drift = np.cumsum(rng.normal(0, scale, (n_patients, readings_per_patient)), axis=1).ravel()
+        return np.clip(np.round(base + drift), low, high)
+
+    height = rng.normal(170, 10, n_patients).round()[patient]
+    return pd.DataFrame({
+        'patient_id': np.char.add('P', np.char.zfill((patient + first_patient).astype(str), 6)),
+        'ts': ts,
+        'age': rng.integers(20, 80, n_patients)[patient],
+        'height': height,
+        'weight': walk(75, 12, 0.3, 40, 200),
+        'systolic': walk(125, 12, 1.5, 80, 220),
+        'diastolic': walk(80, 8, 1.0, 50, 140),
+        'sugar': walk(110, 20, 3.0, 60, 400),
+        'heart_rate': walk(72, 8, 1.0, 40, 160),
+        'spo2': walk(97, 1, 0.2, 85, 100),
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the patient history store with synthetic assessments.")
+    parser.add_argument("--db", default=HISTORY_DB, help="SQLite file")
+    parser.add_argument("--patients", type=int, default=1000)
+    parser.add_argument("--readings", type=int, default=365, help="Readings per patient")
+    parser.add_argument("--batch-patients", type=int, default=500, help="Patients per insert transaction")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    total = 0
+    with PatientHistoryStore(args.db) as store:
+        for first in range(0, args.patients, args.batch_patients):
+            batch = generate_history(min(args.batch_patients, args.patients - first), args.readings,
+                                     seed=first, first_patient=first)
+            total += store.add_many(batch)
+    elapsed = time.perf_counter() - start
+    print(f"Stored {total:,} readings in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} readings/sec) -> {args.db}")
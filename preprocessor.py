@@ -1,15 +1,33 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, LabelEncoder
+import numpy as np
+from utils.data_generator import COLUMNS, RISK_LEVELS
+from utils.instrumentation import timed
 
-def preprocess_data(df):
+TARGET_COLUMN = 'Risk_Level'
+FEATURE_COLUMNS = [c for c in COLUMNS if c != TARGET_COLUMN]
+# LabelEncoder sorts classes, so this matches a fit on any data containing all levels
+RISK_CLASSES = sorted(RISK_LEVELS)
+
+@timed()
+def preprocess_data(df, compact=False):
     """
     Preprocesses the dataframe:
     - Encodes target variable
     - Splits into X and y
     - Scales numerical features
     - Returns X_train, X_test, y_train, y_test, scaler, le
+
+    compact=True gives the same split and encoding, but the features are
+    built once as a single float32 matrix and scaled in place. X_train and
+    X_test are views into it (see preprocess_data_compact).
     """
+    if compact:
+        return preprocess_data_compact(df)
+
+    # sklearn is imported on first use so the module stays cheap to import
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler, LabelEncoder
+
     # Copy to avoid setting with copy warning
     df = df.copy()
     
@@ -29,3 +47,73 @@ def preprocess_data(df):
     X_test_scaled = scaler.transform(X_test)
     
     return X_train_scaled, X_test_scaled, y_train, y_test, scaler, le
+
+@timed()
+def preprocess_data_compact(df):
+    """
+    Low-memory equivalent of preprocess_data for large cohorts. The input is
+    never copied: each feature column is gathered straight into one
+    contiguous float32 matrix in train-then-test order, so X_train/X_test are
+    slices of it, and scaling is applied in place. Results match
+    preprocess_data up to float32 precision.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler, LabelEncoder
+
+    features = [c for c in df.columns if c != TARGET_COLUMN]
+    n = len(df)
+
+    # Encode target: hash-based factorize, then relabel in sorted order like LabelEncoder
+    codes, uniques = pd.factorize(df[TARGET_COLUMN])
+    if codes.min(initial=0) < 0:
+        # factorize codes missing labels as -1, which rank[] would wrap to a real class
+        raise ValueError(f"{TARGET_COLUMN} has {int((codes < 0).sum())} missing values")
+    uniques = np.asarray(uniques, dtype=object)
+    sorter = np.argsort(uniques)
+    rank = np.empty_like(sorter)
+    rank[sorter] = np.arange(len(sorter))
+    le = LabelEncoder()
+    le.classes_ = uniques[sorter]
+
+    # Split on row indices only; same shuffle as splitting the frame
+    train_idx, test_idx = train_test_split(np.arange(n), test_size=0.2, random_state=42)
+    order = np.concatenate([train_idx, test_idx])
+    n_train = len(train_idx)
+
+    X = np.empty((n, len(features)), dtype=np.float32)
+    for j, col in enumerate(features):
+        X[:, j] = df[col].to_numpy()[order]
+    X_train, X_test = X[:n_train], X[n_train:]
+
+    y = pd.Series(rank[codes[order]], index=df.index[order], name=TARGET_COLUMN)
+    y_train, y_test = y.iloc[:n_train], y.iloc[n_train:]
+
+    # Scale in place with train statistics
+    scaler = StandardScaler()
+    scaler.fit(X_train)
+    scaler.feature_names_in_ = np.asarray(features, dtype=object)
+    X -= scaler.mean_.astype(np.float32)
+    X /= scaler.scale_.astype(np.float32)
+
+    return X_train, X_test, y_train, y_test, scaler, le
+
+def make_label_encoder():
+    """LabelEncoder with the fixed RISK_CLASSES order, for data that never fits in memory."""
+    from sklearn.preprocessing import LabelEncoder
+    le = LabelEncoder()
+    le.classes_ = np.array(RISK_CLASSES, dtype=object)
+    return le
+
+def fit_scaler_streaming(chunks, features=FEATURE_COLUMNS):
+    """Fits a StandardScaler with partial_fit over an iterable of DataFrame chunks."""
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    for chunk in chunks:
+        scaler.partial_fit(chunk[features])
+    return scaler
+
+def transform_chunk(chunk, scaler, le, features=FEATURE_COLUMNS):
+    """Scaled feature matrix and encoded labels for one chunk."""
+    X = scaler.transform(chunk[features])
+    y = le.transform(chunk[TARGET_COLUMN].astype(str))
+    return X, y
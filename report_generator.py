@@ -1,6 +1,17 @@
 
 from fpdf import FPDF
 import datetime
+import hashlib
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from utils.instrumentation import timed
+
+DISCLAIMER = "Disclaimer: This report is generated by an AI system for educational purposes only. It does not constitute a medical diagnosis. Please consult a professional for medical advice."
+REPORT_CACHE_SIZE = 256
+# Recommendation texts whose layout the template keeps; others are laid out per report
+TEMPLATE_FRAGMENT_LIMIT = 512
 
 class HealthReportPDF(FPDF):
     def header(self):
@@ -15,10 +26,36 @@ class HealthReportPDF(FPDF):
         self.set_font('Arial', 'I', 8)
         self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
 
-def generate_pdf_report(user_data, results, alerts, recs):
+def _vitals(user_data, results):
+    return [
+        ("Age", f"{user_data['age']} years"),
+        ("Gender", f"{user_data['gender']}"),
+        ("Height", f"{user_data['height']} cm"),
+        ("Weight", f"{user_data['weight']} kg"),
+        ("BMI", f"{results['bmi']:.1f} ({results['bmi_cat']})"),
+        ("Blood Pressure", f"{user_data['systolic']}/{user_data['diastolic']} mmHg"),
+        ("Blood Sugar", f"{user_data['sugar']} mg/dL"),
+        ("Heart Rate", f"{user_data['heart_rate']} bpm"),
+    ]
+
+def _risk_color(risk):
+    if "High" in risk:
+        return (220, 53, 69) # Red
+    elif "Medium" in risk:
+        return (255, 193, 7) # Orange/Yellow
+    else:
+        return (40, 167, 69) # Green
+
+@timed()
+def generate_pdf_report(user_data, results, alerts, recs, template=False):
     """
     Generates a PDF report from health data.
+    With template=True the report is assembled from the per-process
+    template (see generate_pdf_report_template).
     """
+    if template:
+        return generate_pdf_report_template(user_data, results, alerts, recs)
+
     pdf = HealthReportPDF()
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -35,16 +72,7 @@ def generate_pdf_report(user_data, results, alerts, recs):
     pdf.ln(2)
     
     pdf.set_font("Arial", size=11)
-    vitals = [
-        ("Age", f"{user_data['age']} years"),
-        ("Gender", f"{user_data['gender']}"),
-        ("Height", f"{user_data['height']} cm"),
-        ("Weight", f"{user_data['weight']} kg"),
-        ("BMI", f"{results['bmi']:.1f} ({results['bmi_cat']})"),
-        ("Blood Pressure", f"{user_data['systolic']}/{user_data['diastolic']} mmHg"),
-        ("Blood Sugar", f"{user_data['sugar']} mg/dL"),
-        ("Heart Rate", f"{user_data['heart_rate']} bpm"),
-    ]
+    vitals = _vitals(user_data, results)
     
     col_width = pdf.w / 2.5
     for label, value in vitals:
@@ -61,12 +89,7 @@ def generate_pdf_report(user_data, results, alerts, recs):
     risk = results['risk_level']
     
     # Color logic
-    if "High" in risk:
-        pdf.set_text_color(220, 53, 69) # Red
-    elif "Medium" in risk:
-        pdf.set_text_color(255, 193, 7) # Orange/Yellow
-    else:
-        pdf.set_text_color(40, 167, 69) # Green
+    pdf.set_text_color(*_risk_color(risk))
         
     pdf.cell(0, 10, f"Overall Risk Status: {risk}", 0, 1, 'C')
     
@@ -99,7 +122,300 @@ def generate_pdf_report(user_data, results, alerts, recs):
     pdf.ln(20)
     pdf.set_font("Arial", 'I', 9)
     pdf.set_text_color(100, 100, 100)
-    pdf.multi_cell(0, 5, "Disclaimer: This report is generated by an AI system for educational purposes only. It does not constitute a medical diagnosis. Please consult a professional for medical advice.", 0, 'C')
+    pdf.multi_cell(0, 5, DISCLAIMER, 0, 'C')
 
     # Output to bytes
     return pdf.output(dest='S').encode('latin-1')
+
+class _ReportTemplate:
+    """
+    The parts of generate_pdf_report's output that do not depend on the
+    patient, built once per process: the page prefix with the header, the
+    footer, the PDF object skeleton (fonts, resources, catalog) and recorded
+    drawing operators for the section banners, headings, disclaimer and
+    every recommendation seen so far, so their line breaking is done once.
+
+    A report is then the recorded fragments, each shifted to its position
+    with a "cm" translation, plus single-line text operators for the
+    per-patient values, written into the skeleton. Layouts that would run
+    past the page break are left to the regular FPDF path.
+
+    This relies on FPDF 1.7.2 internals (pinned in requirements.txt). The
+    constructor renders a sample report and checks its object table, and
+    raises ValueError when the output is not laid out as expected, in which
+    case every report goes through generate_pdf_report.
+    """
+
+    @staticmethod
+    def _new_page():
+        """A one-page document with the fonts registered in report order (F1 bold, F2 regular, F3 italic)."""
+        pdf = HealthReportPDF()
+        pdf.set_compression(False)
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+        prefix, y = pdf.pages[1], pdf.y
+        pdf.set_font("Arial", size=10)
+        pdf.set_font("Arial", 'I', 9)
+        return pdf, prefix, y
+
+    def __init__(self):
+        # Scratch page the fragments are recorded on
+        sample, self.prefix, self.start_y = self._new_page()
+        self._pdf = sample
+        self.k = sample.k
+        self.page_h = sample.h
+        self.break_y = sample.page_break_trigger
+        self.left = sample.l_margin
+        self.width = sample.w - sample.r_margin - sample.l_margin
+        self.c_margin = sample.c_margin
+        self.fragments = {}
+        self._lock = threading.Lock()
+
+        self._record("vitals_banner", lambda pdf: self._banner(pdf, "  Patient Vitals", 2))
+        self._record("results_banner", lambda pdf: self._banner(pdf, "  Assessment Results", 5))
+        self._record("alerts_heading", self._alerts_heading)
+        self._record("recs_heading", self._recs_heading)
+        self._record("disclaimer", self._disclaimer)
+        self._fonts = {key: (font['i'], font['cw']) for key, font in sample.fonts.items()}
+
+        footer_start = len(sample.pages[1])
+        sample.font_family = ''
+        sample.in_footer = 1
+        sample.footer()
+        sample.in_footer = 0
+        self.footer = sample.pages[1][footer_start:]
+        sample.pages[1] = sample.pages[1][:footer_start]
+
+        # Object skeleton: everything in the output except the page content and date
+        skeleton, _, _ = self._new_page()
+        skeleton.pages[1] = ""
+        skeleton.footer = lambda: None
+        out = skeleton.output(dest='S')
+        self.head, rest = out.split("4 0 obj\n", 1)
+        rest = rest.split("endobj\n", 1)[1]
+        self.objects = re.findall(r"(?s)(\d+) 0 obj\n(.*?endobj\n)", rest.split("xref\n", 1)[0])
+        self.trailer = rest.split("trailer\n", 1)[1].rsplit("startxref", 1)[0]
+        self._check()
+
+    def _check(self):
+        """Renders a sample report and verifies every xref entry points at its object."""
+        user_data = {'age': 30, 'gender': 'Other', 'height': 170, 'weight': 70,
+                     'systolic': 120, 'diastolic': 80, 'sugar': 95, 'heart_rate': 72}
+        results = {'bmi': 24.2, 'bmi_cat': 'Normal', 'risk_level': 'Low Risk', 'health_score': 100}
+        pdf = self.render(user_data, results, [("Alert", "Check")], ["Check"], datetime.datetime.now())
+        if pdf is None or not pdf.startswith(b"%PDF-") or not pdf.rstrip().endswith(b"%%EOF"):
+            raise ValueError("Template output is not a PDF document")
+        xref_at = int(pdf.rsplit(b"startxref", 1)[1].split()[0])
+        lines = pdf[xref_at:].split(b"\n")
+        if lines[0] != b"xref":
+            raise ValueError("Template startxref does not point at the xref table")
+        count = int(lines[1].split()[1])
+        for number in range(1, count):
+            offset = int(lines[2 + number].split()[0])
+            if not pdf.startswith(b"%d 0 obj" % number, offset):
+                raise ValueError(f"Template xref entry {number} does not point at its object")
+
+    @staticmethod
+    def _banner(pdf, text, gap):
+        pdf.set_font("Arial", 'B', 14)
+        pdf.set_fill_color(240, 240, 240)
+        pdf.cell(0, 10, text, 0, 1, 'L', fill=True)
+        pdf.ln(gap)
+
+    @staticmethod
+    def _alerts_heading(pdf):
+        pdf.set_font("Arial", 'B', 12)
+        pdf.set_text_color(200, 0, 0)
+        pdf.cell(0, 10, "Detected Medical Alerts:", 0, 1)
+
+    @staticmethod
+    def _recs_heading(pdf):
+        pdf.set_font("Arial", 'B', 12)
+        pdf.cell(0, 10, "Lifestyle Recommendations:", 0, 1)
+
+    @staticmethod
+    def _disclaimer(pdf):
+        pdf.set_font("Arial", 'I', 9)
+        pdf.set_text_color(100, 100, 100)
+        pdf.multi_cell(0, 5, DISCLAIMER, 0, 'C')
+
+    def _record(self, key, draw, keep=True):
+        """Runs draw on the scratch page from a clean state and returns (and keeps) its operators and height."""
+        pdf = self._pdf
+        pdf.font_family = ''
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_fill_color(255, 255, 255)
+        pdf.x, pdf.y = pdf.l_margin, self.start_y
+        start = len(pdf.pages[1])
+        draw(pdf)
+        fragment = (pdf.pages[1][start:], pdf.y - self.start_y)
+        pdf.pages[1] = pdf.pages[1][:start]
+        if keep:
+            self.fragments[key] = fragment
+        return fragment
+
+    def _rec_fragment(self, rec):
+        fragment = self.fragments.get(("rec", rec))
+        if fragment is None:
+            def draw(pdf):
+                pdf.set_font("Arial", size=11)
+                pdf.multi_cell(0, 7, f"- {rec}")
+            with self._lock:
+                fragment = self._record(("rec", rec), draw, keep=len(self.fragments) < TEMPLATE_FRAGMENT_LIMIT)
+        return fragment
+
+    def _place(self, fragment, y):
+        ops, _ = fragment
+        return "q 1 0 0 1 0 %.2f cm\n%sQ\n" % (-(y - self.start_y) * self.k, ops)
+
+    def _font(self, style, size):
+        i, _ = self._fonts["helvetica" + style]
+        return "BT /F%d %.2f Tf ET\n" % (i, size)
+
+    def _text(self, y, h, txt, style, size, align='L', color=None):
+        """Operators for a borderless single-line cell, positioned as FPDF.cell does."""
+        font_size = size / self.k
+        if align == 'L':
+            dx = self.c_margin
+        else:
+            _, cw = self._fonts["helvetica" + style]
+            text_w = sum(cw.get(ch, 0) for ch in txt) * font_size / 1000.0
+            dx = (self.width - text_w) / 2.0 if align == 'C' else self.width - self.c_margin - text_w
+        txt = txt.replace('\\', '\\\\').replace(')', '\\)').replace('(', '\\(').replace('\r', '\\r')
+        op = "BT %.2f %.2f Td (%s) Tj ET" % ((self.left + dx) * self.k,
+                                             (self.page_h - (y + .5 * h + .3 * font_size)) * self.k, txt)
+        if color is not None:
+            op = "q %.3f %.3f %.3f rg %s Q" % (color[0] / 255., color[1] / 255., color[2] / 255., op)
+        return op + "\n"
+
+    @timed("report_generator.template_render")
+    def render(self, user_data, results, alerts, recs, now):
+        """Returns the report bytes, or None when the content would not fit on one page."""
+        ops = [self.prefix]
+        y = self.start_y
+
+        ops.append(self._font('', 10))
+        ops.append(self._text(y, 10, f"Generated on: {now.strftime('%Y-%m-%d %H:%M')}", '', 10, 'R'))
+        y += 10 + 5
+
+        ops.append(self._place(self.fragments["vitals_banner"], y))
+        y += self.fragments["vitals_banner"][1]
+        ops.append(self._font('', 11))
+        for label, value in _vitals(user_data, results):
+            ops.append(self._text(y, 8, f"{label}: {value}", '', 11))
+            y += 8
+        y += 10
+
+        ops.append(self._place(self.fragments["results_banner"], y))
+        y += self.fragments["results_banner"][1]
+        risk = results['risk_level']
+        ops.append(self._font('B', 16))
+        ops.append(self._text(y, 10, f"Overall Risk Status: {risk}", 'B', 16, 'C', _risk_color(risk)))
+        y += 10
+        ops.append(self._font('', 14))
+        ops.append(self._text(y, 10, f"Health Score: {results['health_score']}/100", '', 14, 'C'))
+        y += 10 + 5
+
+        if alerts:
+            ops.append(self._place(self.fragments["alerts_heading"], y))
+            y += self.fragments["alerts_heading"][1]
+            ops.append(self._font('', 11))
+            for title, msg in alerts:
+                if y + 7 > self.break_y:
+                    return None
+                ops.append(self._text(y, 7, f"- {title}: {msg}", '', 11))
+                y += 7
+            y += 5
+
+        ops.append(self._place(self.fragments["recs_heading"], y))
+        y += self.fragments["recs_heading"][1]
+        for rec in recs:
+            fragment = self._rec_fragment(rec)
+            if y + fragment[1] > self.break_y:
+                return None
+            ops.append(self._place(fragment, y))
+            y += fragment[1]
+
+        y += 20
+        if y + self.fragments["disclaimer"][1] > self.break_y:
+            return None
+        ops.append(self._place(self.fragments["disclaimer"], y))
+        ops.append(self.footer)
+        return self._document("".join(ops), now)
+
+    def _document(self, content, now):
+        """Writes the page content and creation date into the object skeleton."""
+        stream = zlib.compress(content.encode('latin-1'))
+        parts = [self.head.encode('latin-1')]
+        offset = len(parts[0])
+        offsets = {3: self.head.index("3 0 obj")}
+        offsets[4] = offset
+        parts.append(b"4 0 obj\n<</Filter /FlateDecode /Length %d>>\nstream\n" % len(stream)
+                     + stream + b"\nendstream\nendobj\n")
+        offset += len(parts[-1])
+        for number, body in self.objects:
+            if "/CreationDate" in body:
+                body = re.sub(r"\(D:\d+\)", now.strftime("(D:%Y%m%d%H%M%S)"), body)
+            obj = f"{number} 0 obj\n{body}".encode('latin-1')
+            offsets[int(number)] = offset
+            parts.append(obj)
+            offset += len(obj)
+        xref = ["xref", f"0 {len(offsets) + 1}", "0000000000 65535 f "]
+        xref += ["%010d 00000 n " % offsets[i] for i in range(1, len(offsets) + 1)]
+        parts.append(("\n".join(xref) + "\ntrailer\n" + self.trailer
+                      + f"startxref\n{offset}\n%%EOF\n").encode('latin-1'))
+        return b"".join(parts)
+
+_template = None
+_template_lock = threading.Lock()
+_report_cache = OrderedDict()
+_report_cache_lock = threading.Lock()
+
+def _get_template():
+    """The per-process _ReportTemplate, or False when it cannot be built with this FPDF."""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                try:
+                    _template = _ReportTemplate()
+                except (ValueError, KeyError, IndexError, AttributeError):
+                    _template = False
+    return _template
+
+def report_cache_key(user_data, results, alerts, recs, now):
+    """Hash of everything that ends up in the report, down to the minute printed on it."""
+    payload = repr((sorted(user_data.items()), sorted(results.items()), list(alerts), list(recs),
+                    now.strftime('%Y-%m-%d %H:%M')))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+@timed()
+def generate_pdf_report_template(user_data, results, alerts, recs, cache=True):
+    """
+    Same report as generate_pdf_report, assembled from the per-process
+    _ReportTemplate so only the per-patient fields are laid out. With
+    cache=True the bytes are also kept in a small LRU cache keyed on a hash
+    of the inputs, so identical submissions (e.g. Streamlit reruns) within
+    the same minute return the cached report.
+    """
+    now = datetime.datetime.now()
+    key = None
+    if cache:
+        key = report_cache_key(user_data, results, alerts, recs, now)
+        with _report_cache_lock:
+            cached = _report_cache.get(key)
+            if cached is not None:
+                _report_cache.move_to_end(key)
+                return cached
+
+    template = _get_template()
+    report = template.render(user_data, results, alerts, recs, now) if template else None
+    if report is None:
+        report = generate_pdf_report(user_data, results, alerts, recs)
+
+    if cache:
+        with _report_cache_lock:
+            _report_cache[key] = report
+            if len(_report_cache) > REPORT_CACHE_SIZE:
+                _report_cache.popitem(last=False)
+    return report
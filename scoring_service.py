@@ -0,0 +1,285 @@
+import os
+import json
+import math
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from utils.health_metrics import score_batch, ALERT_TABLE, RECOMMENDATION_TABLE
+from utils.model_inference import get_predictor
+from utils.instrumentation import timed, render_prometheus
+from utils.drift_monitor import DriftMonitor, OUT_OF_RANGE_NAMES
+
+VITALS = ['age', 'height', 'weight', 'systolic', 'diastolic', 'sugar', 'heart_rate']
+MAX_BATCH_RECORDS = 100_000
+
+# Defaults can be set through the environment so every server process
+# started by `--processes N` picks up the same settings.
+DEFAULT_BATCH_SIZE = int(os.environ.get("SCORING_BATCH_SIZE", 256))
+DEFAULT_BATCH_DELAY_MS = float(os.environ.get("SCORING_BATCH_DELAY_MS", 1))
+DEFAULT_POOL_WORKERS = int(os.environ.get("SCORING_POOL_WORKERS", 1))
+
+# JSON-ready alerts and recommendations per alert bitmask
+ALERTS_BY_FLAGS = [[{"title": title, "message": msg} for title, msg in alerts] for alerts in ALERT_TABLE]
+RECS_BY_FLAGS = RECOMMENDATION_TABLE
+
+class RequestError(ValueError):
+    """A request the client has to fix; answered with HTTP 400."""
+
+def parse_record(record):
+    """Validates one patient record and returns it with numeric vitals (spo2 optional)."""
+    if not isinstance(record, dict):
+        raise RequestError("Each record must be a JSON object")
+    missing = [key for key in VITALS if key not in record]
+    if missing:
+        raise RequestError(f"Missing fields: {', '.join(missing)}")
+    parsed = {}
+    for key in VITALS + ['spo2']:
+        value = record.get(key)
+        if value is None and key == 'spo2':
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RequestError(f"Field {key} must be a number")
+        # json.loads accepts NaN and Infinity; huge ints do not fit a float
+        try:
+            finite = math.isfinite(value)
+        except OverflowError:
+            finite = False
+        if not finite:
+            raise RequestError(f"Field {key} must be a finite number")
+        parsed[key] = value
+    return parsed
+
+@timed()
+def score_records(records, predictor=None, drift=None):
+    """
+    Scores a list of parsed records in one vectorized pass (score_batch),
+    adding alerts, recommendations and, for records with spo2 when a model
+    is loaded, the AI risk prediction. With a DriftMonitor the model inputs
+    are also added to its live sketch and each prediction lists the inputs
+    outside the training range. Returns one result dict per record.
+    """
+    data = {key: np.array([r[key] for r in records], dtype=np.float64) for key in VITALS}
+    results = score_batch(data)
+    flags = results["alert_flags"].tolist()
+    bmi = results["bmi"]
+
+    ai = {}
+    if predictor is not None:
+        with_spo2 = [i for i, r in enumerate(records) if 'spo2' in r]
+        if with_spo2:
+            X = np.column_stack([data['age'][with_spo2], bmi[with_spo2], data['systolic'][with_spo2],
+                                 data['diastolic'][with_spo2], data['heart_rate'][with_spo2],
+                                 [records[i]['spo2'] for i in with_spo2]])
+            proba = predictor.predict_proba(X)
+            labels = predictor.classes[np.argmax(proba, axis=1)].tolist()
+            classes = predictor.classes.tolist()
+            outside = [0] * len(with_spo2)
+            if drift is not None:
+                drift.observe(X)
+                outside = drift.out_of_range_mask(X).tolist()
+            for row, i in enumerate(with_spo2):
+                ai[i] = (str(labels[row]), dict(zip(classes, proba[row].tolist())), OUT_OF_RANGE_NAMES[outside[row]])
+
+    columns = {key: results[key].tolist() for key in results if key != "alert_flags"}
+    out = []
+    for i in range(len(records)):
+        item = {key: values[i] for key, values in columns.items()}
+        item["alerts"] = ALERTS_BY_FLAGS[flags[i]]
+        item["recommendations"] = RECS_BY_FLAGS[flags[i]]
+        if i in ai:
+            item["ai_risk"], item["ai_probabilities"], item["ai_out_of_range"] = ai[i]
+        out.append(item)
+    return out
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-record requests. Records wait at most
+    max_delay seconds (or until max_batch_size are queued) and are then
+    scored together by one score_records call on the executor, so the event
+    loop keeps accepting requests while a batch is being computed.
+    """
+
+    def __init__(self, score, executor, max_batch_size=DEFAULT_BATCH_SIZE, max_delay=DEFAULT_BATCH_DELAY_MS / 1000):
+        self.score = score
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, record):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        records = [record for record, _ in batch]
+        task = asyncio.get_running_loop().run_in_executor(self.executor, self.score, records)
+        task.add_done_callback(lambda done: self._deliver(batch, done))
+
+    @staticmethod
+    def _deliver(batch, done):
+        error = done.exception()
+        results = None if error is not None else done.result()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+class ScoringApp:
+    """
+    ASGI application exposing the health_metrics scoring and the risk model:
+
+      GET  /health       -> {"status": "ok", "model": bool}
+      POST /score        -> one record in, one result out (micro-batched)
+      POST /score/batch  -> {"records": [...]} in, {"results": [...]} out
+      GET  /metrics      -> timing histograms in Prometheus text format
+      GET  /drift        -> drift of the scored model inputs vs the training data
+
+    Records carry the Health Monitoring form fields (age, height, weight,
+    systolic, diastolic, sugar, heart_rate) and optionally spo2 for the
+    model prediction. Scoring runs on a thread pool of pool_workers threads.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, batch_delay_ms=DEFAULT_BATCH_DELAY_MS,
+                 pool_workers=DEFAULT_POOL_WORKERS, load_model=True):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_ms / 1000
+        self.pool_workers = pool_workers
+        self.load_model = load_model
+        self.predictor = None
+        self.drift = None
+        self.executor = None
+        self.batcher = None
+
+    def _start(self):
+        if self.executor is not None:
+            return
+        self.executor = ThreadPoolExecutor(max_workers=self.pool_workers, thread_name_prefix="scoring")
+        if self.load_model:
+            try:
+                self.predictor = get_predictor()
+            except FileNotFoundError:
+                self.predictor = None
+            try:
+                self.drift = DriftMonitor.load()
+            except FileNotFoundError:
+                self.drift = None
+        self.batcher = MicroBatcher(self._score, self.executor, self.batch_size, self.batch_delay)
+
+    def _stop(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def _score(self, records):
+        return score_records(records, self.predictor, self.drift)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    self._start()
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    self._stop()
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        self._start()
+        method, path = scope["method"], scope["path"].rstrip("/")
+        try:
+            if path == "/health" and method == "GET":
+                status, payload = 200, {"status": "ok", "model": self.predictor is not None}
+            elif path == "/metrics" and method == "GET":
+                status, payload = 200, render_prometheus()
+            elif path == "/drift" and method == "GET":
+                if self.drift is None:
+                    status, payload = 404, {"error": "The loaded model has no training reference"}
+                else:
+                    status, payload = 200, {"features": self.drift.scores()}
+            elif path == "/score" and method == "POST":
+                record = parse_record(await self._read_json(receive))
+                status, payload = 200, await self.batcher.submit(record)
+            elif path == "/score/batch" and method == "POST":
+                body = await self._read_json(receive)
+                records = body.get("records") if isinstance(body, dict) else body
+                if not isinstance(records, list):
+                    raise RequestError('Expected {"records": [...]}')
+                if len(records) > MAX_BATCH_RECORDS:
+                    raise RequestError(f"At most {MAX_BATCH_RECORDS} records per request")
+                parsed = [parse_record(record) for record in records]
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self._score, parsed) if parsed else []
+                status, payload = 200, {"results": results}
+            elif path in ("/health", "/metrics", "/drift", "/score", "/score/batch"):
+                status, payload = 405, {"error": "Method not allowed"}
+            else:
+                status, payload = 404, {"error": "Not found"}
+        except RequestError as e:
+            status, payload = 400, {"error": str(e)}
+
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), b"text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload).encode(), b"application/json"
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", content_type),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _read_json(receive):
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        try:
+            return json.loads(b"".join(chunks) or b"null")
+        except ValueError:
+            raise RequestError("Body is not valid JSON")
+
+def create_app():
+    """App factory for ASGI servers, configured from the SCORING_* environment variables."""
+    return ScoringApp()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the health scoring HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--processes", type=int, default=1, help="Server processes")
+    parser.add_argument("--pool-workers", type=int, default=DEFAULT_POOL_WORKERS, help="Scoring threads per process")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Max single requests coalesced into one call")
+    parser.add_argument("--batch-delay-ms", type=float, default=DEFAULT_BATCH_DELAY_MS,
+                        help="How long a single request may wait for others to join its batch")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The scoring service needs an ASGI server: pip install uvicorn")
+
+    os.environ["SCORING_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["SCORING_BATCH_DELAY_MS"] = str(args.batch_delay_ms)
+    os.environ["SCORING_POOL_WORKERS"] = str(args.pool_workers)
+    uvicorn.run("utils.scoring_service:create_app", factory=True, host=args.host, port=args.port,
+                workers=args.processes, log_level="warning")
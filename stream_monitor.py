@@ -0,0 +1,423 @@
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+from array import array
+from utils.health_metrics import calculate_bmi, classify_bp, classify_sugar, calculate_health_score, get_risk_assessment
+
+WINDOW_SIZE = 32     # readings kept per patient and vital
+STREAK_LENGTH = 3    # consecutive readings that make a sustained trend
+READ_SIZE = 1 << 16
+MAX_LINE = 1 << 20   # longer unterminated input is dropped as invalid
+
+VITALS = ['systolic', 'diastolic', 'sugar', 'heart_rate']
+# Every numeric field a reading may carry; all are checked before any state changes
+NUMERIC_FIELDS = VITALS + ['ts', 'age', 'bmi', 'height', 'weight']
+
+ALERT_TEXT = {
+    "sustained_stage2_bp": ("Sustained Stage 2 Hypertension",
+                            "{n} consecutive readings in Hypertension Stage 2. Please consult a doctor."),
+    "sustained_high_sugar": ("Sustained High Blood Sugar",
+                             "{n} consecutive readings in the diabetic range. Medical checkup recommended."),
+    "high_average_bp": ("High Average Blood Pressure",
+                        "Average of the last {n} readings is in the hypertensive range."),
+}
+
+_decoder = json.JSONDecoder()
+
+def _finite(field, value):
+    """value as a float; ValueError unless it is a finite number (bools and numeric strings are not)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{field} must be a number")
+    try:
+        value = float(value)
+    except OverflowError:
+        raise ValueError(f"{field} is out of range") from None
+    if not math.isfinite(value):
+        raise ValueError(f"{field} must be finite")
+    return value
+
+class RingBuffer:
+    """
+    Fixed-size window of the last `size` values as float32, with a running
+    sum so the window mean is O(1). Memory does not grow with the stream.
+    """
+
+    __slots__ = ('values', 'head', 'count', 'total')
+
+    def __init__(self, size=WINDOW_SIZE):
+        self.values = array('f', bytes(4 * size))
+        self.head = 0
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, value):
+        values = self.values
+        head = self.head
+        if self.count == len(values):
+            self.total -= values[head]
+        else:
+            self.count += 1
+        values[head] = value
+        # Add the stored (float32) value so the sum matches what is subtracted later
+        self.total += values[head]
+        self.head = (head + 1) % len(values)
+
+    def mean(self):
+        return self.total / self.count if self.count else float('nan')
+
+    def full(self):
+        return self.count == len(self.values)
+
+    def last(self, n=None):
+        """The last n values (all kept values by default), oldest first."""
+        n = self.count if n is None else min(n, self.count)
+        size = len(self.values)
+        return [self.values[(self.head - n + i) % size] for i in range(n)]
+
+    def __len__(self):
+        return self.count
+
+class PatientState:
+    """Latest classification, trend counters and one RingBuffer per vital for one patient."""
+
+    __slots__ = ('windows', 'latest', 'last_ts', 'age', 'bmi', 'bp_cat', 'sugar_cat',
+                 'stage2_run', 'high_sugar_run', 'high_average', 'health_score', 'risk_level')
+
+    def __init__(self, window):
+        self.windows = {vital: RingBuffer(window) for vital in VITALS}
+        self.latest = {}
+        self.last_ts = None
+        self.age = None
+        self.bmi = None
+        self.bp_cat = None
+        self.sugar_cat = None
+        self.stage2_run = 0
+        self.high_sugar_run = 0
+        self.high_average = False
+        self.health_score = None
+        self.risk_level = None
+
+class StreamMonitor:
+    """
+    Keeps a sliding window per patient over a stream of device readings and
+    raises alerts on sustained trends, which get_detailed_alerts cannot see
+    from a single reading:
+
+      sustained_stage2_bp   `streak` consecutive Hypertension Stage 2 readings
+      sustained_high_sugar  `streak` consecutive sugar readings >= 200
+      high_average_bp       full-window mean at or above 140/90
+
+    A reading is a dict (or one line of JSON) with patient_id and any of
+    systolic, diastolic, sugar and heart_rate; a BP cuff and a glucose meter
+    can report separately. Optional fields: ts, age, and bmi or
+    height/weight. Each reading only re-classifies the vitals it carries;
+    the health score is recomputed from the latest values once every input
+    is known. An alert fires once when its condition starts and again only
+    after the condition has cleared. A reading with a field that is not a
+    finite number is rejected whole (ValueError) and changes nothing.
+    """
+
+    def __init__(self, window=WINDOW_SIZE, streak=STREAK_LENGTH, on_alert=None):
+        self.window = window
+        self.streak = streak
+        self.on_alert = on_alert
+        self.patients = {}
+        self.readings = 0
+        self.alerts = 0
+        self.invalid = 0
+
+    def _alert(self, kind, patient_id, ts, n):
+        title, message = ALERT_TEXT[kind]
+        alert = {"patient_id": patient_id, "ts": ts, "type": kind, "title": title, "message": message.format(n=n)}
+        self.alerts += 1
+        if self.on_alert is not None:
+            self.on_alert(alert)
+        return alert
+
+    def process(self, reading):
+        """Folds one reading into its patient's state and returns the alerts it raised."""
+        patient_id = reading['patient_id']
+        values = {}
+        for field in NUMERIC_FIELDS:
+            value = reading.get(field)
+            if value is not None:
+                values[field] = _finite(field, value)
+
+        state = self.patients.get(patient_id)
+        if state is None:
+            state = self.patients[patient_id] = PatientState(self.window)
+        ts = values.get('ts')
+        if ts is not None:
+            state.last_ts = ts
+        alerts = []
+        latest = state.latest
+
+        for vital in VITALS:
+            value = values.get(vital)
+            if value is not None:
+                latest[vital] = value
+                state.windows[vital].push(value)
+
+        if 'systolic' in values or 'diastolic' in values:
+            systolic, diastolic = latest.get('systolic'), latest.get('diastolic')
+            if systolic is not None and diastolic is not None:
+                state.bp_cat = classify_bp(systolic, diastolic)[0]
+                if state.bp_cat == "Hypertension Stage 2":
+                    state.stage2_run += 1
+                    if state.stage2_run == self.streak:
+                        alerts.append(self._alert("sustained_stage2_bp", patient_id, ts, self.streak))
+                else:
+                    state.stage2_run = 0
+
+                sys_window, dia_window = state.windows['systolic'], state.windows['diastolic']
+                high = (sys_window.full() and dia_window.full()
+                        and (sys_window.mean() >= 140 or dia_window.mean() >= 90))
+                if high and not state.high_average:
+                    alerts.append(self._alert("high_average_bp", patient_id, ts, self.window))
+                state.high_average = high
+
+        sugar = values.get('sugar')
+        if sugar is not None:
+            state.sugar_cat = classify_sugar(sugar)[0]
+            if sugar >= 200:
+                state.high_sugar_run += 1
+                if state.high_sugar_run == self.streak:
+                    alerts.append(self._alert("sustained_high_sugar", patient_id, ts, self.streak))
+            else:
+                state.high_sugar_run = 0
+
+        if 'age' in values:
+            state.age = values['age']
+        if 'bmi' in values:
+            state.bmi = values['bmi']
+        elif 'height' in values and 'weight' in values:
+            state.bmi = calculate_bmi(values['height'], values['weight'])
+        if state.age is not None and state.bmi is not None and len(latest) == len(VITALS):
+            state.health_score = calculate_health_score(state.bmi, latest['systolic'], latest['diastolic'],
+                                                        latest['sugar'], latest['heart_rate'], state.age)
+            state.risk_level = get_risk_assessment(state.health_score)
+        self.readings += 1
+        return alerts
+
+    def feed(self, data, pending=b""):
+        """
+        Processes the complete JSON lines in pending + data and returns the
+        trailing partial line, to be passed back with the next chunk.
+        Lines that are not valid readings are counted in self.invalid.
+        """
+        data = pending + data
+        end = data.rfind(b"\n")
+        if end < 0:
+            if len(data) > MAX_LINE:
+                self.invalid += 1
+                return b""
+            return data
+        # One decode per chunk; json.loads on bytes would sniff the encoding per line
+        decode = _decoder.decode
+        process = self.process
+        for line in data[:end].decode("utf-8", "replace").split("\n"):
+            if not line.strip():
+                continue
+            try:
+                process(decode(line))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.invalid += 1
+        return data[end + 1:]
+
+    def snapshot(self, patient_id):
+        """Current view of one patient: latest vitals, window means, categories and health score."""
+        state = self.patients.get(patient_id)
+        if state is None:
+            return None
+        return {
+            "patient_id": patient_id,
+            "last_ts": state.last_ts,
+            "latest": dict(state.latest),
+            "window_means": {vital: window.mean() for vital, window in state.windows.items() if len(window)},
+            "bp_cat": state.bp_cat,
+            "sugar_cat": state.sugar_cat,
+            "health_score": state.health_score,
+            "risk_level": state.risk_level,
+            "stage2_run": state.stage2_run,
+            "high_sugar_run": state.high_sugar_run,
+        }
+
+    def stats(self):
+        return {"patients": len(self.patients), "readings": self.readings,
+                "alerts": self.alerts, "invalid": self.invalid}
+
+def state_size_bytes(state):
+    """Approximate memory held by one PatientState (the object, its dicts and buffers)."""
+    size = sys.getsizeof(state) + sys.getsizeof(state.windows) + sys.getsizeof(state.latest)
+    for window in state.windows.values():
+        size += sys.getsizeof(window) + sys.getsizeof(window.values)
+    return size
+
+async def serve_tcp(monitor, host="127.0.0.1", port=9000):
+    """
+    Accepts device connections that send newline-delimited JSON readings and
+    feeds them to the monitor. Returns the started asyncio server.
+    """
+    async def handle(reader, writer):
+        pending = b""
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                pending = monitor.feed(data, pending)
+            if pending:
+                monitor.feed(b"\n", pending)
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+async def tail_file(monitor, path, from_start=False, poll_interval=0.1, stop=None):
+    """
+    Follows a file of newline-delimited JSON readings like `tail -f`,
+    feeding lines to the monitor as they are appended. Starts at the end of
+    the file unless from_start, starts over if the file is truncated or
+    replaced, and returns once the `stop` event (an asyncio.Event) is set.
+    """
+    f = open(path, "rb")
+    try:
+        if not from_start:
+            f.seek(0, os.SEEK_END)
+        pending = b""
+        while stop is None or not stop.is_set():
+            data = f.read(READ_SIZE)
+            if data:
+                pending = monitor.feed(data, pending)
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and (stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < f.tell()):
+                f.close()
+                f = open(path, "rb")
+                pending = b""
+                continue
+            await asyncio.sleep(poll_interval)
+    finally:
+        f.close()
+
+def generate_readings(n_patients=1000, readings_per_patient=100, seed=0):
+    """
+    Replay data: each patient's vitals from patient_history.generate_history
+    as alternating BP cuff (systolic, diastolic, heart_rate) and glucose
+    meter (sugar) readings, interleaved by time, as newline-terminated JSON.
+    """
+    from utils.patient_history import generate_history
+    df = generate_history(n_patients, readings_per_patient, seed=seed).sort_values('ts')
+    lines = []
+    for patient_id, ts, age, height, weight, systolic, diastolic, sugar, heart_rate in zip(
+            df['patient_id'].tolist(), df['ts'].tolist(), df['age'].tolist(), df['height'].tolist(),
+            df['weight'].tolist(), df['systolic'].tolist(), df['diastolic'].tolist(),
+            df['sugar'].tolist(), df['heart_rate'].tolist()):
+        lines.append(json.dumps({"patient_id": patient_id, "ts": ts, "age": age, "height": height, "weight": weight,
+                                 "systolic": systolic, "diastolic": diastolic, "heart_rate": heart_rate}).encode() + b"\n")
+        lines.append(json.dumps({"patient_id": patient_id, "ts": ts + 60, "sugar": sugar}).encode() + b"\n")
+    return lines
+
+async def replay(lines, host="127.0.0.1", port=9000, connections=1, chunk_lines=1000):
+    """Sends replay lines to a running ingestion server over `connections` sockets, as fast as possible."""
+    async def send(part):
+        _, writer = await asyncio.open_connection(host, port)
+        for i in range(0, len(part), chunk_lines):
+            writer.write(b"".join(part[i:i + chunk_lines]))
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    await asyncio.gather(*(send(lines[i::connections]) for i in range(connections)))
+
+async def run_load_test(lines, connections=1, window=WINDOW_SIZE):
+    """
+    Starts a server with a fresh monitor on a free local port, replays
+    `lines` into it and waits until every reading is processed. Returns
+    readings/sec, alert count and the approximate memory per patient.
+    """
+    monitor = StreamMonitor(window=window)
+    server = await serve_tcp(monitor, port=0)
+    port = server.sockets[0].getsockname()[1]
+    start = time.perf_counter()
+    await replay(lines, port=port, connections=connections)
+    while monitor.readings + monitor.invalid < len(lines):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    # Let the connection handlers see EOF before the loop shuts down
+    while len(asyncio.all_tasks()) > 1:
+        await asyncio.sleep(0.001)
+    server.close()
+    await server.wait_closed()
+
+    sizes = [state_size_bytes(state) for state in monitor.patients.values()]
+    return dict(monitor.stats(), seconds=elapsed, readings_per_sec=monitor.readings / elapsed,
+                bytes_per_patient=sum(sizes) / max(len(sizes), 1))
+
+def _print_alert(alert):
+    print(json.dumps(alert), flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream device readings through the sliding-window monitor.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Accept newline-delimited JSON readings over TCP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=9000)
+    tail = sub.add_parser("tail", help="Follow a file of newline-delimited JSON readings")
+    tail.add_argument("path")
+    tail.add_argument("--from-start", action="store_true", help="Read the existing lines first")
+    for command in (serve, tail):
+        command.add_argument("--window", type=int, default=WINDOW_SIZE, help="Readings kept per patient and vital")
+        command.add_argument("--streak", type=int, default=STREAK_LENGTH, help="Consecutive readings for a sustained alert")
+    generate = sub.add_parser("generate", help="Write a replay file of synthetic device readings")
+    generate.add_argument("path")
+    send = sub.add_parser("replay", help="Send a replay file to a running server as fast as possible")
+    send.add_argument("path")
+    send.add_argument("--host", default="127.0.0.1")
+    send.add_argument("--port", type=int, default=9000)
+    send.add_argument("--connections", type=int, default=1)
+    load = sub.add_parser("loadtest", help="Replay synthetic readings through a local server and report throughput")
+    load.add_argument("--connections", type=int, default=4)
+    for command in (generate, load):
+        command.add_argument("--patients", type=int, default=1000)
+        command.add_argument("--readings", type=int, default=100, help="BP readings per patient (each followed by a sugar reading)")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        with open(args.path, "wb") as f:
+            f.writelines(generate_readings(args.patients, args.readings))
+    elif args.command == "replay":
+        with open(args.path, "rb") as f:
+            lines = f.readlines()
+        start = time.perf_counter()
+        asyncio.run(replay(lines, args.host, args.port, args.connections))
+        elapsed = time.perf_counter() - start
+        print(f"Sent {len(lines):,} readings in {elapsed:.2f}s ({len(lines) / max(elapsed, 1e-9):,.0f} readings/sec)")
+    elif args.command == "loadtest":
+        lines = generate_readings(args.patients, args.readings)
+        stats = asyncio.run(run_load_test(lines, args.connections))
+        print(f"{stats['readings']:,} readings from {stats['patients']:,} patients in {stats['seconds']:.2f}s "
+              f"({stats['readings_per_sec']:,.0f} readings/sec), {stats['alerts']:,} alerts, "
+              f"~{stats['bytes_per_patient']:,.0f} bytes per patient")
+    else:
+        monitor = StreamMonitor(window=args.window, streak=args.streak, on_alert=_print_alert)
+
+        async def main():
+            if args.command == "serve":
+                server = await serve_tcp(monitor, args.host, args.port)
+                async with server:
+                    await server.serve_forever()
+            else:
+                await tail_file(monitor, args.path, from_start=args.from_start)
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            print(json.dumps(monitor.stats()), file=sys.stderr)
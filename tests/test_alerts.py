@@ -0,0 +1,98 @@
+import itertools
+import numpy as np
+import pytest
+from utils import health_metrics as hm
+
+NAN = float('nan')
+RISK_LEVELS = ["Low Risk", "Medium Risk", "High Risk", "Low", "Medium", "High", "", None]
+
+# The string-building implementations the alert tables replaced, kept verbatim as the reference
+def legacy_detailed_alerts(bmi, systolic, diastolic, sugar):
+    alerts = []
+    if bmi >= 30:
+        alerts.append(("Obesity Alert", "Your BMI indicates obesity. This increases risk for heart disease and diabetes."))
+    if systolic >= 140 or diastolic >= 90:
+        alerts.append(("High Blood Pressure", "Readings suggest Hypertension. Please consult a doctor."))
+    elif systolic > 180 or diastolic > 120:
+        alerts.append(("CRITICAL BP ALERT", "Hypertensive Crisis levels detected. Seek immediate medical attention."))
+    if sugar >= 200:
+        alerts.append(("High Blood Sugar", "Glucose levels are in the diabetic range. Medical checkup recommended."))
+    return alerts
+
+def legacy_smart_recommendations(risk_level, alerts_count):
+    recs = []
+    rec_pool = {
+        "General": [
+            "Maintain a balanced diet rich in vegetables and whole grains.",
+            "Aim for at least 30 minutes of moderate exercise daily.",
+            "Stay hydrated and ensure 7-8 hours of sleep."
+        ],
+        "High BP": [
+            "Reduce sodium (salt) intake in your diet.",
+            "Limit alcohol and caffeine consumption.",
+            "Practice stress-reducing techniques like meditation."
+        ],
+        "High Sugar": [
+            "Monitor carbohydrate intake.",
+            "Avoid sugary drinks and processed foods.",
+            "Regular physical activity helps improve insulin sensitivity."
+        ],
+        "Weight": [
+            "Focus on portion control.",
+            "Incorporate strength training to boost metabolism."
+        ]
+    }
+    recs.extend(rec_pool["General"])
+    if "High Blood Pressure" in str(alerts_count) or "BP" in str(alerts_count):
+        recs.extend(rec_pool["High BP"])
+    if "Sugar" in str(alerts_count):
+        recs.extend(rec_pool["High Sugar"])
+    return recs[:4]
+
+def vitals_for(flags):
+    """(bmi, systolic, diastolic, sugar) raising exactly the alerts in an ALERT_* bitmask."""
+    return (32.0 if flags & hm.ALERT_OBESITY else 22.0,
+            150 if flags & hm.ALERT_HIGH_BP else 110,
+            70,
+            250 if flags & hm.ALERT_HIGH_SUGAR else 100)
+
+ALL_FLAGS = range(1 << 3)
+
+def test_tables_cover_every_bitmask():
+    assert len(hm.ALERT_TABLE) == len(hm.RECOMMENDATION_TABLE) == len(hm.REC_IDS) == len(ALL_FLAGS)
+
+@pytest.mark.parametrize("flags", ALL_FLAGS)
+def test_alert_table_matches_legacy(flags):
+    vitals = vitals_for(flags)
+    assert list(hm.get_detailed_alerts(*vitals)) == legacy_detailed_alerts(*vitals)
+    assert list(hm.ALERT_TABLE[flags]) == legacy_detailed_alerts(*vitals)
+    assert hm.get_alert_flags_batch(*[np.array([v]) for v in vitals]).tolist() == [flags]
+
+@pytest.mark.parametrize("flags, risk_level", list(itertools.product(ALL_FLAGS, RISK_LEVELS)))
+def test_recommendations_match_legacy(flags, risk_level):
+    legacy_alerts = legacy_detailed_alerts(*vitals_for(flags))
+    expected = legacy_smart_recommendations(risk_level, legacy_alerts)
+    alerts = hm.get_detailed_alerts(*vitals_for(flags))
+    # Tuple from get_detailed_alerts, the legacy list, and the text fallback
+    assert list(hm.get_smart_recommendations(risk_level, alerts)) == expected
+    assert list(hm.get_smart_recommendations(risk_level, legacy_alerts)) == expected
+    assert list(hm.get_smart_recommendations(risk_level, str(legacy_alerts))) == expected
+    assert list(hm.RECOMMENDATION_TABLE[flags]) == expected
+    assert list(hm.RECOMMENDATION_SETS[hm.get_recommendation_ids_batch([flags])[0]]) == expected
+
+@pytest.mark.parametrize("alerts", [
+    [], (), "", "BP", "Sugar", "High Blood Pressure and Sugar", 0, 3, None,
+    [("Custom", "BP reading")], [["High Blood Pressure", "unhashable"]], [("CRITICAL BP ALERT", "x")],
+])
+def test_recommendations_for_other_inputs(alerts):
+    for risk_level in RISK_LEVELS:
+        expected = legacy_smart_recommendations(risk_level, alerts)
+        assert list(hm.get_smart_recommendations(risk_level, alerts)) == expected
+
+def test_detailed_alerts_over_threshold_grid():
+    bmi = [29.9, 30, 30.1, NAN]
+    systolic = [139, 139.5, 140, 180, 181, 250, NAN]
+    diastolic = [89, 89.5, 90, 120, 121, 150, NAN]
+    sugar = [199, 199.5, 200, NAN]
+    for vitals in itertools.product(bmi, systolic, diastolic, sugar):
+        assert list(hm.get_detailed_alerts(*vitals)) == legacy_detailed_alerts(*vitals), vitals
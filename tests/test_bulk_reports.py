@@ -0,0 +1,31 @@
+import os
+import zipfile
+import pytest
+from utils.bulk_reports import build_report_record, generate_reports
+
+VITALS = {"age": 45, "height": 170, "weight": 80, "systolic": 135, "diastolic": 85,
+          "sugar": 120, "heart_rate": 75}
+
+def records(patient_ids):
+    return [build_report_record(dict(VITALS, patient_id=pid)) for pid in patient_ids]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_duplicate_ids_get_distinct_names(tmp_path, workers):
+    ids = ["p1", "p1", "p/1"]
+    archive = str(tmp_path / "reports.zip")
+    assert generate_reports(records(ids), archive, workers=workers, batch_size=1, progress=False) == 3
+    with zipfile.ZipFile(archive) as zf:
+        names = zf.namelist()
+    assert names == ["000000-p1.pdf", "000001-p1.pdf", "000002-p_1.pdf"]
+
+    out_dir = str(tmp_path / "reports")
+    generate_reports(records(ids), out_dir, workers=workers, batch_size=2, progress=False)
+    assert sorted(os.listdir(out_dir)) == names
+
+def test_names_without_patient_id(tmp_path):
+    out_dir = str(tmp_path / "reports")
+    rows = [build_report_record(VITALS) for _ in range(2)] + records(["a"])
+    generate_reports(rows, out_dir, progress=False)
+    assert sorted(os.listdir(out_dir)) == ["000002-a.pdf", "report-000000.pdf", "report-000001.pdf"]
+    with open(os.path.join(out_dir, "000002-a.pdf"), "rb") as f:
+        assert f.read(5) == b"%PDF-"
@@ -0,0 +1,80 @@
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from utils import data_generator as dg
+
+# The per-row labelling of generate_synthetic_data, kept verbatim as the reference
+def legacy_risk_level(age, bmi, bp_systolic, bp_diastolic, heart_rate, spo2):
+    risk_score = 0
+    if bmi > 30: risk_score += 2
+    elif bmi > 25: risk_score += 1
+
+    if bp_systolic > 140 or bp_diastolic > 90: risk_score += 2
+    elif bp_systolic > 120 or bp_diastolic > 80: risk_score += 1
+
+    if heart_rate > 100 or heart_rate < 60: risk_score += 1
+
+    if spo2 < 95: risk_score += 2
+
+    if age > 60: risk_score += 1
+
+    if risk_score <= 1:
+        return 'Low'
+    elif risk_score <= 3:
+        return 'Medium'
+    return 'High'
+
+VITALS = dg.COLUMNS[:-1]
+
+def legacy_labels(df):
+    return [legacy_risk_level(*row) for row in df[VITALS].itertuples(index=False)]
+
+def test_vectorized_is_deterministic():
+    first = dg.generate_synthetic_data_vectorized(5_000, seed=7)
+    pd.testing.assert_frame_equal(first, dg.generate_synthetic_data_vectorized(5_000, seed=7))
+    assert not first.equals(dg.generate_synthetic_data_vectorized(5_000, seed=8))
+
+def test_vectorized_leaves_global_rng_alone():
+    np.random.seed(0)
+    expected = np.random.random()
+    np.random.seed(0)
+    dg.generate_synthetic_data_vectorized(100, seed=7)
+    assert np.random.random() == expected
+
+def test_vectorized_labels_follow_legacy_rules():
+    df = dg.generate_synthetic_data_vectorized(20_000, seed=3)
+    assert df['Risk_Level'].tolist() == legacy_labels(df)
+
+def test_vectorized_categorical_labels():
+    plain = dg.generate_synthetic_data_vectorized(2_000, seed=3)
+    categorical = dg.generate_synthetic_data_vectorized(2_000, seed=3, categorical=True)
+    assert list(categorical['Risk_Level'].cat.categories) == dg.RISK_LEVELS
+    assert categorical['Risk_Level'].astype(str).tolist() == plain['Risk_Level'].tolist()
+
+def test_risk_codes_at_thresholds():
+    grid = [
+        [60, 60.5, 61],
+        [25, 25.01, 30, 30.01],
+        [120, 121, 140, 141],
+        [80, 81, 90, 91],
+        [59, 60, 100, 101],
+        [94, 95],
+    ]
+    columns = [np.array(c) for c in zip(*itertools.product(*grid))]
+    codes = dg.compute_risk_codes(*columns)
+    expected = [legacy_risk_level(*row) for row in zip(*[c.tolist() for c in columns])]
+    assert [dg.RISK_LEVELS[c] for c in codes.tolist()] == expected
+
+def test_legacy_generator_labels():
+    df = dg.generate_synthetic_data(500)
+    assert df['Risk_Level'].tolist() == legacy_labels(df)
+
+def test_rewrite_removes_stale_parts(tmp_path):
+    out_dir = str(tmp_path / "cohort")
+    dg.write_synthetic_dataset(out_dir, n=1_000, chunk_size=100)
+    dg.write_synthetic_dataset(out_dir, n=250, chunk_size=100, fmt="csv", workers=2)
+    assert [os.path.basename(p) for p in dg.list_dataset_parts(out_dir)] == [
+        "part-00000.csv", "part-00001.csv", "part-00002.csv"]
+    assert sorted(os.listdir(out_dir)) == ["part-00000.csv", "part-00001.csv", "part-00002.csv"]
+    assert len(dg.load_synthetic_dataset(out_dir)) == 250
@@ -0,0 +1,128 @@
+import itertools
+import math
+import numpy as np
+import pytest
+from utils import health_metrics as hm
+
+NAN = float('nan')
+
+# Form ranges of the Health Monitoring page
+SYSTOLIC = np.arange(50, 301, dtype=np.float64)
+DIASTOLIC = np.arange(30, 201, dtype=np.float64)
+SUGAR = np.arange(20, 600.5, 0.5)
+BMI = np.arange(5, 80, 0.05)
+
+# Each threshold of the scalar functions with its neighbours, plus NaN
+BMI_EDGES = [18.4, 18.49, 18.5, 18.51, 24.89, 24.9, 24.95, 25, 29.89, 29.9, 29.95, 30, 30.01, NAN]
+SYSTOLIC_EDGES = [119, 119.5, 120, 129, 130, 139, 140, 180, 180.5, 181, NAN]
+DIASTOLIC_EDGES = [79, 79.5, 80, 89, 90, 120, 120.5, 121, NAN]
+SUGAR_EDGES = [139, 139.5, 140, 199, 199.5, 200, NAN]
+HEART_RATE_EDGES = [59, 59.5, 60, 100, 100.5, 101, NAN]
+AGE_EDGES = [50, 50.5, 51, NAN]
+
+def same(a, b):
+    return a == b or (isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b))
+
+def check(batch, scalar, *columns):
+    """Compares batch(*columns) with scalar() row by row, listing the rows that differ."""
+    got = batch(*[np.asarray(c) for c in columns])
+    if isinstance(got, tuple):
+        got = list(zip(*[g.tolist() for g in got]))
+    else:
+        got = got.tolist()
+    expected = [scalar(*row) for row in zip(*[np.asarray(c).tolist() for c in columns])]
+    assert len(got) == len(expected)
+    bad = [(row, g, e) for row, g, e in zip(zip(*columns), got, expected) if not same(g, e)]
+    assert not bad, bad[:10]
+
+def product(*axes):
+    return [np.array(c, dtype=np.float64) for c in zip(*itertools.product(*axes))]
+
+def test_calculate_bmi_batch():
+    height, weight = product(range(50, 251), range(10, 301))
+    check(hm.calculate_bmi_batch, hm.calculate_bmi, height, weight)
+
+def test_calculate_bmi_batch_bad_height():
+    height, weight = product([-10, -0.5, 0, 0.5, 1, NAN, 170], [0, 70, NAN])
+    check(hm.calculate_bmi_batch, hm.calculate_bmi, height, weight)
+
+def test_calculate_bmi_batch_scalar_input():
+    for height, weight in [(170, 70), (np.float64(170), 70), (0, 70), (np.int64(-1), 70.0), (NAN, 70)]:
+        assert same(float(hm.calculate_bmi_batch(height, weight)), float(hm.calculate_bmi(height, weight)))
+
+def test_calculate_bmi_batch_integer_arrays():
+    height, weight = np.arange(0, 251), np.full(251, 70)
+    check(hm.calculate_bmi_batch, hm.calculate_bmi, height, weight)
+
+@pytest.mark.parametrize("values", [BMI, np.array(BMI_EDGES)])
+def test_classify_bmi_batch(values):
+    check(hm.classify_bmi_batch, hm.classify_bmi, values)
+
+def test_classify_bp_batch():
+    check(hm.classify_bp_batch, hm.classify_bp, *product(SYSTOLIC, DIASTOLIC))
+
+def test_classify_bp_batch_edges():
+    check(hm.classify_bp_batch, hm.classify_bp, *product(SYSTOLIC_EDGES, DIASTOLIC_EDGES))
+
+@pytest.mark.parametrize("values", [SUGAR, np.array(SUGAR_EDGES)])
+def test_classify_sugar_batch(values):
+    check(hm.classify_sugar_batch, hm.classify_sugar, values)
+
+def test_classify_integer_input():
+    check(hm.classify_bmi_batch, hm.classify_bmi, np.arange(5, 80))
+    check(hm.classify_bp_batch, hm.classify_bp, *[c.astype(np.int64) for c in product(SYSTOLIC, DIASTOLIC)])
+    check(hm.classify_sugar_batch, hm.classify_sugar, np.arange(20, 601))
+
+def test_calculate_health_score_batch_edges():
+    columns = product(BMI_EDGES, SYSTOLIC_EDGES, DIASTOLIC_EDGES, SUGAR_EDGES, HEART_RATE_EDGES, AGE_EDGES)
+    check(hm.calculate_health_score_batch, hm.calculate_health_score, *columns)
+
+def test_calculate_health_score_batch_random():
+    rng = np.random.default_rng(0)
+    n = 50_000
+    columns = [
+        hm.calculate_bmi_batch(rng.integers(50, 251, n), rng.integers(10, 301, n)),
+        rng.integers(50, 301, n),
+        rng.integers(30, 201, n),
+        rng.integers(20, 601, n),
+        rng.integers(30, 221, n),
+        rng.integers(1, 121, n),
+    ]
+    check(hm.calculate_health_score_batch, hm.calculate_health_score, *columns)
+
+@pytest.mark.parametrize("score", [np.arange(0, 101), np.arange(0, 100.25, 0.25)])
+def test_status_and_risk_batch(score):
+    check(hm.get_health_status_batch, hm.get_health_status, score)
+    check(hm.get_risk_assessment_batch, hm.get_risk_assessment, score)
+
+def test_alert_flags_batch():
+    columns = product(BMI_EDGES, SYSTOLIC_EDGES, DIASTOLIC_EDGES, SUGAR_EDGES)
+    flags = hm.get_alert_flags_batch(*columns)
+    expected = [hm.get_detailed_alerts(*row) for row in zip(*[c.tolist() for c in columns])]
+    assert [hm.ALERT_TABLE[f] for f in flags.tolist()] == expected
+
+def test_score_batch():
+    rng = np.random.default_rng(1)
+    n = 5_000
+    data = {
+        "age": rng.integers(1, 121, n),
+        "height": rng.integers(50, 251, n),
+        "weight": rng.integers(10, 301, n),
+        "systolic": rng.integers(50, 301, n),
+        "diastolic": rng.integers(30, 201, n),
+        "sugar": rng.integers(20, 601, n),
+        "heart_rate": rng.integers(30, 221, n),
+    }
+    result = hm.score_batch(data)
+    codes = hm.score_batch(data, labels=False)
+    for i in range(n):
+        row = {k: v[i].item() for k, v in data.items()}
+        bmi = hm.calculate_bmi(row["height"], row["weight"])
+        score = hm.calculate_health_score(bmi, row["systolic"], row["diastolic"], row["sugar"],
+                                          row["heart_rate"], row["age"])
+        assert result["bmi"][i] == bmi
+        assert (result["bmi_cat"][i], result["bmi_color"][i]) == hm.classify_bmi(bmi)
+        assert (result["bp_cat"][i], result["bp_color"][i]) == hm.classify_bp(row["systolic"], row["diastolic"])
+        assert result["health_score"][i] == score
+        assert hm.ALERT_TABLE[codes["alert_flags"][i]] == hm.get_detailed_alerts(
+            bmi, row["systolic"], row["diastolic"], row["sugar"])
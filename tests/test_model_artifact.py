@@ -0,0 +1,51 @@
+import os
+import pickle
+import warnings
+import numpy as np
+import pytest
+from utils import model_artifact as ma
+from utils.data_generator import generate_synthetic_data_vectorized
+from utils.model_inference import FEATURES
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+def load_pickle(name):
+    with open(os.path.join(MODELS_DIR, name), 'rb') as f, warnings.catch_warnings():
+        # The committed pickles may come from another scikit-learn release
+        warnings.simplefilter("ignore")
+        return pickle.load(f)
+
+@pytest.fixture(scope="module")
+def committed():
+    return load_pickle("best_model.pkl"), load_pickle("scaler.pkl"), load_pickle("encoder.pkl")
+
+def random_batch(scaler, n, seed):
+    """Cohort rows plus rows far outside the training ranges, scaled like the trainer does."""
+    rng = np.random.default_rng(seed)
+    cohort = generate_synthetic_data_vectorized(n, seed=seed)[FEATURES].to_numpy(dtype=np.float64)
+    wild = rng.uniform(-50, 300, size=(n // 4, len(FEATURES)))
+    return (np.vstack([cohort, wild]) - scaler.mean_) / scaler.scale_
+
+@pytest.mark.parametrize("n", [1, 7, 1_000, 20_000])
+def test_flat_forest_matches_sklearn(committed, n):
+    model, scaler, _ = committed
+    X = random_batch(scaler, n, seed=n)
+    forest = ma.compile_forest(model)
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+def test_flat_forest_single_thread(committed):
+    model, scaler, _ = committed
+    X = random_batch(scaler, 10_000, seed=1)
+    forest = ma.compile_forest(model)
+    forest.n_threads = 1
+    np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+def test_exported_artifact_matches_sklearn(committed, tmp_path):
+    model, scaler, encoder = committed
+    ma.export_model_artifact(model, scaler, encoder, str(tmp_path), FEATURES)
+    manifest, forest = ma.load_model_artifact(str(tmp_path))
+    assert manifest["classes"] == encoder.classes_.tolist()
+    np.testing.assert_array_equal(manifest["scaler"]["mean"], scaler.mean_)
+    for n in (5, 10_000):
+        X = random_batch(scaler, n, seed=n)
+        np.testing.assert_allclose(forest.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
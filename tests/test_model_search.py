@@ -0,0 +1,28 @@
+import numpy as np
+from utils.model_search import search_best_model
+
+GRID = {"logistic_regression": {"C": [0.01, 0.1, 1.0, 10.0], "max_iter": [200]}}
+
+def make_data(n=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=n) > 0).astype(int)
+    return X, y
+
+def test_winner_is_scored_on_all_rows():
+    X, y = make_data()
+    # Four candidates with eta=3 leave a single survivor after the first round
+    _, _, report = search_best_model(X, y, grid=GRID, n_splits=3, workers=2, eta=3, min_samples=300)
+    rounds = report["rounds"]
+    assert rounds[0]["n_samples"] == 300
+    assert rounds[-1]["n_samples"] == len(y)
+    assert len(rounds[-1]["candidates"]) == 3
+    assert report["cv_accuracy"] == rounds[-1]["candidates"][0]["cv_accuracy"]
+
+def test_expired_budget_still_scores_a_candidate():
+    X, y = make_data()
+    name, params, report = search_best_model(X, y, grid=GRID, n_splits=3, workers=2, time_budget=0)
+    assert len(report["rounds"]) == 1
+    scored = report["rounds"][0]["candidates"]
+    assert scored and report["cv_accuracy"] == scored[0]["cv_accuracy"] > 0.5
+    assert (name, params) == (scored[0]["model"], scored[0]["params"])
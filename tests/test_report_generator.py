@@ -0,0 +1,62 @@
+import datetime
+import types
+import pytest
+from utils import health_metrics as hm
+from utils import report_generator as rg
+
+fitz = pytest.importorskip("fitz")
+
+NOW = datetime.datetime(2024, 5, 17, 9, 30, 12)
+
+class FixedDatetime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return NOW
+
+@pytest.fixture(autouse=True)
+def fixed_now(monkeypatch):
+    # The minute printed on the report must match between the two renderers
+    monkeypatch.setattr(rg, "datetime", types.SimpleNamespace(datetime=FixedDatetime))
+
+def make_record(height, weight, systolic, diastolic, sugar, heart_rate=72, age=45, gender="Female", recs=None):
+    user_data = {"age": age, "gender": gender, "height": height, "weight": weight,
+                 "systolic": systolic, "diastolic": diastolic, "sugar": sugar, "heart_rate": heart_rate}
+    bmi = hm.calculate_bmi(height, weight)
+    score = hm.calculate_health_score(bmi, systolic, diastolic, sugar, heart_rate, age)
+    risk = hm.get_risk_assessment(score)
+    results = {"bmi": bmi, "bmi_cat": hm.classify_bmi(bmi)[0], "risk_level": risk, "health_score": score}
+    alerts = hm.get_detailed_alerts(bmi, systolic, diastolic, sugar)
+    return user_data, results, alerts, recs if recs is not None else hm.get_smart_recommendations(risk, alerts)
+
+LONG_REC = ("Schedule a follow-up appointment within two weeks and bring a log of home blood "
+            "pressure readings taken twice a day, morning and evening, before meals.")
+
+RECORDS = {
+    "healthy": make_record(170, 65, 115, 75, 90),
+    "all_alerts": make_record(165, 100, 185, 125, 260, heart_rate=110, age=70, gender="Male"),
+    "medium": make_record(175, 85, 132, 84, 150),
+    "custom_recs": make_record(160, 90, 145, 95, 210, recs=[LONG_REC, "Walk daily.", LONG_REC]),
+    "overflow": make_record(160, 90, 145, 95, 210, recs=[LONG_REC] * 12),
+}
+
+def pages(pdf_bytes):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [(page.get_text("words"), page.get_pixmap(dpi=72).samples) for page in doc]
+
+@pytest.mark.parametrize("name", list(RECORDS))
+def test_template_matches_generate_pdf_report(name):
+    record = RECORDS[name]
+    expected = pages(rg.generate_pdf_report(*record))
+    got = pages(rg.generate_pdf_report_template(*record, cache=False))
+    assert len(got) == len(expected)
+    for (got_words, got_pixels), (expected_words, expected_pixels) in zip(got, expected):
+        assert [w[4:] for w in got_words] == [w[4:] for w in expected_words]
+        # FPDF writes coordinates to 0.01 pt; placed template fragments can round the other way
+        for got_word, expected_word in zip(got_words, expected_words):
+            assert got_word[:4] == pytest.approx(expected_word[:4], abs=0.011), got_word[4]
+        assert got_pixels == expected_pixels
+
+def test_template_is_used_for_one_page_reports():
+    assert rg._get_template()
+    assert rg._get_template().render(*RECORDS["custom_recs"], NOW) is not None
+    assert rg._get_template().render(*RECORDS["overflow"], NOW) is None